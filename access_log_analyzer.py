@@ -4,10 +4,16 @@ Flaskアプリケーションのアクセスログを解析し、統計情報を
 """
 import re
 import os
+import gzip
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from collections import defaultdict, Counter, OrderedDict
+from collections import Counter, OrderedDict, deque
 from urllib.parse import urlparse, parse_qs
 import json
+from ua_classifier import classify_user_agent
+
+# 並列分析時に1タスクで処理するバイト数
+PARALLEL_CHUNK_SIZE = 32 * 1024 * 1024
 
 
 class AccessLogAnalyzer:
@@ -19,8 +25,8 @@ class AccessLogAnalyzer:
         :param log_file: 分析対象のログファイルパス
         """
         self.log_file = log_file
-        self.log_entries = []
         self.stats = {}
+        self._accumulator = None
         
         # 一般的なログフォーマットのパターン（OrderedDictで順序保証）
         self.log_patterns = OrderedDict([
@@ -52,48 +58,166 @@ class AccessLogAnalyzer:
             ))
         ])
     
-    def analyze_logs(self, max_lines=None):
+    def analyze_logs(self, max_lines=None, include_rotated=True):
         """
-        ログファイルを分析
-        :param max_lines: 分析する最大行数
+        ログファイルを分析（1パスで集計し、エントリは保持しない）
+        :param max_lines: 分析する最大行数（末尾から。Noneの場合は全行）
+        :param include_rotated: ローテーション済みファイル（.1〜.N, .gz）も連続したログとして扱う
         :return: 分析統計
         """
-        if not os.path.exists(self.log_file):
+        log_files = self._find_log_files() if include_rotated else [self.log_file]
+        if not os.path.exists(self.log_file) and len(log_files) <= 1:
             raise FileNotFoundError(f"ログファイルが見つかりません: {self.log_file}")
+        log_files = [path for path in log_files if os.path.exists(path)]
         
-        self.log_entries = []
-        processed_lines = 0
-        
+        accumulator = LogStatsAccumulator()
         try:
-            with open(self.log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-                
-                # 最新の行から処理（ファイルの末尾から）
-                if max_lines:
-                    lines = lines[-max_lines:]
-                
-                for line in lines:
-                    if max_lines and processed_lines >= max_lines:
-                        break
-                    
-                    entry = self._parse_log_line(line.strip())
-                    if entry:
-                        self.log_entries.append(entry)
-                        processed_lines += 1
+            for line in self._iter_lines(log_files, max_lines):
+                line = line.strip()
+                if not line:
+                    continue
+                entry = self._parse_log_line(line)
+                if entry:
+                    self._accumulate_entry(accumulator, entry)
         
         except Exception as e:
             raise Exception(f"ログファイル読み込みエラー: {str(e)}")
         
-        # 統計情報を計算
-        self._calculate_stats()
+        # 統計情報を確定
+        return self.load_accumulator(accumulator)
+    
+    @classmethod
+    def analyze_files(cls, log_files, include_rotated=True, max_workers=None, chunk_size=PARALLEL_CHUNK_SIZE):
+        """
+        複数のログファイルをチャンクに分割し、プロセスプールで並列に分析して結合
+        :param log_files: 分析対象のログファイル一覧
+        :param include_rotated: 各ファイルのローテーション済みファイル（.1〜.N, .gz）も含める
+        :param max_workers: 最大プロセス数（Noneの場合はCPUコア数）
+        :param chunk_size: 1タスクで処理するバイト数（gzipはファイル単位）
+        :return: 分析済みのAccessLogAnalyzer
+        """
+        paths = []
+        for log_file in log_files:
+            candidates = cls(log_file)._find_log_files() if include_rotated else [log_file]
+            paths.extend(path for path in candidates if os.path.exists(path) and path not in paths)
+        
+        chunks = []
+        for path in paths:
+            size = os.path.getsize(path)
+            if path.endswith('.gz') or size <= chunk_size:
+                chunks.append((path, 0, None))
+            else:
+                chunks.extend((path, start, min(start + chunk_size, size)) for start in range(0, size, chunk_size))
+        
+        accumulator = LogStatsAccumulator()
+        if len(chunks) <= 1 or max_workers == 1:
+            for chunk in chunks:
+                accumulator.merge(_analyze_chunk(*chunk))
+        else:
+            workers = min(len(chunks), max_workers or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for partial in executor.map(_analyze_chunk, *zip(*chunks)):
+                    accumulator.merge(partial)
+        
+        analyzer = cls(', '.join(log_files))
+        analyzer.load_accumulator(accumulator)
+        return analyzer
+    
+    def load_accumulator(self, accumulator):
+        """
+        集計済みの結果（保存済みロールアップ等）を分析結果として読み込む
+        """
+        self._accumulator = accumulator
+        self.stats = accumulator.to_stats()
         return self.stats
     
+    def _find_log_files(self):
+        """
+        現行ファイルとローテーション済みファイルを新しい順に列挙
+        （access.log, access.log.1, access.log.2.gz ...）
+        """
+        log_files = [self.log_file]
+        index = 1
+        while True:
+            for candidate in (f"{self.log_file}.{index}", f"{self.log_file}.{index}.gz"):
+                if os.path.exists(candidate):
+                    log_files.append(candidate)
+                    break
+            else:
+                break
+            index += 1
+        return log_files
+    
+    def _open_log_file(self, path):
+        """
+        ログファイルをテキストとして開く（gzip圧縮にも対応）
+        """
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rt', encoding='utf-8', errors='ignore')
+        return open(path, 'r', encoding='utf-8', errors='ignore')
+    
+    def _iter_lines(self, log_files, max_lines=None):
+        """
+        複数のログファイルを1つのログとして古い順に行を返す
+        :param log_files: 新しい順のログファイル一覧
+        :param max_lines: 末尾から読む最大行数（Noneの場合は全行をストリーミング）
+        """
+        if max_lines is None:
+            for path in reversed(log_files):
+                with self._open_log_file(path) as f:
+                    yield from f
+            return
+        
+        # 新しいファイルから必要な行数だけ末尾を読み、古い順に並べ直す
+        chunks = []
+        remaining = max_lines
+        for path in log_files:
+            lines = self._tail_lines(path, remaining)
+            chunks.append(lines)
+            remaining -= len(lines)
+            if remaining <= 0:
+                break
+        for lines in reversed(chunks):
+            yield from lines
+    
+    def _tail_lines(self, path, count, block_size=64 * 1024):
+        """
+        ファイル末尾からcount行を取得（EOFから逆方向にシークして読むため、ファイルサイズに依存しない）
+        """
+        if count <= 0:
+            return []
+        
+        if path.endswith('.gz'):
+            # gzipは逆方向にシークできないため、最後のcount行だけを保持しながら読む
+            with self._open_log_file(path) as f:
+                return list(deque(f, maxlen=count))
+        
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b''
+            # 末尾の改行を除いて count 行分の改行が見つかるまで読み進める
+            while position > 0 and data.count(b'\n', 0, len(data) - 1) < count:
+                read_size = min(block_size, position)
+                position -= read_size
+                f.seek(position)
+                data = f.read(read_size) + data
+        
+        lines = data.decode('utf-8', errors='ignore').splitlines()
+        return lines[-count:]
+    
     def _parse_log_line(self, line):
         """
         ログ行をパース
         :param line: ログ行
         :return: パース結果の辞書
         """
+        # 構造化ログ（JSON Lines）は正規表現を使わずにそのまま読み込む
+        if line.startswith('{'):
+            entry = self._parse_json_line(line)
+            if entry:
+                return entry
+        
         # 各パターンを試行
         for pattern_name, pattern in self.log_patterns.items():
             match = pattern.match(line)
@@ -115,6 +239,28 @@ class AccessLogAnalyzer:
         # パターンにマッチしない場合は簡易パース
         return self._fallback_parse(line)
     
+    def _parse_json_line(self, line):
+        """
+        構造化ログ（アプリが出力するJSON Lines）の1行をパース
+        """
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(entry, dict):
+            return None
+        
+        entry['pattern'] = 'jsonl'
+        entry['status'] = str(entry.get('status', 'unknown'))
+        entry['path_clean'] = entry.get('path') or 'unknown'
+        query = entry.get('query')
+        entry['query_params'] = parse_qs(query) if query else {}
+        try:
+            entry['parsed_datetime'] = datetime.fromisoformat(entry['ts']).replace(tzinfo=None)
+        except (KeyError, TypeError, ValueError):
+            entry['parsed_datetime'] = datetime.now()
+        return entry
+    
     def _parse_datetime(self, datetime_str, pattern_name):
         """
         日時文字列をdatetimeオブジェクトに変換
@@ -173,131 +319,69 @@ class AccessLogAnalyzer:
             'raw_line': line
         }
     
-    def _calculate_stats(self):
-        """統計情報を計算"""
-        if not self.log_entries:
-            self.stats = {
-                'total_requests': 0,
-                'unique_ips': 0,
-                'bot_requests': 0,
-                'admin_requests': 0,
-                'static_requests': 0,
-                'status_codes': {},
-                'methods': {},
-                'top_pages': {},
-                'top_ips': {},
-                'errors': {},
-                'hourly_stats': {},
-                'daily_stats': {},
-                'user_agents': {},
-                'referers': {},
-                'analysis_period': {
-                    'start': None,
-                    'end': None,
-                    'duration': '0 minutes'
-                }
-            }
-            return
+    def _accumulate_entry(self, accumulator, entry):
+        """
+        1エントリ分を集計に加算
+        """
+        accumulator.total_requests += 1
         
-        # 基本統計
-        total_requests = len(self.log_entries)
-        unique_ips = len(set(entry.get('ip', 'unknown') for entry in self.log_entries))
-        
-        # カウンター初期化
-        status_codes = Counter()
-        methods = Counter()
-        pages = Counter()
-        ips = Counter()
-        errors = Counter()
-        hourly_stats = defaultdict(int)
-        daily_stats = defaultdict(int)
-        user_agents = Counter()
-        referers = Counter()
-        
-        # 時間範囲
-        timestamps = [entry['parsed_datetime'] for entry in self.log_entries if entry['parsed_datetime']]
-        start_time = min(timestamps) if timestamps else datetime.now()
-        end_time = max(timestamps) if timestamps else datetime.now()
-        
-        # 各エントリーを処理
-        bot_requests = 0
-        admin_requests = 0
-        static_requests = 0
-        
-        for entry in self.log_entries:
-            # ステータスコード
-            status = entry.get('status', 'unknown')
-            status_codes[status] += 1
-            
-            # HTTPメソッド
-            method = entry.get('method', 'unknown')
-            methods[method] += 1
-            
-            # ページ（静的ファイルを除外）
-            path = entry.get('path_clean', entry.get('path', 'unknown'))
-            if not self._is_static_file(path):
-                pages[path] += 1
-            
-            # IPアドレス
-            ip = entry.get('ip', 'unknown')
-            ips[ip] += 1
-            
-            # エラー（4xx, 5xx）
-            if status.startswith(('4', '5')):
-                error_key = f"{status} {path}"
-                errors[error_key] += 1
-            
-            # ボットアクセス検出
-            ua = entry.get('user_agent', 'unknown')
-            if self._is_bot_user_agent(ua):
-                bot_requests += 1
-            
-            # 管理画面アクセス検出
-            if self._is_admin_path(path):
-                admin_requests += 1
-            
-            # 静的ファイルアクセス検出
-            if self._is_static_file(path):
-                static_requests += 1
-            
-            # 時間別統計
-            dt = entry['parsed_datetime']
-            hour_key = dt.strftime('%H')  # 00-23の形式
-            day_key = dt.strftime('%Y-%m-%d')
-            hourly_stats[hour_key] += 1
-            daily_stats[day_key] += 1
-            
-            # ユーザーエージェント
-            if ua != 'unknown':
-                user_agents[ua] += 1
-            
-            # リファラー
-            referer = entry.get('referer', 'unknown')
-            if referer and referer not in ['unknown', '-']:
-                referers[referer] += 1
-        
-        # 結果を統計として保存
-        self.stats = {
-            'total_requests': total_requests,
-            'unique_ips': unique_ips,
-            'bot_requests': bot_requests,
-            'admin_requests': admin_requests,
-            'static_requests': static_requests,
-            'status_codes': dict(status_codes.most_common()),
-            'methods': dict(methods.most_common()),
-            'top_pages': dict(pages.most_common(20)),
-            'top_ips': dict(ips.most_common(20)),
-            'errors': dict(errors.most_common(20)),
-            'hourly_stats': dict(hourly_stats),
-            'daily_stats': dict(daily_stats),
-            'user_agents': dict(user_agents.most_common(10)),
-            'referers': dict(referers.most_common(10)),
-            'analysis_period': {
-                'start': start_time.isoformat() if start_time else None,
-                'end': end_time.isoformat() if end_time else None,
-                'duration': str(end_time - start_time) if timestamps else '0 minutes'
-            }
-        }
+        # ステータスコード
+        status = entry.get('status', 'unknown')
+        accumulator.status_codes[status] += 1
+        
+        # HTTPメソッド
+        accumulator.methods[entry.get('method', 'unknown')] += 1
+        
+        # ページ（静的ファイルを除外）
+        path = entry.get('path_clean', entry.get('path', 'unknown'))
+        is_static = self._is_static_file(path)
+        if is_static:
+            accumulator.static_requests += 1
+        else:
+            accumulator.pages[path] += 1
+        
+        # IPアドレス
+        accumulator.ips[entry.get('ip', 'unknown')] += 1
+        
+        # エラー（4xx, 5xx）
+        if status.startswith(('4', '5')):
+            accumulator.errors[f"{status} {path}"] += 1
+        
+        # ボットアクセス検出
+        ua = entry.get('user_agent', 'unknown')
+        if self._is_bot_user_agent(ua):
+            accumulator.bot_requests += 1
+        
+        # 管理画面アクセス検出
+        if self._is_admin_path(path):
+            accumulator.admin_requests += 1
+        
+        # 時間別統計・期間
+        dt = entry['parsed_datetime']
+        if dt:
+            accumulator.hourly_stats[dt.strftime('%H')] += 1  # 00-23の形式
+            accumulator.daily_stats[dt.strftime('%Y-%m-%d')] += 1
+            if accumulator.start_time is None or dt < accumulator.start_time:
+                accumulator.start_time = dt
+            if accumulator.end_time is None or dt > accumulator.end_time:
+                accumulator.end_time = dt
+        
+        # ユーザーエージェント
+        if ua != 'unknown':
+            accumulator.user_agents[ua] += 1
+        
+        # リファラー
+        referer = entry.get('referer', 'unknown')
+        if referer and referer not in ['unknown', '-']:
+            accumulator.referers[referer] += 1
+        
+        # 構造化ログのみの項目（エンドポイント・処理時間・キャッシュ状態）
+        if entry.get('endpoint'):
+            accumulator.endpoints[entry['endpoint']] += 1
+        if entry.get('duration_ms') is not None:
+            accumulator.add_duration(entry['duration_ms'])
+        if entry.get('cache'):
+            accumulator.cache_status[entry['cache']] += 1
     
     def generate_report(self):
         """
@@ -431,18 +515,7 @@ class AccessLogAnalyzer:
         """
         ユーザーエージェントがボットかどうかを判定
         """
-        if not user_agent or user_agent == 'unknown':
-            return False
-        
-        bot_keywords = [
-            'bot', 'crawler', 'spider', 'scraper', 'wget', 'curl',
-            'googlebot', 'bingbot', 'slurp', 'facebookexternalhit',
-            'twitterbot', 'linkedinbot', 'whatsapp', 'telegram',
-            'python-requests', 'java/', 'okhttp', 'apache-httpclient'
-        ]
-        
-        ua_lower = user_agent.lower()
-        return any(keyword in ua_lower for keyword in bot_keywords)
+        return classify_user_agent(user_agent).is_bot
     
     def _is_admin_path(self, path):
         """
@@ -474,15 +547,22 @@ class AccessLogAnalyzer:
         path_lower = path.lower()
         return any(path_lower.endswith(ext) for ext in static_extensions) or '/static/' in path_lower
     
+    def _user_agent_counts(self):
+        """
+        ブラウザ・OS集計用のユーザーエージェント別件数（上位10件に限らず全件）
+        """
+        if self._accumulator is not None:
+            return self._accumulator.user_agents
+        return self.stats['user_agents']
+    
     def _extract_browsers(self):
         """
         ユーザーエージェントからブラウザ情報を抽出
         """
         browser_counts = Counter()
         
-        for ua in self.stats['user_agents'].keys():
-            browser = self._parse_browser(ua)
-            browser_counts[browser] += self.stats['user_agents'][ua]
+        for ua, count in self._user_agent_counts().items():
+            browser_counts[self._parse_browser(ua)] += count
         
         return dict(browser_counts.most_common(10))
     
@@ -492,9 +572,8 @@ class AccessLogAnalyzer:
         """
         os_counts = Counter()
         
-        for ua in self.stats['user_agents'].keys():
-            os = self._parse_os(ua)
-            os_counts[os] += self.stats['user_agents'][ua]
+        for ua, count in self._user_agent_counts().items():
+            os_counts[self._parse_os(ua)] += count
         
         return dict(os_counts.most_common(10))
     
@@ -502,118 +581,182 @@ class AccessLogAnalyzer:
         """
         ユーザーエージェントからブラウザ名を抽出
         """
-        if not user_agent or user_agent == 'unknown':
-            return 'Unknown'
-        
-        ua_lower = user_agent.lower()
-        
-        # より正確なブラウザ判定（順序重要）
-        if 'edg/' in ua_lower or 'edge/' in ua_lower:
-            return 'Edge'
-        elif 'opr/' in ua_lower or 'opera' in ua_lower:
-            return 'Opera'
-        elif 'firefox' in ua_lower:
-            return 'Firefox'
-        elif 'chrome' in ua_lower:
-            return 'Chrome'
-        elif 'safari' in ua_lower:
-            return 'Safari'
-        elif 'msie' in ua_lower or 'trident' in ua_lower:
-            return 'Internet Explorer'
-        else:
-            return 'Other'
+        return classify_user_agent(user_agent).browser
     
     def _parse_os(self, user_agent):
         """
         ユーザーエージェントからOS名とバージョンを抽出
         """
-        if not user_agent or user_agent == 'unknown':
-            return 'Unknown'
-        
-        ua_lower = user_agent.lower()
-        
-        # Windows詳細バージョン検出
-        if 'windows' in ua_lower:
-            if 'windows nt 10.0' in ua_lower:
-                return 'Windows 10/11'
-            elif 'windows nt 6.3' in ua_lower:
-                return 'Windows 8.1'
-            elif 'windows nt 6.2' in ua_lower:
-                return 'Windows 8'
-            elif 'windows nt 6.1' in ua_lower:
-                return 'Windows 7'
-            elif 'windows nt 6.0' in ua_lower:
-                return 'Windows Vista'
-            else:
-                return 'Windows (Other)'
-        
-        # macOS詳細バージョン検出
-        elif 'macintosh' in ua_lower or 'mac os' in ua_lower:
-            import re
-            # "Mac OS X 10_15_7" のようなパターンを検出
-            mac_version_match = re.search(r'mac os x (\d+)_(\d+)(?:_(\d+))?', ua_lower)
-            if mac_version_match:
-                major = int(mac_version_match.group(1))
-                minor = int(mac_version_match.group(2))
-                patch = mac_version_match.group(3) if mac_version_match.group(3) else '0'
-                
-                # macOSのコードネーム付きバージョン名
-                if major == 10:
-                    if minor >= 15:
-                        return f'macOS Catalina (10.{minor}.{patch})'
-                    elif minor == 14:
-                        return f'macOS Mojave (10.{minor}.{patch})'
-                    elif minor == 13:
-                        return f'macOS High Sierra (10.{minor}.{patch})'
-                    elif minor == 12:
-                        return f'macOS Sierra (10.{minor}.{patch})'
-                    elif minor == 11:
-                        return f'macOS El Capitan (10.{minor}.{patch})'
-                    else:
-                        return f'macOS (10.{minor}.{patch})'
-                elif major >= 11:
-                    return f'macOS {major}.{minor}.{patch}'
-                else:
-                    return f'macOS {major}.{minor}.{patch}'
-            else:
-                return 'macOS (Version Unknown)'
-        
-        # Linux詳細検出
-        elif 'linux' in ua_lower:
-            if 'ubuntu' in ua_lower:
-                return 'Ubuntu Linux'
-            elif 'fedora' in ua_lower:
-                return 'Fedora Linux'
-            elif 'centos' in ua_lower:
-                return 'CentOS Linux'
-            elif 'debian' in ua_lower:
-                return 'Debian Linux'
-            else:
-                return 'Linux'
-        
-        # Android詳細バージョン検出
-        elif 'android' in ua_lower:
-            import re
-            android_version_match = re.search(r'android (\d+(?:\.\d+)?)', ua_lower)
-            if android_version_match:
-                version = android_version_match.group(1)
-                return f'Android {version}'
-            else:
-                return 'Android'
-        
-        # iOS詳細バージョン検出
-        elif 'ios' in ua_lower or 'iphone' in ua_lower or 'ipad' in ua_lower:
-            import re
-            ios_version_match = re.search(r'os (\d+)_(\d+)(?:_(\d+))?', ua_lower)
-            if ios_version_match:
-                major = ios_version_match.group(1)
-                minor = ios_version_match.group(2)
-                patch = ios_version_match.group(3) if ios_version_match.group(3) else '0'
-                device = 'iPad' if 'ipad' in ua_lower else 'iPhone'
-                return f'iOS {major}.{minor}.{patch} ({device})'
+        return classify_user_agent(user_agent).os
+
+
+def _analyze_chunk(path, start, end):
+    """
+    ファイルの[start, end)の範囲に開始する行を集計（プロセスプールから呼ばれる）
+    end=Noneの場合はファイル全体（gzip対応）を集計する
+    """
+    analyzer = AccessLogAnalyzer(path)
+    accumulator = LogStatsAccumulator()
+    
+    if end is None:
+        lines = analyzer._iter_lines([path])
+    else:
+        lines = _iter_chunk_lines(path, start, end)
+    
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        entry = analyzer._parse_log_line(line)
+        if entry:
+            analyzer._accumulate_entry(accumulator, entry)
+    return accumulator
+
+
+def _iter_chunk_lines(path, start, end):
+    """
+    [start, end)の範囲に開始する行を返す（範囲をまたぐ行は開始側のチャンクで読む）
+    """
+    with open(path, 'rb') as f:
+        if start > 0:
+            # 直前の改行まで読み飛ばし、チャンク先頭の途中行を除外
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            raw_line = f.readline()
+            if not raw_line:
+                break
+            yield raw_line.decode('utf-8', errors='ignore')
+
+
+class LogStatsAccumulator:
+    """
+    アクセスログの集計結果（エントリ自体は保持せず、カウンタのみを持つ）
+    複数の集計結果はmergeで結合できる
+    """
+    
+    SCALAR_FIELDS = ('total_requests', 'bot_requests', 'admin_requests', 'static_requests', 'duration_total')
+    COUNTER_FIELDS = ('status_codes', 'methods', 'pages', 'ips', 'errors', 'hourly_stats', 'daily_stats',
+                      'user_agents', 'referers', 'endpoints', 'cache_status', 'durations')
+    # 件数の上限を設けて保存しても集計値が変わらないよう、常に全キーを保存するカウンタ
+    EXACT_COUNTER_FIELDS = ('status_codes', 'methods', 'ips', 'hourly_stats', 'daily_stats', 'cache_status', 'durations')
+    
+    def __init__(self):
+        self.total_requests = 0
+        self.bot_requests = 0
+        self.admin_requests = 0
+        self.static_requests = 0
+        self.status_codes = Counter()
+        self.methods = Counter()
+        self.pages = Counter()
+        self.ips = Counter()
+        self.errors = Counter()
+        self.hourly_stats = Counter()
+        self.daily_stats = Counter()
+        self.user_agents = Counter()
+        self.referers = Counter()
+        self.endpoints = Counter()
+        self.cache_status = Counter()
+        self.durations = Counter()  # ミリ秒（整数）ごとの件数
+        self.duration_total = 0.0
+        self.start_time = None
+        self.end_time = None
+    
+    def add_duration(self, duration_ms):
+        """処理時間を加算（ミリ秒単位のヒストグラムで保持）"""
+        self.durations[int(duration_ms)] += 1
+        self.duration_total += duration_ms
+    
+    def merge(self, other):
+        """別の集計結果を加算"""
+        for name in self.SCALAR_FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name in self.COUNTER_FIELDS:
+            getattr(self, name).update(getattr(other, name))
+        if other.start_time and (self.start_time is None or other.start_time < self.start_time):
+            self.start_time = other.start_time
+        if other.end_time and (self.end_time is None or other.end_time > self.end_time):
+            self.end_time = other.end_time
+        return self
+    
+    def to_dict(self, max_keys=None):
+        """
+        JSON保存用の辞書に変換
+        :param max_keys: 指定時はページ・UA等のカウンタで件数の多い上位のキーのみ残す（保存サイズの上限）
+        """
+        data = {name: getattr(self, name) for name in self.SCALAR_FIELDS}
+        for name in self.COUNTER_FIELDS:
+            counter = getattr(self, name)
+            if max_keys and name not in self.EXACT_COUNTER_FIELDS:
+                items = counter.most_common(max_keys)
             else:
-                device = 'iPad' if 'ipad' in ua_lower else 'iPhone'
-                return f'iOS ({device})'
-        
-        else:
-            return 'Other'
\ No newline at end of file
+                items = counter.items()
+            data[name] = {str(key): count for key, count in items}
+        data['start_time'] = self.start_time.isoformat() if self.start_time else None
+        data['end_time'] = self.end_time.isoformat() if self.end_time else None
+        return data
+    
+    @classmethod
+    def from_dict(cls, data):
+        """to_dictで保存した辞書から復元"""
+        accumulator = cls()
+        for name in cls.SCALAR_FIELDS:
+            setattr(accumulator, name, data.get(name, 0))
+        for name in cls.COUNTER_FIELDS:
+            setattr(accumulator, name, Counter(data.get(name, {})))
+        accumulator.durations = Counter({int(key): count for key, count in accumulator.durations.items()})
+        if data.get('start_time'):
+            accumulator.start_time = datetime.fromisoformat(data['start_time'])
+        if data.get('end_time'):
+            accumulator.end_time = datetime.fromisoformat(data['end_time'])
+        return accumulator
+    
+    def _summarize_durations(self):
+        """処理時間（ミリ秒）の集計"""
+        count = sum(self.durations.values())
+        if not count:
+            return {}
+        
+        # ヒストグラムから95パーセンタイルを求める
+        threshold = min(count - 1, int(count * 0.95))
+        seen = 0
+        p95 = 0
+        for duration in sorted(self.durations):
+            seen += self.durations[duration]
+            if seen > threshold:
+                p95 = duration
+                break
+        return {
+            'count': count,
+            'avg_ms': round(self.duration_total / count, 2),
+            'p95_ms': p95,
+            'max_ms': max(self.durations)
+        }
+    
+    def to_stats(self):
+        """AccessLogAnalyzer.statsと同じ形式の辞書に変換"""
+        has_period = self.start_time is not None
+        return {
+            'total_requests': self.total_requests,
+            'unique_ips': len(self.ips),
+            'bot_requests': self.bot_requests,
+            'admin_requests': self.admin_requests,
+            'static_requests': self.static_requests,
+            'status_codes': dict(self.status_codes.most_common()),
+            'methods': dict(self.methods.most_common()),
+            'top_pages': dict(self.pages.most_common(20)),
+            'top_ips': dict(self.ips.most_common(20)),
+            'errors': dict(self.errors.most_common(20)),
+            'hourly_stats': dict(self.hourly_stats),
+            'daily_stats': dict(self.daily_stats),
+            'user_agents': dict(self.user_agents.most_common(10)),
+            'referers': dict(self.referers.most_common(10)),
+            'endpoints': dict(self.endpoints.most_common(20)),
+            'cache_status': dict(self.cache_status),
+            'response_time': self._summarize_durations(),
+            'analysis_period': {
+                'start': self.start_time.isoformat() if has_period else None,
+                'end': self.end_time.isoformat() if has_period else None,
+                'duration': str(self.end_time - self.start_time) if has_period else '0 minutes'
+            }
+        }
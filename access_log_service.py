@@ -0,0 +1,233 @@
+"""
+アクセスログ集計サービス
+前回集計した位置（inode・バイトオフセット）以降の新しい行だけを読み、時間別・日別の集計に加算する
+（既存のログは flask rebuild-access-log-rollups で先頭から取り込む）
+"""
+import os
+import json
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, delete, update
+from sqlalchemy.exc import IntegrityError
+from models import db, AccessLogCheckpoint, AccessLogRollup
+from access_log_analyzer import AccessLogAnalyzer, LogStatsAccumulator
+
+# 1回の更新で読む最大バイト数（初回の巨大ログでも管理画面の応答を保つため）
+ROLLUP_MAX_BYTES_PER_RUN = 64 * 1024 * 1024
+# 1つの集計に保存するキー数の上限（ページ・UA・リファラーなど）
+ROLLUP_MAX_KEYS = 500
+# 時間別集計の保持日数（日別集計は無期限）
+HOURLY_ROLLUP_RETENTION_DAYS = 30
+# 分析対象として探すログファイル
+LOG_FILE_PATTERNS = ['flask.log', 'server.log', 'access.log', 'app.log', 'test_access.log']
+# アプリが書き込むテキスト形式のアクセスログ（構造化ログと同じリクエストを記録している）
+PLAIN_ACCESS_LOG_FILES = ['access.log', 'test_access.log']
+
+
+class AccessLogService:
+    """アクセスログ集計サービスクラス"""
+
+    @staticmethod
+    def find_log_files():
+        """
+        分析対象のログファイルを列挙（先頭が主ログ）
+        構造化ログ（JSON Lines）が有効な場合は同じリクエストを記録したテキスト形式のアクセスログを除外する
+        """
+        patterns = list(LOG_FILE_PATTERNS)
+        structured_writer = current_app.extensions.get('structured_access_log_writer')
+        if structured_writer:
+            writer = current_app.extensions.get('access_log_writer')
+            plain_logs = {os.path.abspath(path) for path in PLAIN_ACCESS_LOG_FILES}
+            if writer:
+                plain_logs.add(os.path.abspath(writer.path))
+            patterns = [structured_writer.path] + [
+                path for path in patterns if os.path.abspath(path) not in plain_logs
+            ]
+
+        log_files = [path for path in patterns if os.path.exists(path)]
+
+        # nginxのアクセスログ（ローテーション済みファイルは分析時に自動で含める）
+        nginx_log = os.path.join(os.environ.get('NGINX_LOG_DIR', '/var/log/nginx'), 'access.log')
+        if os.path.exists(nginx_log):
+            log_files.append(nginx_log)
+        return log_files
+
+    @staticmethod
+    def update_rollups(log_file, max_bytes=ROLLUP_MAX_BYTES_PER_RUN, seed_at_eof=True):
+        """
+        前回のチェックポイント以降に追記された行を集計に加算（処理した行数を返す）
+        チェックポイントが無い場合、seed_at_eof=Trueなら現在の末尾から集計を始める（既存の行は rebuild_rollups で取り込む）
+        同時に実行された場合もチェックポイントの行ロックと位置の比較更新により同じ行を二重に加算しない
+        """
+        try:
+            log_path = os.path.abspath(log_file)
+            stat = os.stat(log_file)
+            AccessLogService._ensure_checkpoint(log_path, stat, seed_at_eof)
+
+            checkpoint = db.session.execute(
+                select(AccessLogCheckpoint.inode, AccessLogCheckpoint.offset)
+                .where(AccessLogCheckpoint.log_path == log_path)
+                .with_for_update()
+            ).one()
+            inode, offset = checkpoint.inode, checkpoint.offset
+
+            analyzer = AccessLogAnalyzer(log_file)
+            buckets = {}
+            processed = 0
+
+            if inode is not None and (inode != stat.st_ino or stat.st_size < offset):
+                # ローテーションされた場合は旧ファイル（.1）の未集計部分を読み切る
+                rotated = f"{log_file}.1"
+                if os.path.exists(rotated) and os.stat(rotated).st_ino == inode:
+                    processed += AccessLogService._read_new_lines(analyzer, rotated, offset, None, buckets)[0]
+                offset = 0
+
+            count, offset = AccessLogService._read_new_lines(analyzer, log_file, offset, max_bytes, buckets)
+            processed += count
+
+            # 読み始めた位置から他のワーカーが進めていない場合のみ位置を更新（行ロックが効かないSQLite向け）
+            result = db.session.execute(
+                update(AccessLogCheckpoint)
+                .where(
+                    AccessLogCheckpoint.log_path == log_path,
+                    AccessLogCheckpoint.offset == checkpoint.offset,
+                    AccessLogCheckpoint.inode.is_not_distinct_from(checkpoint.inode)
+                )
+                .values(inode=stat.st_ino, offset=offset, updated_at=datetime.utcnow())
+            )
+            if result.rowcount != 1:
+                db.session.rollback()
+                return 0
+
+            AccessLogService._save_rollups(log_path, buckets)
+            AccessLogService._prune_hourly_rollups(log_path)
+            db.session.commit()
+            return processed
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"アクセスログ集計エラー: {str(e)}")
+            return 0
+
+    @staticmethod
+    def rebuild_rollups(log_file):
+        """保存済みの集計を破棄し、ログファイルの先頭から集計し直す（処理した行数を返す）"""
+        log_path = os.path.abspath(log_file)
+        try:
+            db.session.execute(delete(AccessLogRollup).where(AccessLogRollup.source == log_path))
+            db.session.execute(delete(AccessLogCheckpoint).where(AccessLogCheckpoint.log_path == log_path))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"アクセスログ集計の初期化エラー: {str(e)}")
+            return 0
+        return AccessLogService.update_rollups(log_file, max_bytes=None, seed_at_eof=False)
+
+    @staticmethod
+    def _ensure_checkpoint(log_path, stat, seed_at_eof):
+        """チェックポイントが無ければ作成（同時に作成された場合は既存のものを使う）"""
+        exists = db.session.execute(
+            select(AccessLogCheckpoint.id).where(AccessLogCheckpoint.log_path == log_path)
+        ).first()
+        if exists:
+            return
+        if seed_at_eof:
+            checkpoint = AccessLogCheckpoint(log_path=log_path, inode=stat.st_ino, offset=stat.st_size)
+        else:
+            checkpoint = AccessLogCheckpoint(log_path=log_path, inode=None, offset=0)
+        db.session.add(checkpoint)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+    @staticmethod
+    def _read_new_lines(analyzer, path, offset, max_bytes, buckets):
+        """offset以降の完結した行を時間別に集計（処理行数と次回のoffsetを返す）"""
+        count = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            read_bytes = 0
+            for raw_line in f:
+                # 書き込み途中の行は次回に回す
+                if not raw_line.endswith(b'\n'):
+                    break
+                offset += len(raw_line)
+                read_bytes += len(raw_line)
+
+                line = raw_line.decode('utf-8', errors='ignore').strip()
+                if line:
+                    entry = analyzer._parse_log_line(line)
+                    if entry and entry.get('parsed_datetime'):
+                        hour_start = entry['parsed_datetime'].replace(minute=0, second=0, microsecond=0)
+                        if hour_start not in buckets:
+                            buckets[hour_start] = LogStatsAccumulator()
+                        analyzer._accumulate_entry(buckets[hour_start], entry)
+                        count += 1
+
+                if max_bytes and read_bytes >= max_bytes:
+                    break
+        return count, offset
+
+    @staticmethod
+    def _save_rollups(source, buckets):
+        """時間別の集計を既存の時間別・日別集計に加算して保存"""
+        daily = {}
+        for hour_start, accumulator in buckets.items():
+            AccessLogService._merge_rollup(source, 'hour', hour_start, accumulator)
+            day_start = hour_start.replace(hour=0)
+            if day_start not in daily:
+                daily[day_start] = LogStatsAccumulator()
+            daily[day_start].merge(accumulator)
+
+        for day_start, accumulator in daily.items():
+            AccessLogService._merge_rollup(source, 'day', day_start, accumulator)
+
+    @staticmethod
+    def _merge_rollup(source, period, period_start, accumulator):
+        """1期間分の集計を加算"""
+        rollup = db.session.execute(
+            select(AccessLogRollup).where(
+                AccessLogRollup.source == source,
+                AccessLogRollup.period == period,
+                AccessLogRollup.period_start == period_start
+            )
+        ).scalar_one_or_none()
+        if rollup:
+            accumulator = LogStatsAccumulator.from_dict(json.loads(rollup.data)).merge(accumulator)
+        else:
+            rollup = AccessLogRollup(source=source, period=period, period_start=period_start)
+            db.session.add(rollup)
+        rollup.data = json.dumps(accumulator.to_dict(max_keys=ROLLUP_MAX_KEYS), ensure_ascii=False)
+
+    @staticmethod
+    def _prune_hourly_rollups(source):
+        """保持期間を過ぎた時間別集計を削除"""
+        threshold = datetime.now() - timedelta(days=HOURLY_ROLLUP_RETENTION_DAYS)
+        db.session.execute(
+            delete(AccessLogRollup).where(
+                AccessLogRollup.source == source,
+                AccessLogRollup.period == 'hour',
+                AccessLogRollup.period_start < threshold
+            )
+        )
+
+    @staticmethod
+    def get_report(log_file, days=7):
+        """直近days日分の日別集計を結合してレポートを生成"""
+        since = (datetime.now() - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        rollups = db.session.execute(
+            select(AccessLogRollup).where(
+                AccessLogRollup.source == os.path.abspath(log_file),
+                AccessLogRollup.period == 'day',
+                AccessLogRollup.period_start >= since
+            ).order_by(AccessLogRollup.period_start)
+        ).scalars().all()
+
+        accumulator = LogStatsAccumulator()
+        for rollup in rollups:
+            accumulator.merge(LogStatsAccumulator.from_dict(json.loads(rollup.data)))
+
+        analyzer = AccessLogAnalyzer(log_file)
+        analyzer.load_accumulator(accumulator)
+        return analyzer.generate_report()
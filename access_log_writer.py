@@ -0,0 +1,164 @@
+"""
+アクセスログ非同期書き込みモジュール
+リクエスト処理からはキューに積むだけにし、バックグラウンドスレッドでまとめてファイルに書き込む
+"""
+import os
+import time
+import queue
+import atexit
+import threading
+
+
+class AccessLogWriter:
+    """アクセスログの非同期バッファ書き込み（サイズ・時間ベースのローテーション対応）"""
+
+    def __init__(self, path='access.log', max_bytes=10 * 1024 * 1024, backup_count=5,
+                 rotate_interval=24 * 60 * 60, queue_size=10000, batch_size=500, flush_interval=1.0):
+        """
+        初期化
+        :param path: 書き込み先ログファイルパス
+        :param max_bytes: このサイズを超えたらローテーション（0で無効）
+        :param backup_count: 保持する世代数（access.log.1 〜 access.log.N）
+        :param rotate_interval: この秒数を経過したらローテーション（0で無効）
+        :param queue_size: キューの上限（超過分は破棄して件数をカウント）
+        :param batch_size: 1回の書き込みでまとめる最大行数
+        :param flush_interval: キューが空の場合にファイルをフラッシュする間隔（秒）
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stream = None
+        self._rollover_at = None
+
+        self.dropped_count = 0
+        self.written_count = 0
+        self.error_count = 0
+
+    def write(self, line):
+        """ログ行をキューに追加（ブロックしない。キューが満杯なら破棄してFalseを返す）"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            self.dropped_count += 1
+            return False
+
+    def get_stats(self):
+        """書き込み状況の統計を取得"""
+        return {
+            'path': self.path,
+            'queued': self._queue.qsize(),
+            'queue_size': self._queue.maxsize,
+            'written': self.written_count,
+            'dropped': self.dropped_count,
+            'errors': self.error_count,
+        }
+
+    def flush(self, timeout=5.0):
+        """キュー内のログがすべて書き込まれるまで待機"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _ensure_started(self):
+        """書き込みスレッドを起動（fork後の子プロセス、またはスレッドが停止している場合は起動し直す）"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # fork元のスレッドは引き継がれないため状態を作り直す
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._stream = None
+                atexit.register(self.flush)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """キューからログを取り出してまとめて書き込む"""
+        while True:
+            try:
+                line = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # 時間ベースのローテーションはアクセスがない間も判定する
+                try:
+                    self._rollover_if_needed()
+                except Exception:
+                    self.error_count += 1
+                    self._close_stream()
+                continue
+
+            batch = [line]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(batch)
+                self.written_count += len(batch)
+            except Exception:
+                self.error_count += len(batch)
+                self._close_stream()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        """複数行をまとめて書き込み"""
+        self._rollover_if_needed()
+        stream = self._open_stream()
+        stream.write(''.join(line + '\n' for line in batch))
+        stream.flush()
+
+    def _open_stream(self):
+        """ログファイルを開く（既に開いていればそのまま返す）"""
+        if self._stream is None:
+            self._stream = open(self.path, 'a', encoding='utf-8')
+            if self.rotate_interval:
+                # 既存ファイルは最終更新時刻を起点にする（TimedRotatingFileHandlerと同様）
+                started_at = os.path.getmtime(self.path) if self._stream.tell() else time.time()
+                self._rollover_at = started_at + self.rotate_interval
+        return self._stream
+
+    def _close_stream(self):
+        """ログファイルを閉じる"""
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except OSError:
+                pass
+            self._stream = None
+
+    def _rollover_if_needed(self):
+        """サイズ・経過時間に応じてローテーション"""
+        stream = self._open_stream()
+        size_exceeded = self.max_bytes and stream.tell() >= self.max_bytes
+        time_exceeded = self._rollover_at is not None and time.time() >= self._rollover_at
+        if stream.tell() and (size_exceeded or time_exceeded):
+            self._do_rollover()
+
+    def _do_rollover(self):
+        """access.log → access.log.1 → ... → access.log.N の順に世代をずらす"""
+        self._close_stream()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            open(self.path, 'w').close()
+        self._open_stream()
@@ -16,6 +16,8 @@ from forms import CategoryForm, ArticleForm, GoogleAnalyticsForm, ProjectForm, S
 
 # 新しいサービスクラスをインポート
 from article_service import ArticleService, CategoryService, ImageProcessingService, UserService
+from search_index_service import SearchIndexService, bump_content_version
+from related_article_service import RelatedArticleService
 
 # 環境変数で管理画面URLをカスタマイズ可能
 ADMIN_URL_PREFIX = os.environ.get('ADMIN_URL_PREFIX', 'admin')
@@ -859,11 +861,14 @@ def delete_user(user_id):
     try:
         # 関連記事の処理
         user_articles = db.session.execute(select(Article).where(Article.author_id == user.id)).scalars().all()
+        articles_deleted = False
         if user_articles:
             action = request.form.get('article_action', 'keep')
             if action == 'delete':
                 for article in user_articles:
+                    SearchIndexService.remove_document('article', article.id)
                     db.session.delete(article)
+                    articles_deleted = True
             elif action == 'transfer':
                 transfer_to_id = request.form.get('transfer_to_user')
                 if transfer_to_id:
@@ -872,6 +877,8 @@ def delete_user(user_id):
         
         db.session.delete(user)
         db.session.commit()
+        if articles_deleted:
+            RelatedArticleService.schedule_rebuild()
         flash(f'ユーザー「{user.name}」を削除しました。', 'success')
     except Exception as e:
         db.session.rollback()
@@ -1084,8 +1091,7 @@ def create_article():
         if article:
             # プロジェクト関連付けを保存
             if form.related_projects.data:
-                import json
-                article.project_ids = json.dumps(form.related_projects.data)
+                article.set_projects(form.related_projects.data)
                 db.session.commit()
             
             flash('記事が作成されました。', 'success')
@@ -1134,12 +1140,7 @@ def edit_article(article_id):
     
     # 現在のプロジェクト関連を設定
     if article.project_ids:
-        try:
-            import json
-            project_ids = json.loads(article.project_ids)
-            form.related_projects.data = project_ids
-        except:
-            pass
+        form.related_projects.data = article.project_ids
     
     if form.validate_on_submit():
         # 重要: HTTPリクエストの値を直接フォームに反映（obj=articleで古い値が設定されている問題を解決）
@@ -1204,11 +1205,7 @@ def edit_article(article_id):
             
             if updated_article:
                 # プロジェクト関連付けを更新
-                import json
-                if form.related_projects.data:
-                    article.project_ids = json.dumps(form.related_projects.data)
-                else:
-                    article.project_ids = None
+                article.set_projects(form.related_projects.data)
                 db.session.commit()
                 
                 flash('記事が更新されました。', 'success')
@@ -1241,8 +1238,10 @@ def toggle_article_status(article_id):
         article.is_published = new_status
         if new_status and not was_published:
             article.published_at = datetime.utcnow()
+        SearchIndexService.index_article(article)
         
         db.session.commit()
+        RelatedArticleService.schedule_rebuild()
         
         status_text = '公開' if new_status else '下書き'
         current_app.logger.info(f'Article {article.id} status changed to {status_text}')
@@ -1264,8 +1263,10 @@ def delete_article(article_id):
     
     try:
         # SQLAlchemyのCASCADE設定により関連データも自動削除される
+        SearchIndexService.remove_document('article', article.id)
         db.session.delete(article)
         db.session.commit()
+        RelatedArticleService.schedule_rebuild()
         flash(f'記事「{article_title}」を削除しました。', 'success')
         current_app.logger.info(f"Article deleted successfully: {article_id}")
     except Exception as e:
@@ -1387,6 +1388,7 @@ def create_category():
                     flash('OGP画像の処理中にエラーが発生しました。', 'warning')
                     # 画像処理エラーでもカテゴリ作成は続行
             
+            bump_content_version()
             db.session.commit()
             flash('カテゴリが作成されました。', 'success')
             return redirect(url_for('admin.categories'))
@@ -1455,6 +1457,7 @@ def edit_category(category_id):
                     flash('OGP画像の処理中にエラーが発生しました。', 'warning')
                     # 画像処理エラーでもカテゴリ情報は保存を続行
             
+            bump_content_version()
             db.session.commit()
             flash('カテゴリが正常に更新されました。', 'success')
             return redirect(url_for('admin.categories'))
@@ -1489,6 +1492,7 @@ def delete_category(category_id):
             article.categories.remove(category)
         
         db.session.delete(category)
+        bump_content_version()
         db.session.commit()
         flash(f'カテゴリ「{category.name}」を削除しました。', 'success')
     except Exception as e:
@@ -1523,6 +1527,7 @@ def bulk_delete_categories():
                 db.session.delete(category)
                 deleted_count += 1
         
+        bump_content_version()
         db.session.commit()
         flash(f'{deleted_count}個のカテゴリを削除しました。', 'success')
     except Exception as e:
@@ -1706,7 +1711,13 @@ def bulk_comment_action():
 def article_preview(article_id):
     """記事プレビュー（Markdownエディタ）"""
     article = db.get_or_404(Article, article_id)
-    return render_template('article_detail.html', article=article, is_preview=True)
+    rendered = ArticleService.get_rendered_body(article)
+    return render_template('article_detail.html',
+                         article=article,
+                         processed_body=rendered['html'],
+                         table_of_contents=rendered['toc'],
+                         excerpt=rendered['excerpt'],
+                         is_preview=True)
 
 @admin_bp.route('/analytics/', methods=['GET', 'POST'])
 @admin_required
@@ -1869,26 +1880,34 @@ def analytics_settings():
 def access_logs():
     """アクセスログ分析画面"""
     from access_log_analyzer import AccessLogAnalyzer
+    from access_log_service import AccessLogService
     
     log_files = []
     reports = {}
     error_message = None
     
+    # 集計期間（日数）
+    days = min(max(request.args.get('days', 7, type=int), 1), 365)
+    
     try:
-        # 利用可能なログファイルを検索
-        log_patterns = ['flask.log', 'server.log', 'access.log', 'app.log', 'test_access.log']
-        for pattern in log_patterns:
-            if os.path.exists(pattern):
-                log_files.append(pattern)
+        # 利用可能なログファイルを検索（構造化ログとテキスト形式のログは重複して数えない）
+        log_files = AccessLogService.find_log_files()
         
         # デフォルトのログファイルを分析
         if log_files:
             primary_log = log_files[0]
-            analyzer = AccessLogAnalyzer(primary_log)
             
-            # 最新1000行のみ分析（パフォーマンス考慮）
-            stats = analyzer.analyze_logs(max_lines=1000)
-            reports[primary_log] = analyzer.generate_report()
+            # 前回以降に追記された行だけを集計に加算し、保存済みの日別集計からレポートを生成
+            AccessLogService.update_rollups(primary_log)
+            reports[primary_log] = AccessLogService.get_report(primary_log, days=days)
+            
+            # 全ファイル分析: ローテーション済み・gzipを含む全ログを分析して結合
+            # （リクエスト内では起動時に設定したプロセス数まで。大きなログは flask analyze-access-logs で分析）
+            if request.args.get('scope') == 'all':
+                analyzer = AccessLogAnalyzer.analyze_files(
+                    log_files, max_workers=current_app.config['ACCESS_LOG_ANALYSIS_WORKERS']
+                )
+                reports[f'全ログファイル（{len(log_files)}件）'] = analyzer.generate_report()
             
             current_app.logger.info(f"Access log analysis completed for {primary_log}")
         else:
@@ -1898,9 +1917,15 @@ def access_logs():
         current_app.logger.error(f"Access log analysis error: {e}")
         error_message = f"ログ分析エラー: {str(e)}"
     
+    # 非同期書き込みの状況（破棄件数など）
+    writer = current_app.extensions.get('access_log_writer')
+    writer_stats = writer.get_stats() if writer else None
+    
     return render_template('admin/access_logs.html', 
                          log_files=log_files,
                          reports=reports,
+                         writer_stats=writer_stats,
+                         days=days,
                          error_message=error_message)
 
 @admin_bp.route('/access-logs/download/<log_file>')
@@ -2323,6 +2348,8 @@ def site_settings():
                 )
                 db.session.add(sns_setting)
             
+            # 他ワーカーの設定キャッシュを無効化
+            SiteSetting.bump_version()
             db.session.commit()
             flash('サイト設定を更新しました', 'success')
             
@@ -2357,19 +2384,9 @@ def preview_markdown():
         if not markdown_text:
             return '<p class="text-muted">プレビューを表示するには本文を入力してください。</p>'
         
-        # Markdownライブラリを直接使用してHTMLに変換
-        import markdown
-        from markdown.extensions import codehilite, fenced_code, tables, toc
-        
-        md = markdown.Markdown(extensions=[
-            'codehilite',
-            'fenced_code',
-            'tables',
-            'toc',
-            'nl2br'
-        ])
-        html_content = md.convert(markdown_text)
-        return str(html_content)
+        # 記事表示と同じ設定の変換器でHTMLに変換
+        from utils import render_markdown
+        return str(render_markdown(markdown_text).html)
     except Exception as e:
         current_app.logger.error(f"Markdown preview error: {e}")
         return f'<p class="text-danger">プレビューエラー: {str(e)}</p>'
@@ -3460,6 +3477,11 @@ def create_project():
                     project.featured_image = f'uploads/projects/{filename}'
             
             db.session.add(project)
+            db.session.flush()  # IDを取得するため
+            
+            # 全文検索インデックスを更新
+            SearchIndexService.index_project(project)
+            
             db.session.commit()
             flash("プロジェクトを作成しました", "success")
             return redirect(url_for("admin.projects"))
@@ -3568,6 +3590,9 @@ def edit_project(project_id):
                     file.save(file_path)
                     project.featured_image = f'uploads/projects/{filename}'
             
+            # 全文検索インデックスを更新
+            SearchIndexService.index_project(project)
+            
             db.session.commit()
             flash("プロジェクトを更新しました", "success")
             return redirect(url_for("admin.projects"))
@@ -3592,6 +3617,7 @@ def delete_project(project_id):
         return redirect(url_for("admin.projects"))
     
     try:
+        SearchIndexService.remove_document('project', project.id)
         db.session.delete(project)
         db.session.commit()
         flash("プロジェクトを削除しました", "success")
@@ -1,8 +1,9 @@
 """
 API Blueprint - RESTful API エンドポイント
 """
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, url_for
 from models import Project, Category
+from search_suggest import suggest_index, SUGGEST_ENDPOINTS, SUGGEST_LIMIT
 import os
 import glob
 from datetime import datetime
@@ -40,6 +41,23 @@ def categories_by_challenge(challenge_id):
         } for c in categories]
     })
 
+@api_bp.route('/search/suggest')
+def search_suggest():
+    """入力中の検索語に前方一致する記事・カテゴリ・プロジェクトを返すAPI"""
+    query = request.args.get('q', '').strip()[:100]
+    limit = min(max(request.args.get('limit', SUGGEST_LIMIT, type=int), 1), 20)
+    
+    suggestions = [{
+        'type': item['type'],
+        'title': item['title'],
+        'url': url_for(SUGGEST_ENDPOINTS[item['type']], slug=item['slug'])
+    } for item in suggest_index.suggest(query, limit)]
+    
+    return jsonify({
+        'query': query,
+        'suggestions': suggestions
+    })
+
 @api_bp.route('/images/gallery')
 def images_gallery():
     """アップロード済み画像のギャラリーを返すAPI"""
@@ -1,11 +1,13 @@
-from flask import Flask, render_template, redirect, url_for, flash, session, request, current_app, abort, jsonify
+from flask import Flask, render_template, redirect, url_for, flash, session, request, current_app, abort, jsonify, g
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from flask_mail import Mail
 from flask_login import LoginManager, current_user, login_required
 from datetime import datetime, timedelta
+import click
 import os
 import time
+import json
 from dotenv import load_dotenv
 from sqlalchemy import select, func
 from admin import admin_bp
@@ -19,6 +21,7 @@ from debug import debug_bp
 from filters import register_filters
 from errors import errors_bp
 from context import register_context_processors
+from access_log_writer import AccessLogWriter
 
 # .envファイルを読み込み
 load_dotenv()
@@ -47,6 +50,11 @@ from forms import CommentForm
 
 app = Flask(__name__)
 
+# 構造化アクセスログ用に処理時間を計測
+@app.before_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+
 # セキュリティヘッダーとキャッシュ制御の統合設定
 @app.after_request
 def after_request(response):
@@ -76,12 +84,33 @@ def after_request(response):
         referrer = request.referrer or '-'
         user_agent = request.headers.get('User-Agent', '-')
         
-        # アクセスログの記録（Apache Combined Log Format風）
-        log_entry = f'{remote_addr} - - [{datetime.now().strftime("%d/%b/%Y:%H:%M:%S %z")}] "{method} {path} {protocol}" {status} {content_length} "{referrer}" "{user_agent}"'
+        now = datetime.now().astimezone()
+        
+        # アクセスログの記録（Apache Combined Log Format風、タイムゾーン付き）
+        log_entry = f'{remote_addr} - - [{now.strftime("%d/%b/%Y:%H:%M:%S %z")}] "{method} {path} {protocol}" {status} {content_length} "{referrer}" "{user_agent}"'
         
-        # access.log ファイルに記録
-        with open('access.log', 'a', encoding='utf-8') as f:
-            f.write(log_entry + '\n')
+        # キューに積むだけにし、ファイルへの書き込みはバックグラウンドで行う
+        access_log_writer.write(log_entry)
+        
+        # 構造化ログ（JSON Lines）が有効な場合は同じ内容を構造化して記録
+        if structured_access_log_writer:
+            started_at = g.get('request_started_at')
+            record = {
+                'ts': now.isoformat(timespec='milliseconds'),
+                'ip': remote_addr,
+                'method': method,
+                'path': path,
+                'query': request.query_string.decode('utf-8', 'replace'),
+                'protocol': protocol,
+                'status': status,
+                'size': response.content_length,
+                'referer': referrer,
+                'user_agent': user_agent,
+                'endpoint': request.endpoint,
+                'duration_ms': round((time.perf_counter() - started_at) * 1000, 2) if started_at else None,
+                'cache': g.get('cache_status'),
+            }
+            structured_access_log_writer.write(json.dumps(record, ensure_ascii=False))
             
     except Exception as e:
         # ログ記録エラーは無視（アプリケーションの動作に影響しないように）
@@ -132,22 +161,22 @@ else:
     app.logger.addHandler(stream_handler)
     app.logger.setLevel(logging.DEBUG)
 
-# アクセスログファイルハンドラーを追加
-import logging.handlers
-access_log_handler = logging.handlers.RotatingFileHandler(
-    'access.log', maxBytes=10*1024*1024, backupCount=5  # 10MB, 5ファイルまで
+# アクセスログ書き込み（非同期・バッチ書き込み、サイズ/時間ベースのローテーション）
+access_log_options = dict(
+    max_bytes=int(os.environ.get('ACCESS_LOG_MAX_BYTES', 10 * 1024 * 1024)),  # デフォルト: 10MB
+    backup_count=int(os.environ.get('ACCESS_LOG_BACKUP_COUNT', 5)),  # access.log.1 〜 access.log.5
+    rotate_interval=int(os.environ.get('ACCESS_LOG_ROTATE_INTERVAL', 24 * 60 * 60)),  # デフォルト: 1日
+    queue_size=int(os.environ.get('ACCESS_LOG_QUEUE_SIZE', 10000))
 )
-access_log_handler.setLevel(logging.INFO)
-access_log_formatter = logging.Formatter(
-    '%(remote_addr)s - - [%(asctime)s] "%(method)s %(path)s %(protocol)s" %(status)s %(content_length)s "%(referrer)s" "%(user_agent)s"',
-    datefmt='%d/%b/%Y:%H:%M:%S %z'
-)
-access_log_handler.setFormatter(access_log_formatter)
-
-# Flaskのアクセスログ用ロガーを作成
-access_logger = logging.getLogger('access_log')
-access_logger.addHandler(access_log_handler)
-access_logger.setLevel(logging.INFO)
+access_log_writer = AccessLogWriter(path=os.environ.get('ACCESS_LOG_PATH', 'access.log'), **access_log_options)
+app.extensions['access_log_writer'] = access_log_writer
+
+# 構造化アクセスログ（JSON Lines、任意）: パスを指定した場合のみ出力
+structured_access_log_path = os.environ.get('ACCESS_LOG_JSON_PATH', '')
+structured_access_log_writer = AccessLogWriter(path=structured_access_log_path, **access_log_options) if structured_access_log_path else None
+app.extensions['structured_access_log_writer'] = structured_access_log_writer
+# 管理画面の全ログ分析で使う最大プロセス数（1ならリクエストを処理するプロセス内で順に分析）
+app.config['ACCESS_LOG_ANALYSIS_WORKERS'] = max(int(os.environ.get('ACCESS_LOG_ANALYSIS_WORKERS', 1)), 1)
 # --- ここまで追加 ---
 
 migrate = Migrate()  # Migrate インスタンスの作成はここでもOK
@@ -171,7 +200,7 @@ def load_user(user_id):
     return db.session.get(User, int(user_id))  # SQLAlchemy 2.0 対応
 
 # ユーティリティ関数のインポート
-from utils import sanitize_html, generate_table_of_contents, add_heading_anchors, perform_search
+from utils import sanitize_html, perform_search
 # SEO/OGP関数のインポート  
 from seo import process_sns_auto_embed, process_general_url_embeds, fetch_ogp_data, generate_ogp_card, generate_article_structured_data
 
@@ -314,6 +343,59 @@ login_manager.login_message = "このページにアクセスするにはログ
 login_manager.login_message_category = "info"
 
 
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """全文検索インデックスを再構築（flask rebuild-search-index）"""
+    from search_index_service import SearchIndexService
+    counts, error = SearchIndexService.rebuild()
+    if error:
+        print(f"検索インデックスの再構築に失敗しました: {error}")
+        return
+    print(f"検索インデックスを再構築しました（記事 {counts['article']}件、プロジェクト {counts['project']}件）")
+
+
+@app.cli.command('rebuild-related-articles')
+def rebuild_related_articles_command():
+    """全公開記事の関連記事を再計算（flask rebuild-related-articles、定期実行を想定）"""
+    from related_article_service import RelatedArticleService
+    count, error = RelatedArticleService.rebuild()
+    if error:
+        print(f"関連記事の再計算に失敗しました: {error}")
+        return
+    print(f"関連記事を再計算しました（記事 {count}件）")
+
+
+@app.cli.command('rebuild-access-log-rollups')
+@click.option('--log-file', default=None, help='集計し直すログファイル（省略時は管理画面の主ログ）')
+def rebuild_access_log_rollups_command(log_file):
+    """保存済みのアクセスログ集計を破棄し、ログファイルの先頭から取り込み直す（flask rebuild-access-log-rollups）"""
+    from access_log_service import AccessLogService
+    if log_file is None:
+        log_files = AccessLogService.find_log_files()
+        if not log_files:
+            print("アクセスログファイルが見つかりません")
+            return
+        log_file = log_files[0]
+    count = AccessLogService.rebuild_rollups(log_file)
+    print(f"アクセスログの集計を作り直しました（{log_file}、{count}行）")
+
+
+@app.cli.command('analyze-access-logs')
+@click.option('--workers', type=int, default=None, help='最大プロセス数（省略時はCPUコア数）')
+@click.option('--output', default=None, help='レポートの出力先JSONファイル')
+def analyze_access_logs_command(workers, output):
+    """ローテーション済み・gzipを含む全アクセスログを並列に分析してJSONに出力（flask analyze-access-logs）"""
+    from access_log_analyzer import AccessLogAnalyzer
+    from access_log_service import AccessLogService
+    log_files = AccessLogService.find_log_files()
+    if not log_files:
+        print("アクセスログファイルが見つかりません")
+        return
+    analyzer = AccessLogAnalyzer.analyze_files(log_files, max_workers=workers)
+    output_file = analyzer.export_stats_json(output)
+    print(f"アクセスログを分析しました（{', '.join(log_files)}）: {output_file}")
+
+
 
 
 
@@ -5,20 +5,29 @@
 import os
 import re
 import io
+import json
 import base64
+import hashlib
 from PIL import Image
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from flask import current_app
-from sqlalchemy import select, func
-from models import db, Article, Category, User, article_categories
+from sqlalchemy import select, func, update, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from models import db, Article, Category, User, ArticleRenderCache, ArticleRelation, article_categories
+from search_index_service import SearchIndexService
+from related_article_service import RelatedArticleService
 from werkzeug.security import generate_password_hash
 import time
 
+# レンダリング処理を変更した場合はバージョンを上げて既存キャッシュを無効化する
+RENDER_CACHE_VERSION = '3'
+
 
 class ArticleService:
     """記事管理サービスクラス"""
-    
+
     @staticmethod
     def create_article(form_data, author_id):
         """記事作成"""
@@ -65,11 +74,22 @@ class ArticleService:
                     os.makedirs(os.path.dirname(filepath), exist_ok=True)
                     file.save(filepath)
                     article.featured_image = f"uploads/articles/{filename}"
-            
+
+            # 本文のレンダリング結果をキャッシュ
+            ArticleService.refresh_rendered_body(article)
+
+            # 全文検索インデックスを更新
+            SearchIndexService.index_article(article)
+
             # コミット
             db.session.commit()
+
+            # 埋込URLのOGP・oEmbedデータを先読み（表示時に外部取得が発生しないように）
+            ArticleService.prefetch_embeds(article)
+            # 関連記事の再計算をバックグラウンドで予約
+            RelatedArticleService.schedule_rebuild()
             return article, None
-            
+
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(f"記事作成エラー: {str(e)}")
@@ -131,9 +151,20 @@ class ArticleService:
             # 画像削除フラグがある場合
             elif form_data.get('remove_featured_image'):
                 article.featured_image = None
-            
+
+            # 本文のレンダリング結果をキャッシュ
+            ArticleService.refresh_rendered_body(article)
+
+            # 全文検索インデックスを更新
+            SearchIndexService.index_article(article)
+
             # コミット
             db.session.commit()
+
+            # 埋込URLのOGP・oEmbedデータを先読み（表示時に外部取得が発生しないように）
+            ArticleService.prefetch_embeds(article)
+            # 関連記事の再計算をバックグラウンドで予約
+            RelatedArticleService.schedule_rebuild()
             return article, None
             
         except Exception as e:
@@ -341,7 +372,10 @@ class ArticleService:
     @staticmethod
     def get_published_articles(page=1, per_page=10, challenge_id=None):
         """公開記事を取得（ページング対応）"""
-        query = Article.query.filter_by(is_published=True)
+        # 一覧テンプレートで表示するカテゴリ・関連プロジェクトをまとめて読み込む
+        query = Article.query.options(
+            selectinload(Article.categories), selectinload(Article.linked_projects)
+        ).filter_by(is_published=True)
         
         if challenge_id:
             query = query.filter_by(challenge_id=challenge_id)
@@ -353,27 +387,110 @@ class ArticleService:
     def get_article_by_slug(slug):
         """スラッグから記事を取得"""
         return Article.query.filter_by(slug=slug, is_published=True).first()
-    
+
     @staticmethod
-    def search_articles(query_string, challenge_id=None):
-        """記事検索"""
-        search_filter = db.or_(
-            Article.title.contains(query_string),
-            Article.body.contains(query_string),
-            Article.summary.contains(query_string)
-        )
-        
-        query = Article.query.filter(search_filter, Article.is_published == True)
+    def compute_body_hash(body):
+        """本文とレンダラーバージョンからキャッシュ用ハッシュを計算"""
+        source = f"{RENDER_CACHE_VERSION}:{body or ''}"
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def refresh_rendered_body(article):
+        """本文をレンダリングしてキャッシュに保存（コミットは呼び出し元で行う）"""
+        cache = article.render_cache
+        if cache is None:
+            cache = ArticleRenderCache()
+            article.render_cache = cache
+        for name, value in ArticleService.render_cache_values(article.body).items():
+            setattr(cache, name, value)
+        return cache
+
+    @staticmethod
+    def render_cache_values(body):
+        """本文をレンダリングしてキャッシュの各列の値を生成"""
+        from utils import render_markdown
+
+        # HTML・目次・抜粋を1回のMarkdown変換で生成
+        rendered = render_markdown(body)
+        return {
+            'content_hash': ArticleService.compute_body_hash(body),
+            'html': str(rendered.html),
+            'toc_json': json.dumps(rendered.toc, ensure_ascii=False) if rendered.toc else None,
+            'excerpt': rendered.excerpt,
+            'rendered_at': datetime.utcnow(),
+        }
+
+    @staticmethod
+    def prefetch_embeds(article):
+        """本文中の埋込URLのOGP・oEmbedデータを並列に取得してキャッシュ（失敗しても保存処理は継続）"""
+        try:
+            from oembed_handler import prefetch_embeds
+            cache = article.render_cache
+            return prefetch_embeds(cache.html if cache else '')
+        except Exception as e:
+            current_app.logger.warning(f"埋込データ先読みエラー: {str(e)}")
+            return 0
+
+    @staticmethod
+    def get_rendered_body(article):
+        """レンダリング済み本文・目次・抜粋を取得（未キャッシュ・本文変更時は再生成して保存）"""
+        from markupsafe import Markup
+
+        cache = article.render_cache
+        if cache is not None and cache.content_hash == ArticleService.compute_body_hash(article.body):
+            return {'html': Markup(cache.html), 'toc': cache.toc, 'excerpt': cache.excerpt or '', 'cache_hit': True}
+
+        # 旧データの遅延バックフィル
+        # 表示処理の途中で呼び出し元のセッションをコミット・ロールバックしないよう、別接続で保存する
+        values = ArticleService.render_cache_values(article.body)
+        cache = ArticleRenderCache(article_id=article.id, **values)
+        rendered = {'html': Markup(cache.html), 'toc': cache.toc, 'excerpt': cache.excerpt or '', 'cache_hit': False}
+        try:
+            with db.engine.begin() as conn:
+                result = conn.execute(
+                    update(ArticleRenderCache).where(ArticleRenderCache.article_id == article.id).values(**values)
+                )
+                if result.rowcount == 0:
+                    try:
+                        with conn.begin_nested():
+                            conn.execute(insert(ArticleRenderCache).values(article_id=article.id, **values))
+                    except IntegrityError:
+                        # 他のリクエストが同時に保存した場合はそちらを優先
+                        pass
+        except Exception as e:
+            # 保存に失敗しても表示は継続する（次回アクセス時に再試行）
+            current_app.logger.warning(f"レンダリングキャッシュ保存エラー: {str(e)}")
+        return rendered
+
+    @staticmethod
+    def search_articles(query_string, challenge_id=None, page=1, per_page=10):
+        """記事検索（全文検索インデックスから関連度順に1ページ分を取得し、ページネーションを返す）"""
+        query = Article.query.filter(Article.is_published == True)
         
         if challenge_id:
-            query = query.filter_by(challenge_id=challenge_id)
+            query = query.filter(Article.challenge_id == challenge_id)
         
-        return query.order_by(Article.published_at.desc()).all()
+        return SearchIndexService.paginate(
+            'article', query_string, query, Article,
+            fallback_columns=(Article.title, Article.body, Article.summary),
+            fallback_order=Article.published_at.desc(),
+            page=page, per_page=per_page, filter_key=challenge_id
+        )
     
     @staticmethod
     def get_related_articles(article, limit=5):
-        """関連記事を取得"""
-        # 同じカテゴリの記事を取得
+        """関連記事を取得（事前計算した関連記事一覧から1クエリで取得）"""
+        related = db.session.execute(
+            select(Article)
+            .join(ArticleRelation, ArticleRelation.related_article_id == Article.id)
+            .where(ArticleRelation.article_id == article.id, Article.is_published == True)
+            .order_by(ArticleRelation.rank)
+            .limit(limit)
+        ).scalars().all()
+        if related:
+            return related
+        
+        # 未計算の場合は同じカテゴリの記事を取得
         if article.categories:
             category_ids = [c.id for c in article.categories]
             related = Article.query.join(
@@ -407,6 +524,13 @@ class ArticleService:
             Article.published_at.desc()
         ).limit(limit).all()
     
+    @staticmethod
+    def count_published_articles():
+        """公開記事数を取得（公開一覧用。インデックスのみで数える）"""
+        return db.session.execute(
+            select(func.count(Article.id)).where(Article.is_published == True)
+        ).scalar()
+
     @staticmethod
     def get_article_stats():
         """記事統計情報を取得"""
@@ -461,8 +585,11 @@ class ArticleService:
             if article.featured_image:
                 ImageProcessingService.delete_old_image(article.featured_image)
             
+            SearchIndexService.remove_document('article', article.id)
             db.session.delete(article)
             db.session.commit()
+            # 関連記事の再計算をバックグラウンドで予約（この記事を含んでいた一覧から外す）
+            RelatedArticleService.schedule_rebuild()
             return True, None
             
         except Exception as e:
@@ -480,10 +607,13 @@ class ArticleService:
                 if article:
                     if article.featured_image:
                         ImageProcessingService.delete_old_image(article.featured_image)
+                    SearchIndexService.remove_document('article', article.id)
                     db.session.delete(article)
                     deleted += 1
             
             db.session.commit()
+            if deleted:
+                RelatedArticleService.schedule_rebuild()
             return deleted, None
             
         except Exception as e:
@@ -534,8 +664,8 @@ class ArticleService:
         ).paginate(page=page, per_page=per_page, error_out=False)
     
     @staticmethod
-    def generate_article_seo_data(article):
-        """記事のSEOデータを生成"""
+    def generate_article_seo_data(article, excerpt=None):
+        """記事のSEOデータを生成（excerpt: レンダリング済み本文の抜粋）"""
         from seo import generate_article_structured_data
         
         # メタタイトル（空の場合はデフォルト）
@@ -547,9 +677,10 @@ class ArticleService:
         elif article.summary:
             meta_description = article.summary[:160]
         else:
-            # Markdownを除去して説明を生成
-            from utils import strip_markdown
-            meta_description = strip_markdown(article.body)[:160] if article.body else ""
+            # Markdownを除去した本文抜粋から説明を生成
+            if excerpt is None:
+                excerpt = ArticleService.get_rendered_body(article)['excerpt']
+            meta_description = excerpt[:160]
         
         # 構造化データ
         structured_data = generate_article_structured_data(article)
@@ -1,13 +1,13 @@
 """
 Articles Blueprint - 記事機能
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app, g
 from flask_login import current_user, login_required
 from models import db, Article, Category, Challenge, Project, Comment, SiteSetting
 from article_service import ArticleService
 from comment_service import CommentService
 from forms import CommentForm
-from utils import process_markdown, generate_ogp_data
+from utils import generate_ogp_data
 from seo import get_static_page_seo
 from datetime import datetime
 import json
@@ -38,8 +38,8 @@ def blog(page=1, challenge_id=None):
     # チャレンジ一覧（ナビゲーション用）
     challenges = Challenge.query.order_by(Challenge.display_order.asc()).all()
     
-    # 統計情報取得
-    stats = ArticleService.get_article_stats()
+    # 公開記事数（管理画面用の統計は全件走査を含むため使わない）
+    total_articles = ArticleService.count_published_articles()
     
     # SEO設定
     seo_data = get_static_page_seo('blog')
@@ -49,7 +49,7 @@ def blog(page=1, challenge_id=None):
                          pagination=articles,
                          challenges=challenges,
                          current_challenge=challenge,
-                         total_articles=stats['published'],
+                         total_articles=total_articles,
                          seo_data=seo_data)
 
 @articles_bp.route('/article/<slug>/')
@@ -61,9 +61,11 @@ def article_detail(slug):
     if not article:
         abort(404)
     
-    # Markdownを処理してHTMLに変換
-    processed_body = process_markdown(article.body)
-    
+    # レンダリング済み本文・目次・抜粋を取得（キャッシュ利用）
+    rendered = ArticleService.get_rendered_body(article)
+    # 構造化アクセスログ用のキャッシュ状態
+    g.cache_status = 'hit' if rendered['cache_hit'] else 'miss'
+
     # 関連記事取得
     related_articles = ArticleService.get_related_articles(article, limit=5)
     
@@ -80,7 +82,7 @@ def article_detail(slug):
     comment_form = CommentForm() if comments_enabled else None
     
     # SEOデータ生成
-    seo_data = ArticleService.generate_article_seo_data(article)
+    seo_data = ArticleService.generate_article_seo_data(article, excerpt=rendered['excerpt'])
     
     # OGPデータ生成
     ogp_data = generate_ogp_data(
@@ -92,7 +94,9 @@ def article_detail(slug):
     
     return render_template('article_detail.html',
                          article=article,
-                         processed_body=processed_body,
+                         processed_body=rendered['html'],
+                         table_of_contents=rendered['toc'],
+                         excerpt=rendered['excerpt'],
                          related_articles=related_articles,
                          related_projects=related_projects,
                          approved_comments=approved_comments,
@@ -0,0 +1,75 @@
+"""
+Markdown変換器の再利用（utils.get_markdown_converter）のマイクロベンチマーク
+変換ごとに変換器を作成する場合と、スレッドごとの変換器をリセットして使い回す場合の1回あたりの時間を比較する
+
+    python benchmarks/markdown_converter.py [--number 100] [--repeat 7]
+"""
+import os
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import make_markdown_converter, get_markdown_converter  # noqa: E402
+
+# 一覧の要約・プレビュー等で変換する短い文章
+SHORT_SNIPPET = 'Flaskで**ブログ**を作る。詳しくは[こちら](https://example.com)。'
+
+
+def make_long_article(sections=60):
+    """見出し・コードブロック・表を含む長い記事（約8KB）"""
+    parts = []
+    for i in range(sections):
+        parts.append(f'## 見出し {i}\n\n本文 {i} の段落です。*強調* と `コード` を含みます。\n')
+        if i % 5 == 0:
+            parts.append('```python\ndef hello():\n    return "world"\n```\n')
+        if i % 10 == 0:
+            parts.append('| 列1 | 列2 |\n| --- | --- |\n| a | b |\n')
+    return '\n'.join(parts)
+
+
+def convert_with_new_converter(text):
+    """変更前の方式: 変換ごとに変換器を作成"""
+    return make_markdown_converter().convert(text)
+
+
+def convert_with_pooled_converter(text):
+    """変更後の方式: スレッドごとの変換器をリセットして再利用"""
+    return get_markdown_converter().convert(text)
+
+
+def measure(func, text, number, repeat):
+    """1回あたりの最短時間（ミリ秒）"""
+    func(text)  # 初回の拡張機能の読み込み等を除外
+    return min(timeit.repeat(lambda: func(text), number=number, repeat=repeat)) / number * 1000
+
+
+def run(number=100, repeat=7):
+    """各文書について (名前, 新規作成[ms], 再利用[ms]) を返す"""
+    results = []
+    for name, text in (('short snippet', SHORT_SNIPPET), ('long article', make_long_article())):
+        assert convert_with_new_converter(text) == convert_with_pooled_converter(text)
+        results.append((
+            name,
+            measure(convert_with_new_converter, text, number, repeat),
+            measure(convert_with_pooled_converter, text, number, repeat),
+        ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=100, help='1計測あたりの変換回数')
+    parser.add_argument('--repeat', type=int, default=7, help='計測回数（最短値を採用）')
+    args = parser.parse_args()
+
+    construct = min(timeit.repeat(make_markdown_converter, number=args.number, repeat=args.repeat))
+    print(f'converter construction: {construct / args.number * 1000:.3f} ms')
+    for name, new_ms, pooled_ms in run(args.number, args.repeat):
+        print(f'{name:14s} new {new_ms:.3f} ms / pooled {pooled_ms:.3f} ms '
+              f'(saving {new_ms - pooled_ms:.3f} ms, {(1 - pooled_ms / new_ms) * 100:.0f}%)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+OGP抽出（ogp_parser.parse_ogp_stream）のマイクロベンチマーク
+合成したページを8KBずつのチャンクで与え、変更前のBeautifulSoup方式（先頭64KBを読み込んで全体を解析）と
+読み込みバイト数・1回あたりの時間を比較する。計測前に両方式の抽出結果が一致することを確認する
+
+    python benchmarks/ogp_stream.py [--number 200] [--repeat 5]
+"""
+import os
+import sys
+import timeit
+import logging
+import argparse
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ogp_parser import parse_ogp_stream  # noqa: E402
+
+CHUNK_SIZE = 8192
+CONTENT_SIZE_LIMIT = 65536
+
+_ARTICLE_PARAGRAPH = '<p>Flaskとデータベースで作るポートフォリオサイトの開発記録です。' * 4 + '</p>\n'
+
+
+def _page(head, body_size):
+    body = _ARTICLE_PARAGRAPH * (body_size // len(_ARTICLE_PARAGRAPH.encode('utf-8')) + 1)
+    return (f'<!DOCTYPE html>\n<html lang="ja">\n<head>\n<meta charset="utf-8">\n{head}</head>\n'
+            f'<body>\n<main>\n{body}</main>\n</body>\n</html>\n').encode('utf-8')
+
+
+def make_pages():
+    """(名前, HTMLのバイト列) の一覧"""
+    og_tags = (
+        '<meta property="og:title" content="開発日記 Day 42">\n'
+        '<meta property="og:description" content="検索インデックスを作り直した話">\n'
+        '<meta property="og:image" content="https://example.com/ogp/day42.png">\n'
+        '<meta property="og:site_name" content="Example Blog">\n'
+        '<meta property="og:url" content="https://example.com/day42">\n'
+    )
+    blog = _page('<title>開発日記 Day 42 | Example Blog</title>\n' + og_tags
+                 + '<link rel="stylesheet" href="/static/style.css">\n', 190 * 1024)
+    inline_css = '<style>\n' + ''.join(f'.c{i} {{ margin: {i % 16}px; color: #{i % 4096:03x}; }}\n'
+                                       for i in range(700)) + '</style>\n'
+    news = _page('<title>ニュース | Example News</title>\n' + inline_css
+                 + '<meta name="description" content="今日のニュース">\n'
+                 + '<meta name="twitter:title" content="ニュース速報">\n'
+                 + '<meta name="twitter:image" content="https://news.example.com/card.png">\n'
+                 + '<meta property="og:site_name" content="Example News">\n', 240 * 1024)
+    scripts = ''.join(f'<script src="/static/js/chunk-{i}.js" defer></script>\n' for i in range(150))
+    spa = _page('<title>Example App</title>\n' + scripts, 64 * 1024)
+    return [('blog, og tags early', blog), ('news, inline CSS', news), ('SPA, title only', spa)]
+
+
+def iter_chunks(html, chunk_size=CHUNK_SIZE):
+    """response.iter_content(chunk_size=8192) の代わりにバイト列をチャンクに分けて返す"""
+    for start in range(0, len(html), chunk_size):
+        yield html[start:start + chunk_size]
+
+
+def parse_ogp_legacy(chunks):
+    """変更前のseo._fetch_ogp_with_requestsの抽出処理（先頭64KBをBeautifulSoupで解析）"""
+    content = b''
+    for chunk in chunks:
+        content += chunk
+        if len(content) >= CONTENT_SIZE_LIMIT:
+            break
+
+    soup = BeautifulSoup(content, 'html.parser')
+    ogp_data = {}
+
+    ogp_tags = soup.find_all('meta', attrs={'property': lambda x: x and x.startswith('og:')})
+    twitter_tags = soup.find_all('meta', attrs={'name': lambda x: x and x.startswith('twitter:')})
+
+    for tag in ogp_tags:
+        prop = tag.get('property', '').lower()
+        content = tag.get('content', '').strip()
+        if content:
+            if prop == 'og:title':
+                ogp_data['title'] = content
+            elif prop == 'og:description':
+                ogp_data['description'] = content
+            elif prop == 'og:image':
+                ogp_data['image'] = content
+            elif prop == 'og:site_name':
+                ogp_data['site_name'] = content
+            elif prop == 'og:url':
+                ogp_data['url'] = content
+
+    for tag in twitter_tags:
+        name = tag.get('name', '').lower()
+        content = tag.get('content', '').strip()
+        if content:
+            if name == 'twitter:title' and not ogp_data.get('title'):
+                ogp_data['title'] = content
+            elif name == 'twitter:description' and not ogp_data.get('description'):
+                ogp_data['description'] = content
+            elif name == 'twitter:image' and not ogp_data.get('image'):
+                ogp_data['image'] = content
+
+    if not ogp_data.get('title'):
+        title_tag = soup.find('title')
+        if title_tag:
+            ogp_data['title'] = title_tag.get_text().strip()
+
+    if not ogp_data.get('description'):
+        desc_tag = soup.find('meta', attrs={'name': 'description'})
+        if desc_tag and desc_tag.get('content'):
+            ogp_data['description'] = desc_tag.get('content', '').strip()
+
+    return ogp_data
+
+
+def read_bytes_legacy(html):
+    """変更前の方式で読み込むバイト数"""
+    read = 0
+    for chunk in iter_chunks(html):
+        read += len(chunk)
+        if read >= CONTENT_SIZE_LIMIT:
+            break
+    return read
+
+
+def run(number=200, repeat=5):
+    """各ページについて (名前, サイズ, 変更前[bytes, ms], 変更後[bytes, ms]) を返す"""
+    results = []
+    for name, html in make_pages():
+        new_data, new_bytes = parse_ogp_stream(iter_chunks(html))
+        old_data = parse_ogp_legacy(iter_chunks(html))
+        assert new_data == old_data, (name, old_data, new_data)
+
+        old_ms = min(timeit.repeat(lambda: parse_ogp_legacy(iter_chunks(html)),
+                                   number=number, repeat=repeat)) / number * 1000
+        new_ms = min(timeit.repeat(lambda: parse_ogp_stream(iter_chunks(html)),
+                                   number=number, repeat=repeat)) / number * 1000
+        results.append((name, len(html), (read_bytes_legacy(html), old_ms), (new_bytes, new_ms)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=200, help='1計測あたりの解析回数')
+    parser.add_argument('--repeat', type=int, default=5, help='計測回数（最短値を採用）')
+    args = parser.parse_args()
+    # 変更前の方式で64KBの境界がマルチバイト文字を分断した際の警告を抑制
+    logging.getLogger('bs4.dammit').setLevel(logging.ERROR)
+
+    for name, size, (old_bytes, old_ms), (new_bytes, new_ms) in run(args.number, args.repeat):
+        print(f'{name:20s} ({size // 1024}KB): old {old_bytes // 1024}KB/{old_ms:.3f} ms, '
+              f'new {new_bytes // 1024}KB/{new_ms:.3f} ms ({old_ms / new_ms:.0f}x)')
+
+
+if __name__ == '__main__':
+    main()
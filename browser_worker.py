@@ -0,0 +1,241 @@
+"""
+ヘッドレスブラウザワーカーモジュール
+JavaScriptで描画されるページ（Threads等）の取得用に、常駐するChromeを使い回してジョブを順に処理する
+"""
+import os
+import glob
+import stat
+import time
+import queue
+import atexit
+import logging
+import threading
+from functools import lru_cache
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
+
+CHROME_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+# OGPメタタグが出現したら待機を打ち切る
+OGP_META_XPATH = "//meta[contains(@property, 'og:') or contains(@name, 'twitter:')]"
+
+
+class BrowserJobTimeout(Exception):
+    """ジョブが期限内に完了しなかった"""
+
+
+class BrowserWorker:
+    """常駐ヘッドレスChromeによるページ取得ワーカー（ブラウザ数＝同時実行数の上限）"""
+
+    def __init__(self, max_browsers=1, job_timeout=20, max_jobs_per_browser=50, idle_timeout=300, queue_size=100):
+        """
+        初期化
+        :param max_browsers: 同時に起動するブラウザ数（同時実行数の上限）
+        :param job_timeout: 1ジョブの期限（秒、キュー待ち時間を含む）
+        :param max_jobs_per_browser: この件数を処理したらブラウザを再起動（メモリ肥大化対策）
+        :param idle_timeout: この秒数ジョブがなければブラウザを終了
+        :param queue_size: キューの上限
+        """
+        self.max_browsers = max_browsers
+        self.job_timeout = job_timeout
+        self.max_jobs_per_browser = max_jobs_per_browser
+        self.idle_timeout = idle_timeout
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._drivers = set()
+        self._pid = None
+
+        self.completed_count = 0
+        self.timeout_count = 0
+        self.error_count = 0
+        self.launch_count = 0
+
+    def fetch(self, url, timeout=None):
+        """ページを読み込んでHTMLを返す（期限超過時はBrowserJobTimeout）"""
+        timeout = timeout or self.job_timeout
+        future = self.submit(url, timeout)
+        try:
+            # ブラウザ側が応答しなくても呼び出し元は期限で必ず戻る
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self.timeout_count += 1
+            raise BrowserJobTimeout(f"Browser job timed out: {url}")
+
+    def submit(self, url, timeout=None):
+        """取得ジョブを登録してFutureを返す（キューが満杯ならqueue.Full）"""
+        self._ensure_started()
+        future = Future()
+        deadline = time.monotonic() + (timeout or self.job_timeout)
+        self._queue.put_nowait((url, deadline, future))
+        return future
+
+    def get_stats(self):
+        """実行状況の統計を取得"""
+        return {
+            'queued': self._queue.qsize(),
+            'browsers': len(self._drivers),
+            'launched': self.launch_count,
+            'completed': self.completed_count,
+            'timeouts': self.timeout_count,
+            'errors': self.error_count,
+        }
+
+    def shutdown(self):
+        """起動中のブラウザをすべて終了"""
+        for driver in list(self._drivers):
+            self._quit_driver(driver)
+
+    def _ensure_started(self):
+        """ワーカースレッドを起動（fork後の子プロセスでは起動し直す）"""
+        if self._threads and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._threads and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # fork元のスレッド・ブラウザは引き継がれないため状態を作り直す
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._drivers = set()
+            self._pid = os.getpid()
+            self._threads = []
+            for i in range(self.max_browsers):
+                thread = threading.Thread(target=self._run, name=f'browser-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        """ジョブを取り出し、ブラウザを使い回して処理する"""
+        driver = None
+        jobs_done = 0
+        while True:
+            try:
+                url, deadline, future = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                # アイドル時はブラウザを終了してメモリを解放
+                if driver is not None:
+                    self._quit_driver(driver)
+                    driver = None
+                continue
+
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeout_count += 1
+                    future.set_exception(BrowserJobTimeout(f"Browser job expired in queue: {url}"))
+                    continue
+
+                try:
+                    if driver is None or jobs_done >= self.max_jobs_per_browser:
+                        if driver is not None:
+                            self._quit_driver(driver)
+                            driver = None
+                        driver = self._launch_driver()
+                        jobs_done = 0
+                    future.set_result(self._load_page(driver, url, deadline))
+                    self.completed_count += 1
+                except Exception as e:
+                    # 異常終了したブラウザは次のジョブで起動し直す
+                    self.error_count += 1
+                    future.set_exception(e)
+                    if driver is not None:
+                        self._quit_driver(driver)
+                        driver = None
+                jobs_done += 1
+            finally:
+                self._queue.task_done()
+
+    def _load_page(self, driver, url, deadline):
+        """期限内にページを読み込み、OGPメタタグの出現を待ってHTMLを返す"""
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        driver.set_page_load_timeout(max(1, deadline - time.monotonic()))
+        try:
+            driver.get(url)
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                try:
+                    WebDriverWait(driver, remaining, poll_frequency=0.2).until(
+                        EC.presence_of_element_located((By.XPATH, OGP_META_XPATH))
+                    )
+                except TimeoutException:
+                    logger.debug(f"OGP meta tags not found before deadline: {url}")
+            return driver.page_source
+        except TimeoutException:
+            raise BrowserJobTimeout(f"Page load timed out: {url}")
+        finally:
+            # 次のジョブに前のページのスクリプト・メモリを持ち越さない
+            try:
+                driver.get('about:blank')
+            except Exception:
+                pass
+
+    def _launch_driver(self):
+        """ヘッドレスChromeを起動"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+
+        options = Options()
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--window-size=1280,800')
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument(f'--user-agent={CHROME_USER_AGENT}')
+        # DOMContentLoadedで制御を戻し、残りはOGPメタタグの待機に任せる
+        options.page_load_strategy = 'eager'
+
+        driver = webdriver.Chrome(service=Service(resolve_chromedriver_path()), options=options)
+        with self._lock:
+            self._drivers.add(driver)
+        self.launch_count += 1
+        logger.debug("Headless Chrome launched")
+        return driver
+
+    def _quit_driver(self, driver):
+        """ブラウザを終了"""
+        with self._lock:
+            self._drivers.discard(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+@lru_cache(maxsize=1)
+def resolve_chromedriver_path():
+    """webdriver-managerでChromeDriverを取得し、実行可能なパスを返す"""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    driver_path = ChromeDriverManager().install()
+    actual_driver_path = None
+
+    # webdriver-managerが間違ったファイルを返している場合の修正
+    chromedriver_path = os.path.join(os.path.dirname(driver_path), "chromedriver")
+    if os.path.isfile(chromedriver_path):
+        actual_driver_path = chromedriver_path
+    else:
+        # 再帰的にchromedriver実行ファイルを探す
+        pattern = os.path.join(os.path.expanduser("~/.wdm/drivers/chromedriver"), "**/chromedriver")
+        for found_driver in glob.glob(pattern, recursive=True):
+            if os.path.isfile(found_driver):
+                actual_driver_path = found_driver
+                break
+
+    if not actual_driver_path:
+        raise Exception("Could not find valid ChromeDriver executable")
+
+    # 実行権限を確認・設定
+    if not os.access(actual_driver_path, os.X_OK):
+        os.chmod(actual_driver_path, stat.S_IRUSR | stat.S_IWUSR | stat.S_IXUSR | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
+    return actual_driver_path
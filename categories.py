@@ -18,7 +18,7 @@ def category_page(slug):
     per_page = 10
     
     # カテゴリに属する公開記事を取得（relationshipを使用）
-    articles_pagination = Article.query.filter(
+    articles_pagination = Article.query.options(selectinload(Article.linked_projects)).filter(
         Article.is_published == True,
         Article.categories.any(Category.id == category.id)
     ).order_by(
@@ -27,35 +27,18 @@ def register_context_processors(app):
     def inject_analytics():
         """Google Analyticsの設定をテンプレートに注入"""
         def google_analytics_code():
-            """Enhanced Google Analytics トラッキングコードを生成"""
+            """Enhanced Google Analytics トラッキングコードを生成（設定バージョン単位でキャッシュ）"""
             from ga4_analytics import GA4AnalyticsManager
             
-            analytics_manager = GA4AnalyticsManager()
-            
-            # ユーザーを追跡すべきかチェック
             user = current_user if current_user.is_authenticated else None
-            
-            # トラッキングコードを生成
-            tracking_code = analytics_manager.generate_tracking_code(user)
-            
-            # カスタムアナリティクスコード
-            custom_code = SiteSetting.get_setting('custom_analytics_code', '')
-            if custom_code:
-                tracking_code = Markup(str(tracking_code) + f'\n<!-- Custom Analytics Code -->\n{custom_code}')
-            
-            return tracking_code
+            return GA4AnalyticsManager.cached_tracking_code(user)
         
         def google_tag_manager_noscript():
-            """Enhanced Google Tag Manager noscript 部分"""
+            """Enhanced Google Tag Manager noscript 部分（設定バージョン単位でキャッシュ）"""
             from ga4_analytics import GA4AnalyticsManager
             
-            analytics_manager = GA4AnalyticsManager()
-            
-            # ユーザーを追跡すべきかチェック
             user = current_user if current_user.is_authenticated else None
-            
-            # GTM noscript部分を生成
-            return analytics_manager.generate_gtm_noscript(user)
+            return GA4AnalyticsManager.cached_gtm_noscript(user)
         
         return dict(
             google_analytics_code=google_analytics_code,
@@ -65,37 +48,10 @@ def register_context_processors(app):
     @app.context_processor
     def inject_site_settings():
         """サイト設定をすべてのテンプレートで利用可能にする"""
-        import json
-        
         def get_site_settings():
-            """公開設定のみを取得（キャッシュ機能付き）"""
+            """公開設定のみを取得（プロセス内スナップショットを利用）"""
             try:
-                # 公開設定のみを取得
-                public_settings = db.session.execute(
-                    select(SiteSetting).where(SiteSetting.is_public == True)
-                ).scalars().all()
-                
-                settings = {}
-                for setting in public_settings:
-                    value = setting.value
-                    
-                    # 設定タイプに応じて値を変換
-                    if setting.setting_type == 'boolean':
-                        value = value.lower() == 'true'
-                    elif setting.setting_type == 'number':
-                        try:
-                            value = float(value) if '.' in value else int(value)
-                        except ValueError:
-                            value = 0
-                    elif setting.setting_type == 'json':
-                        try:
-                            value = json.loads(value) if value else {}
-                        except json.JSONDecodeError:
-                            value = {}
-                    
-                    settings[setting.key] = value
-                
-                return settings
+                return SiteSetting.get_public_settings()
             except Exception as e:
                 current_app.logger.error(f"Error loading site settings: {e}")
                 return {}
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template_string, request, current_app
-from seo import process_sns_auto_embed, fetch_ogp_data, generate_ogp_card, ogp_cache
+from seo import process_sns_auto_embed, fetch_ogp_data, generate_ogp_card, ogp_cache, link_preview_worker, browser_worker
+from http_client import http_client
 import os
 
 debug_bp = Blueprint('debug', __name__)
@@ -28,6 +29,14 @@ def debug_ogp():
         current_app.logger.error(f"🚨 OGP Debug Error: {str(e)}")
         result = f"Error: {str(e)}"
     
+    # 外部取得・キャッシュの計測値
+    metrics = {
+        'http': http_client.get_stats(),
+        'cache': ogp_cache.get_stats(),
+        'worker': link_preview_worker.get_stats(),
+        'browser': browser_worker.get_stats(),
+    }
+    
     return render_template_string("""
     <!DOCTYPE html>
     <html>
@@ -51,6 +60,11 @@ def debug_ogp():
         <pre>{{ result }}</pre>
     </div>
     
+    <div class="debug-info">
+        <h3>Fetch Metrics</h3>
+        <pre>{{ metrics | tojson(indent=2) }}</pre>
+    </div>
+    
     <div class="debug-info">
         <h3>Test URLs</h3>
         <ul>
@@ -63,7 +77,7 @@ def debug_ogp():
     
     </body>
     </html>
-    """, url=url, force_refresh=force_refresh, result=result)
+    """, url=url, force_refresh=force_refresh, result=result, metrics=metrics)
 
 @debug_bp.route('/debug_filter')
 def debug_filter():
@@ -3,12 +3,10 @@ Template Filters - Jinja2テンプレートフィルター
 """
 import json
 import re
-import markdown
-import bleach
 from markupsafe import Markup
 from flask import current_app
 from seo import process_sns_auto_embed, process_general_url_embeds
-from utils import add_heading_anchors
+from utils import render_markdown
 
 def register_filters(app):
     """アプリケーションにテンプレートフィルターを登録"""
@@ -33,55 +31,8 @@ def register_filters(app):
         # oEmbedハンドラーを使用するため、ここでは実行しない
         # text = process_sns_auto_embed(text)
         
-        # Markdownの拡張機能を設定
-        md = markdown.Markdown(
-            extensions=['extra', 'codehilite', 'toc', 'nl2br'],
-            extension_configs={
-                'codehilite': {
-                    'css_class': 'highlight',
-                    'use_pygments': False
-                }
-            },
-            tab_length=2  # タブ長を短く設定
-        )
-        
-        # MarkdownをHTMLに変換
-        html = md.convert(text)
-        
-        # セキュリティのためHTMLをサニタイズ（SNS埋込用タグを追加）
-        allowed_tags = [
-            'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-            'p', 'br', 'strong', 'em', 'u', 'del',
-            'ul', 'ol', 'li', 'blockquote', 'pre', 'code',
-            'a', 'img', 'table', 'thead', 'tbody', 'tr', 'th', 'td',
-            # SNS埋込用タグ
-            'div', 'iframe', 'script', 'blockquote', 'noscript'
-        ]
-        allowed_attributes = {
-            'a': ['href', 'title', 'target', 'rel'],
-            'img': ['src', 'alt', 'title', 'width', 'height'],
-            'code': ['class'],
-            'pre': ['class'],
-            'h1': ['id'], 'h2': ['id'], 'h3': ['id'], 'h4': ['id'], 'h5': ['id'], 'h6': ['id'],
-            # SNS埋込用属性
-            'div': ['class', 'id', 'style', 'data-href', 'data-width', 'data-instgrm-permalink'],
-            'iframe': ['src', 'width', 'height', 'frameborder', 'allow', 'allowfullscreen', 'title', 'style'],
-            'script': ['src', 'async', 'defer', 'charset', 'crossorigin'],
-            'blockquote': ['class', 'style', 'data-instgrm-permalink'],
-            'noscript': []
-        }
-        
-        # SNS埋込HTMLがある場合はbleachを適用しない（安全なHTMLのため）
-        if any(cls in html for cls in ['sns-embed', 'youtube-embed', 'twitter-embed', 'instagram-embed', 'facebook-embed', 'threads-embed']):
-            clean_html = html
-        else:
-            # 通常のMarkdownコンテンツのみサニタイズ
-            clean_html = bleach.clean(html, tags=allowed_tags, attributes=allowed_attributes)
-        
-        # 見出しにアンカーIDを追加
-        clean_html = add_heading_anchors(clean_html)
-        
-        return Markup(clean_html)
+        # 見出しアンカー付与・サニタイズまで1回の変換で処理
+        return render_markdown(text).html
 
     @app.template_filter('nl2br')
     def nl2br(value):
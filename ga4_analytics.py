@@ -6,6 +6,9 @@ from markupsafe import Markup
 from flask import current_app
 from models import db, SiteSetting
 
+# 生成済みスニペットのキャッシュ（設定バージョンが変わったら丸ごと作り直す）
+_snippet_cache = {'version': None, 'snippets': {}}
+
 
 class GA4AnalyticsManager:
     """GA4とGTMの統合管理クラス"""
@@ -14,8 +17,48 @@ class GA4AnalyticsManager:
         """設定を初期化"""
         self.settings = self._load_settings()
     
+    @staticmethod
+    def cached_tracking_code(user=None):
+        """トラッキングコード（カスタムコード含む）をキャッシュから取得"""
+        return GA4AnalyticsManager._get_cached_snippet('tracking', user)
+    
+    @staticmethod
+    def cached_gtm_noscript(user=None):
+        """GTM noscript部分をキャッシュから取得"""
+        return GA4AnalyticsManager._get_cached_snippet('gtm_noscript', user)
+    
+    @staticmethod
+    def _get_cached_snippet(kind, user):
+        """設定バージョン・追跡対象かどうかごとに生成結果をキャッシュ"""
+        global _snippet_cache
+        version = SiteSetting.get_snapshot()['version']
+        cache = _snippet_cache
+        if cache['version'] != version:
+            cache = {'version': version, 'snippets': {}}
+            _snippet_cache = cache
+        
+        # 出力は設定と「除外対象の管理者かどうか」のみに依存する
+        is_admin = bool(user and user.is_authenticated and user.role == 'admin')
+        excluded = is_admin and SiteSetting.get_setting('exclude_admin_tracking', 'true') == 'true'
+        key = (kind, excluded)
+        
+        snippet = cache['snippets'].get(key)
+        if snippet is None:
+            manager = GA4AnalyticsManager()
+            if kind == 'tracking':
+                snippet = manager.generate_tracking_code(user)
+                
+                # カスタムアナリティクスコード
+                custom_code = SiteSetting.get_setting('custom_analytics_code', '')
+                if custom_code:
+                    snippet = Markup(str(snippet) + f'\n<!-- Custom Analytics Code -->\n{custom_code}')
+            else:
+                snippet = manager.generate_gtm_noscript(user)
+            cache['snippets'][key] = snippet
+        return snippet
+    
     def _load_settings(self):
-        """データベースから設定を読み込み"""
+        """設定スナップショットから設定を読み込み"""
         settings = {}
         try:
             # GA4基本設定
@@ -53,12 +96,9 @@ class GA4AnalyticsManager:
         return settings
     
     def _get_setting(self, key, default=None):
-        """個別設定値を取得"""
+        """個別設定値を取得（設定スナップショットから参照）"""
         try:
-            setting = db.session.execute(
-                db.select(SiteSetting).where(SiteSetting.key == key)
-            ).scalar_one_or_none()
-            return setting.value if setting else default
+            return SiteSetting.get_setting(key, default)
         except:
             return default
     
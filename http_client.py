@@ -0,0 +1,165 @@
+"""
+外部HTTPクライアントモジュール
+OGP・oEmbed取得で共有するコネクションプール付きセッション（ホスト別同時接続数制限・条件付きリクエスト・計測）
+"""
+import time
+import weakref
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate'
+}
+
+
+class _RejectAllCookies(requests.cookies.RequestsCookieJar):
+    """Cookieを保存しないCookieJar（セッションを複数スレッドで共有するため状態を持たせない）"""
+
+    def set_cookie(self, cookie, *args, **kwargs):
+        return None
+
+
+class HTTPClient:
+    """コネクションを再利用する外部HTTPクライアント"""
+
+    def __init__(self, timeout=8, per_host_limit=4, pool_connections=32, pool_maxsize=8, max_retries=0):
+        """
+        初期化
+        :param timeout: リクエストのタイムアウト（秒）
+        :param per_host_limit: 同一ホストへの同時リクエスト数
+        :param pool_connections: コネクションプールを保持するホスト数
+        :param pool_maxsize: ホストごとに保持する接続数
+        :param max_retries: 接続エラー時の再試行回数
+        """
+        self.timeout = timeout
+        self.per_host_limit = per_host_limit
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.cookies = _RejectAllCookies()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._host_semaphores = {}
+        self._host_stats = defaultdict(lambda: {
+            'requests': 0, 'errors': 0, 'not_modified': 0, 'total_ms': 0.0, 'max_ms': 0.0
+        })
+
+    def get(self, url, headers=None, etag=None, last_modified=None, **kwargs):
+        """
+        GETリクエスト（etag・last_modifiedを指定すると条件付きリクエストになり、未変更なら304が返る）
+        stream=Trueの場合は本文を読み切るかresponse.close()するまでホストの同時リクエスト枠を保持するため、
+        呼び出し側で必ずresponse.close()すること
+        """
+        request_headers = dict(headers or {})
+        if etag:
+            request_headers['If-None-Match'] = etag
+        if last_modified:
+            request_headers['If-Modified-Since'] = last_modified
+        kwargs.setdefault('timeout', self.timeout)
+
+        host = urlparse(url).netloc.lower()
+        semaphore = self._get_host_semaphore(host)
+        start = time.perf_counter()
+        semaphore.acquire()
+        try:
+            response = self.session.get(url, headers=request_headers, **kwargs)
+        except requests.exceptions.RequestException:
+            semaphore.release()
+            self._record(host, start, error=True)
+            raise
+        except BaseException:
+            semaphore.release()
+            raise
+        self._record(host, start, error=response.status_code >= 400, not_modified=response.status_code == 304)
+        if kwargs.get('stream'):
+            # 本文はまだ読み込まれておらず接続を使用中のため、読み切るか閉じるまで枠を解放しない
+            self._hold_until_released(response, semaphore)
+        else:
+            semaphore.release()
+        return response
+
+    @staticmethod
+    def _hold_until_released(response, semaphore):
+        """ストリーミング応答の本文を読み切るか閉じた時点でセマフォを1度だけ解放する"""
+        lock = threading.Lock()
+        held = [True]
+
+        def release():
+            with lock:
+                if not held[0]:
+                    return
+                held[0] = False
+            semaphore.release()
+
+        close = response.close
+        iter_content = response.iter_content
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                release()
+
+        def iter_content_and_release(*args, **kwargs):
+            # response.content・response.textもiter_content経由で読み込まれる
+            yield from iter_content(*args, **kwargs)
+            release()
+
+        response.close = close_and_release
+        response.iter_content = iter_content_and_release
+        # 閉じ忘れた応答も破棄時に解放する
+        weakref.finalize(response, release)
+
+    @staticmethod
+    def get_validators(response):
+        """条件付きリクエスト用の検証子（ETag・Last-Modified）を取得"""
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['last_modified'] = response.headers['Last-Modified']
+        return validators
+
+    def get_stats(self):
+        """ホスト別のリクエスト数・エラー数・304件数・平均/最大応答時間を取得"""
+        with self._lock:
+            stats = {}
+            for host, item in self._host_stats.items():
+                stats[host] = {
+                    'requests': item['requests'],
+                    'errors': item['errors'],
+                    'not_modified': item['not_modified'],
+                    'avg_ms': round(item['total_ms'] / item['requests'], 1) if item['requests'] else 0,
+                    'max_ms': round(item['max_ms'], 1),
+                }
+            return stats
+
+    def _get_host_semaphore(self, host):
+        """ホストごとの同時リクエスト数を制限するセマフォを取得"""
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_semaphores[host]
+
+    def _record(self, host, start, error=False, not_modified=False):
+        """1リクエスト分の計測値を記録"""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            item = self._host_stats[host]
+            item['requests'] += 1
+            item['errors'] += int(error)
+            item['not_modified'] += int(not_modified)
+            item['total_ms'] += elapsed_ms
+            item['max_ms'] = max(item['max_ms'], elapsed_ms)
+
+
+# アプリケーション全体で共有するクライアント
+http_client = HTTPClient()
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, abort, make_response
 from flask_login import current_user, login_required
 from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
 from models import Article, Project, Category, Challenge, SiteSetting, User, db
 from seo import get_static_page_seo
 from datetime import datetime
@@ -81,9 +82,9 @@ def portfolio():
         select(Challenge).order_by(Challenge.display_order)
     ).scalars().all()
     
-    # 注目プロジェクトを取得（最大3件）
+    # 注目プロジェクトを取得（最大3件、関連記事リンク用に関連記事をまとめて読み込む）
     featured_projects = db.session.execute(
-        select(Project).where(
+        select(Project).options(selectinload(Project.linked_articles)).where(
             Project.status == 'active',
             Project.is_featured.is_(True)
         ).order_by(Project.display_order).limit(3)
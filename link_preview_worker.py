@@ -0,0 +1,98 @@
+"""
+リンクプレビュー取得ワーカーモジュール
+OGP・oEmbedの外部取得をリクエスト処理から切り離し、バックグラウンドスレッドで実行する
+"""
+import os
+import queue
+import threading
+from flask import current_app
+
+
+class LinkPreviewWorker:
+    """外部URLのプレビュー取得ジョブを非同期実行（同じキーのジョブは重複登録しない）"""
+
+    def __init__(self, num_threads=2, queue_size=1000):
+        """
+        初期化
+        :param num_threads: 取得スレッド数
+        :param queue_size: キューの上限（超過分は破棄し、次回の表示時に再登録される）
+        """
+        self.num_threads = num_threads
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._threads = []
+        self._pid = None
+
+        self.submitted_count = 0
+        self.completed_count = 0
+        self.dropped_count = 0
+        self.error_count = 0
+
+    def submit(self, key, func, *args, **kwargs):
+        """取得ジョブを登録（処理待ち・処理中の同一キーがあれば何もせずFalseを返す）"""
+        self._ensure_started()
+        app = current_app._get_current_object()
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        try:
+            self._queue.put_nowait((key, app, func, args, kwargs))
+        except queue.Full:
+            with self._lock:
+                self._pending.discard(key)
+            self.dropped_count += 1
+            return False
+        self.submitted_count += 1
+        return True
+
+    def is_pending(self, key):
+        """処理待ち・処理中かどうか"""
+        with self._lock:
+            return key in self._pending
+
+    def get_stats(self):
+        """実行状況の統計を取得"""
+        return {
+            'pending': len(self._pending),
+            'submitted': self.submitted_count,
+            'completed': self.completed_count,
+            'dropped': self.dropped_count,
+            'errors': self.error_count,
+        }
+
+    def _ensure_started(self):
+        """取得スレッドを起動（fork後の子プロセスでは起動し直す）"""
+        if self._threads and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._threads and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # fork元のスレッドは引き継がれないため状態を作り直す
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pending = set()
+            self._pid = os.getpid()
+            self._threads = []
+            for i in range(self.num_threads):
+                thread = threading.Thread(target=self._run, name=f'link-preview-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        """キューからジョブを取り出してアプリケーションコンテキスト内で実行"""
+        while True:
+            key, app, func, args, kwargs = self._queue.get()
+            try:
+                with app.app_context():
+                    try:
+                        func(*args, **kwargs)
+                        self.completed_count += 1
+                    except Exception as e:
+                        self.error_count += 1
+                        app.logger.warning(f"Link preview fetch error for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._queue.task_done()
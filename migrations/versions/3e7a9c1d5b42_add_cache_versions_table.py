@@ -0,0 +1,32 @@
+"""Add cache_versions table for cross-worker cache invalidation
+
+Revision ID: 3e7a9c1d5b42
+Revises: 8b4e2d6f1a37
+Create Date: 2026-10-17 12:20:08.117364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e7a9c1d5b42'
+down_revision = '8b4e2d6f1a37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_versions = op.create_table('cache_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(cache_versions, [
+        {'name': 'settings', 'version': 0},
+    ])
+
+
+def downgrade():
+    op.drop_table('cache_versions')
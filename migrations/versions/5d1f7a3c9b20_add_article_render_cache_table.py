@@ -0,0 +1,32 @@
+"""Add article_render_cache table for precompiled article HTML
+
+Revision ID: 5d1f7a3c9b20
+Revises: c2215cf263fd
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1f7a3c9b20'
+down_revision = 'c2215cf263fd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('article_render_cache',
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('html', sa.Text(length=16777215), nullable=False),
+    sa.Column('toc_json', sa.Text(), nullable=True),
+    sa.Column('rendered_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('article_id')
+    )
+
+
+def downgrade():
+    op.drop_table('article_render_cache')
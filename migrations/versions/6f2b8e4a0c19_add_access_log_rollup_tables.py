@@ -0,0 +1,43 @@
+"""Add access_log_checkpoints and access_log_rollups tables
+
+Revision ID: 6f2b8e4a0c19
+Revises: 3e7a9c1d5b42
+Create Date: 2026-10-17 14:05:52.604218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2b8e4a0c19'
+down_revision = '3e7a9c1d5b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('access_log_checkpoints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('log_path', sa.String(length=500), nullable=False),
+    sa.Column('inode', sa.BigInteger(), nullable=True),
+    sa.Column('offset', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('log_path')
+    )
+    op.create_table('access_log_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('source', sa.String(length=500), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('period_start', sa.DateTime(), nullable=False),
+    sa.Column('data', sa.Text(length=16777215), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source', 'period', 'period_start', name='uq_access_log_rollups_period_start')
+    )
+
+
+def downgrade():
+    op.drop_table('access_log_rollups')
+    op.drop_table('access_log_checkpoints')
@@ -0,0 +1,26 @@
+"""Add excerpt column to article_render_cache
+
+Revision ID: 8b4e2d6f1a37
+Revises: 5d1f7a3c9b20
+Create Date: 2026-10-17 11:03:27.845112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e2d6f1a37'
+down_revision = '5d1f7a3c9b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('article_render_cache', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('excerpt', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('article_render_cache', schema=None) as batch_op:
+        batch_op.drop_column('excerpt')
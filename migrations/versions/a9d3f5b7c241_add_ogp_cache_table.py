@@ -0,0 +1,37 @@
+"""Add ogp_cache table for persistent link card cache
+
+Revision ID: a9d3f5b7c241
+Revises: 6f2b8e4a0c19
+Create Date: 2026-10-17 15:32:44.902715
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3f5b7c241'
+down_revision = '6f2b8e4a0c19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ogp_cache',
+    sa.Column('url_hash', sa.String(length=64), nullable=False),
+    sa.Column('url', sa.Text(), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('is_failure', sa.Boolean(), nullable=False),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('url_hash')
+    )
+    with op.batch_alter_table('ogp_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ogp_cache_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ogp_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ogp_cache_expires_at'))
+
+    op.drop_table('ogp_cache')
@@ -0,0 +1,36 @@
+"""Add search_index table for full-text search
+
+Revision ID: b4c8e1f7d253
+Revises: a9d3f5b7c241
+Create Date: 2026-10-17 18:05:12.418930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4c8e1f7d253'
+down_revision = 'a9d3f5b7c241'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('search_index',
+    sa.Column('doc_type', sa.String(length=20), nullable=False),
+    sa.Column('doc_id', sa.Integer(), nullable=False),
+    sa.Column('term', sa.String(length=64).with_variant(mysql.VARCHAR(length=64, collation='utf8mb4_bin'), 'mysql'), nullable=False),
+    sa.Column('weight', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('doc_type', 'doc_id', 'term')
+    )
+    with op.batch_alter_table('search_index', schema=None) as batch_op:
+        batch_op.create_index('ix_search_index_doc_type_term', ['doc_type', 'term'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('search_index', schema=None) as batch_op:
+        batch_op.drop_index('ix_search_index_doc_type_term')
+
+    op.drop_table('search_index')
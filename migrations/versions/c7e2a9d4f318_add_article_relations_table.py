@@ -0,0 +1,38 @@
+"""Add article_relations table for precomputed related articles
+
+Revision ID: c7e2a9d4f318
+Revises: b4c8e1f7d253
+Create Date: 2026-10-17 21:14:37.205846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a9d4f318'
+down_revision = 'b4c8e1f7d253'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('article_relations',
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('related_article_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['related_article_id'], ['articles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('article_id', 'rank')
+    )
+    with op.batch_alter_table('article_relations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_article_relations_related_article_id'), ['related_article_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('article_relations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_article_relations_related_article_id'))
+
+    op.drop_table('article_relations')
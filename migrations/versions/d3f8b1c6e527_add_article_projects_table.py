@@ -0,0 +1,83 @@
+"""Add article_projects table and migrate articles.project_ids
+
+Revision ID: d3f8b1c6e527
+Revises: c7e2a9d4f318
+Create Date: 2026-10-17 22:03:51.612204
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f8b1c6e527'
+down_revision = 'c7e2a9d4f318'
+branch_labels = None
+depends_on = None
+
+
+def _parse_project_ids(value):
+    """JSON文字列のプロジェクトIDリストを整数のリストに変換（不正な値は無視）"""
+    try:
+        ids = json.loads(value) if value else []
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(ids, list):
+        ids = [ids]
+    result = []
+    for project_id in ids:
+        try:
+            result.append(int(project_id))
+        except (TypeError, ValueError):
+            continue
+    return result
+
+
+def upgrade():
+    article_projects = op.create_table('article_projects',
+    sa.Column('article_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('article_id', 'project_id')
+    )
+    with op.batch_alter_table('article_projects', schema=None) as batch_op:
+        batch_op.create_index('ix_article_projects_project_id', ['project_id'], unique=False)
+
+    # 既存のJSON形式の関連付けを中間テーブルへ移行（存在しないプロジェクトIDは除外）
+    conn = op.get_bind()
+    project_ids = {row[0] for row in conn.execute(sa.text('SELECT id FROM projects'))}
+    rows = []
+    for article_id, value in conn.execute(sa.text('SELECT id, project_ids FROM articles WHERE project_ids IS NOT NULL')):
+        for project_id in dict.fromkeys(_parse_project_ids(value)):
+            if project_id in project_ids:
+                rows.append({'article_id': article_id, 'project_id': project_id})
+    if rows:
+        op.bulk_insert(article_projects, rows)
+
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_column('project_ids')
+
+
+def downgrade():
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('project_ids', sa.Text(), nullable=True))
+
+    # 中間テーブルの関連付けをJSON形式に戻す
+    conn = op.get_bind()
+    links = {}
+    for article_id, project_id in conn.execute(
+        sa.text('SELECT article_id, project_id FROM article_projects ORDER BY article_id, project_id')
+    ):
+        links.setdefault(article_id, []).append(project_id)
+    for article_id, project_ids in links.items():
+        conn.execute(
+            sa.text('UPDATE articles SET project_ids = :project_ids WHERE id = :article_id'),
+            {'project_ids': json.dumps(project_ids), 'article_id': article_id}
+        )
+
+    with op.batch_alter_table('article_projects', schema=None) as batch_op:
+        batch_op.drop_index('ix_article_projects_project_id')
+
+    op.drop_table('article_projects')
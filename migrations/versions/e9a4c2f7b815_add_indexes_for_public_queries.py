@@ -0,0 +1,67 @@
+"""Add composite indexes for public listing queries
+
+Revision ID: e9a4c2f7b815
+Revises: d3f8b1c6e527
+Create Date: 2026-10-17 22:41:09.338517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9a4c2f7b815'
+down_revision = 'd3f8b1c6e527'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.create_index('ix_articles_is_published_published_at', ['is_published', 'published_at'], unique=False)
+        batch_op.create_index('ix_articles_challenge_id_is_published_published_at', ['challenge_id', 'is_published', 'published_at'], unique=False)
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.create_index('ix_projects_status_display_order', ['status', 'display_order', 'created_at'], unique=False)
+        batch_op.create_index('ix_projects_status_is_featured_display_order', ['status', 'is_featured', 'display_order'], unique=False)
+        batch_op.create_index('ix_projects_challenge_id_status_display_order', ['challenge_id', 'status', 'display_order'], unique=False)
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.create_index('ix_comments_article_id_is_approved_created_at', ['article_id', 'is_approved', 'created_at'], unique=False)
+        batch_op.create_index('ix_comments_is_approved_created_at', ['is_approved', 'created_at'], unique=False)
+
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.create_index('ix_categories_parent_id', ['parent_id'], unique=False)
+
+    with op.batch_alter_table('article_categories', schema=None) as batch_op:
+        batch_op.create_index('ix_article_categories_category_id', ['category_id'], unique=False)
+
+
+def downgrade():
+    # MySQLは外部キー用に自動作成したインデックスを上記の複合インデックスで置き換えるため、
+    # 削除前に外部キー列の単一列インデックスを作り直す
+    if op.get_bind().dialect.name == 'mysql':
+        op.create_index('challenge_id', 'articles', ['challenge_id'], unique=False)
+        op.create_index('challenge_id', 'projects', ['challenge_id'], unique=False)
+        op.create_index('article_id', 'comments', ['article_id'], unique=False)
+        op.create_index('parent_id', 'categories', ['parent_id'], unique=False)
+        op.create_index('category_id', 'article_categories', ['category_id'], unique=False)
+
+    with op.batch_alter_table('article_categories', schema=None) as batch_op:
+        batch_op.drop_index('ix_article_categories_category_id')
+
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.drop_index('ix_categories_parent_id')
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index('ix_comments_is_approved_created_at')
+        batch_op.drop_index('ix_comments_article_id_is_approved_created_at')
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index('ix_projects_challenge_id_status_display_order')
+        batch_op.drop_index('ix_projects_status_is_featured_display_order')
+        batch_op.drop_index('ix_projects_status_display_order')
+
+    with op.batch_alter_table('articles', schema=None) as batch_op:
+        batch_op.drop_index('ix_articles_challenge_id_is_published_published_at')
+        batch_op.drop_index('ix_articles_is_published_published_at')
@@ -9,7 +9,10 @@ import pyotp
 import secrets
 import json
 from itsdangerous import URLSafeTimedSerializer
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
+from sqlalchemy.dialects import mysql
+from ua_classifier import classify_user_agent
+from flask import g
 
 db = SQLAlchemy()
 
@@ -116,6 +119,12 @@ class Challenge(db.Model):
 class Project(db.Model):
     """プロジェクト管理モデル"""
     __tablename__ = 'projects'
+    __table_args__ = (
+        # 一覧（公開中を表示順）・注目プロジェクト・チャレンジ別一覧
+        db.Index('ix_projects_status_display_order', 'status', 'display_order', 'created_at'),
+        db.Index('ix_projects_status_is_featured_display_order', 'status', 'is_featured', 'display_order'),
+        db.Index('ix_projects_challenge_id_status_display_order', 'challenge_id', 'status', 'display_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -150,6 +159,12 @@ class Project(db.Model):
     # リレーション
     challenge = db.relationship('Challenge', backref='projects')
     article = db.relationship('Article', backref='projects')
+    linked_articles = db.relationship(
+        'Article',
+        secondary='article_projects',
+        lazy='select',  # 一覧表示ではルート側で selectinload を指定してN+1を回避
+        back_populates='linked_projects'
+    )
     
     def __repr__(self):
         return f'<Project {self.title}>'
@@ -211,30 +226,22 @@ class Project(db.Model):
     
     @property
     def related_articles(self):
-        """このプロジェクトに関連する記事のリストを取得"""
-        from models import Article
-        # project_idsにこのプロジェクトのIDが含まれている記事を検索
-        articles = Article.query.filter(
-            Article.is_published == True,
-            Article.project_ids.like(f'%{self.id}%')
-        ).all()
-        
-        # JSON形式で保存されているので、正確にフィルタリング
-        related = []
-        for article in articles:
-            try:
-                if article.project_ids:
-                    project_ids = json.loads(article.project_ids)
-                    if self.id in project_ids:
-                        related.append(article)
-            except:
-                pass
-        return related
+        """このプロジェクトに関連する公開記事のリストを取得（新しい順）"""
+        articles = [article for article in self.linked_articles if article.is_published]
+        return sorted(articles, key=lambda article: article.published_at or datetime.min, reverse=True)
 
 # --- 中間テーブル: Article と Category の多対多関連 ---
 article_categories = db.Table('article_categories',
     db.Column('article_id', db.Integer, db.ForeignKey('articles.id'), primary_key=True),
-    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True),
+    db.Index('ix_article_categories_category_id', 'category_id')
+)
+
+# --- 中間テーブル: Article と Project の多対多関連 ---
+article_projects = db.Table('article_projects',
+    db.Column('article_id', db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('project_id', db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_article_projects_project_id', 'project_id')
 )
 
 class User(db.Model, UserMixin): # UserMixin を継承
@@ -294,7 +301,7 @@ class User(db.Model, UserMixin): # UserMixin を継承
     
     ext_json = db.Column(db.Text, nullable=True)  # 拡張用JSON
     
-    articles = db.relationship('Article', backref=db.backref('author', lazy='select'), lazy='selectin') # UserとArticleの1対多（パフォーマンス最適化）
+    articles = db.relationship('Article', backref=db.backref('author', lazy='select'), lazy='select') # UserとArticleの1対多（一覧で必要な場合はルート側でselectinloadを指定）
     
     def generate_totp_secret(self):
         """TOTP用のシークレットキーを生成"""
@@ -338,6 +345,11 @@ class User(db.Model, UserMixin): # UserMixin を継承
 
 class Article(db.Model):
     __tablename__ = 'articles'
+    __table_args__ = (
+        # 公開記事一覧（公開日順）・チャレンジ別一覧
+        db.Index('ix_articles_is_published_published_at', 'is_published', 'published_at'),
+        db.Index('ix_articles_challenge_id_is_published_published_at', 'challenge_id', 'is_published', 'published_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     slug = db.Column(db.String(255), unique=True, nullable=False)
@@ -370,70 +382,101 @@ class Article(db.Model):
     challenge_id = db.Column(db.Integer, db.ForeignKey('challenges.id'), nullable=True)
     challenge_day = db.Column(db.Integer, nullable=True)  # Day 1, Day 2, etc.
     
-    # プロジェクト関連
-    project_ids = db.Column(db.Text, nullable=True)  # JSON形式で複数プロジェクトID保存
-    
     # UI表示設定
     show_toc = db.Column(db.Boolean, default=True, nullable=False)  # 目次表示フラグ
     
     # 拡張用
     ext_json = db.Column(db.Text, nullable=True)
 
-    # Article から Category へのリレーションシップ（パフォーマンス最適化）
+    # Article から Category へのリレーションシップ
     categories = db.relationship(
         'Category',
         secondary=article_categories,
-        lazy='selectin',  # N+1問題回避のため selectin を使用
+        lazy='select',  # 一覧表示ではルート側で selectinload を指定してN+1を回避
         back_populates='articles'
     )
     
+    # Article から Project へのリレーションシップ（関連プロジェクト）
+    linked_projects = db.relationship(
+        'Project',
+        secondary=article_projects,
+        lazy='select',  # 一覧表示ではルート側で selectinload を指定してN+1を回避
+        back_populates='linked_articles'
+    )
+    
     # コメントとのリレーション（CASCADE削除対応）
     comments = db.relationship('Comment', back_populates='article', lazy='dynamic', cascade='all, delete-orphan')
-    
+
+    # 本文レンダリング結果のキャッシュ（1対1、記事削除時に連動削除）
+    render_cache = db.relationship('ArticleRenderCache', uselist=False, lazy='select', cascade='all, delete-orphan')
+
+    # 事前計算した関連記事（記事削除時に双方向とも連動削除）
+    relations = db.relationship('ArticleRelation', foreign_keys='ArticleRelation.article_id', lazy='dynamic',
+                                cascade='all, delete-orphan')
+    related_by = db.relationship('ArticleRelation', foreign_keys='ArticleRelation.related_article_id', lazy='dynamic',
+                                 cascade='all, delete-orphan')
+
     def get_text_content(self):
         """記事のテキストコンテンツを取得（検索用）"""
         return self.body or ''
     
     @property
     def related_projects(self):
-        """関連プロジェクトのリストを取得"""
-        if not self.project_ids:
-            return []
-        try:
-            project_ids = json.loads(self.project_ids)
-            if not project_ids:
-                return []
-            # IDリストからプロジェクトを取得
-            from models import Project
-            return Project.query.filter(
-                Project.id.in_(project_ids),
-                Project.status == 'active'
-            ).all()
-        except (json.JSONDecodeError, Exception):
-            return []
+        """公開中の関連プロジェクトのリストを取得"""
+        return [project for project in self.linked_projects if project.status == 'active']
+    
+    @property
+    def project_ids(self):
+        """関連プロジェクトのIDリストを取得"""
+        return [project.id for project in self.linked_projects]
+    
+    def set_projects(self, project_ids):
+        """関連プロジェクトをIDリストで設定"""
+        if not project_ids:
+            self.linked_projects = []
+            return
+        self.linked_projects = db.session.execute(select(Project).where(Project.id.in_(project_ids))).scalars().all()
     
     def add_project(self, project_id):
         """プロジェクトを関連付け"""
-        try:
-            current_ids = json.loads(self.project_ids) if self.project_ids else []
-            if project_id not in current_ids:
-                current_ids.append(project_id)
-                self.project_ids = json.dumps(current_ids)
-        except:
-            self.project_ids = json.dumps([project_id])
+        if project_id not in self.project_ids:
+            project = db.session.get(Project, project_id)
+            if project:
+                self.linked_projects.append(project)
     
     def remove_project(self, project_id):
         """プロジェクトの関連付けを解除"""
+        self.linked_projects = [project for project in self.linked_projects if project.id != project_id]
+
+class ArticleRenderCache(db.Model):
+    """記事本文のレンダリング結果キャッシュ（Markdown→HTML変換済みの本文・目次・抜粋）"""
+    __tablename__ = 'article_render_cache'
+
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)  # 本文＋レンダラーバージョンのSHA-256
+    html = db.Column(db.Text(16777215), nullable=False)  # MySQLではMEDIUMTEXT
+    toc_json = db.Column(db.Text, nullable=True)  # 目次（JSON形式）
+    excerpt = db.Column(db.Text, nullable=True)  # meta description用のプレーンテキスト抜粋
+    rendered_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ArticleRenderCache {self.article_id}: {self.content_hash[:8]}>'
+
+    @property
+    def toc(self):
+        """目次のリストを取得"""
+        if not self.toc_json:
+            return None
         try:
-            current_ids = json.loads(self.project_ids) if self.project_ids else []
-            if project_id in current_ids:
-                current_ids.remove(project_id)
-                self.project_ids = json.dumps(current_ids) if current_ids else None
-        except:
-            pass
+            return json.loads(self.toc_json)
+        except (json.JSONDecodeError, TypeError):
+            return None
 
 class Category(db.Model):
     __tablename__ = 'categories'
+    __table_args__ = (
+        db.Index('ix_categories_parent_id', 'parent_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False, unique=True)
     slug = db.Column(db.String(100), nullable=False, unique=True)
@@ -455,11 +498,11 @@ class Category(db.Model):
     parent = db.relationship('Category', remote_side=[id], backref=db.backref('children', lazy='select'))
     challenge = db.relationship('Challenge', backref=db.backref('categories', lazy='select'))
 
-    # Category から Article へのリレーションシップ（パフォーマンス最適化）
+    # Category から Article へのリレーションシップ
     articles = db.relationship(
         'Article',
         secondary=article_categories,
-        lazy='selectin',  # N+1問題回避のため selectin を使用
+        lazy='select',  # 必要なルートでのみ selectinload を指定
         back_populates='categories'
     )
 
@@ -468,6 +511,11 @@ class Category(db.Model):
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        # 記事ごとの承認済みコメント（投稿順）・未承認コメント一覧
+        db.Index('ix_comments_article_id_is_approved_created_at', 'article_id', 'is_approved', 'created_at'),
+        db.Index('ix_comments_is_approved_created_at', 'is_approved', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     article_id = db.Column(db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), nullable=False)
     author_name = db.Column(db.String(100), nullable=False)
@@ -483,7 +531,7 @@ class Comment(db.Model):
     
     # リレーションシップ（パフォーマンス最適化） - CASCADE削除対応
     article = db.relationship('Article', back_populates='comments')
-    parent = db.relationship('Comment', remote_side=[id], backref=db.backref('replies', lazy='selectin'))
+    parent = db.relationship('Comment', remote_side=[id], backref=db.backref('replies', lazy='select'))
     
     @property
     def decrypted_author_name(self):
@@ -555,11 +603,67 @@ class SiteSetting(db.Model):
     def __repr__(self):
         return f'<SiteSetting {self.key}: {self.value}>'
     
+    # 設定変更を他ワーカーへ通知するためのバージョン名
+    CACHE_VERSION_NAME = 'settings'
+
+    @staticmethod
+    def get_snapshot():
+        """全設定のスナップショットを取得（バージョン変更時のみ1クエリで再読込）"""
+        global _settings_snapshot
+        version = CacheVersion.get_version(SiteSetting.CACHE_VERSION_NAME)
+        snapshot = _settings_snapshot
+        if snapshot is None or snapshot['version'] != version:
+            rows = db.session.execute(
+                select(SiteSetting.key, SiteSetting.value, SiteSetting.setting_type, SiteSetting.is_public)
+            ).all()
+            snapshot = {
+                'version': version,
+                'settings': {row.key: row for row in rows},
+                'public': SiteSetting._convert_public_settings(rows),
+            }
+            _settings_snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def _convert_public_settings(rows):
+        """公開設定を設定タイプに応じた値に変換"""
+        settings = {}
+        for row in rows:
+            if not row.is_public:
+                continue
+            value = row.value
+
+            if row.setting_type == 'boolean':
+                value = (value or '').lower() == 'true'
+            elif row.setting_type == 'number':
+                try:
+                    value = float(value) if '.' in value else int(value)
+                except (TypeError, ValueError):
+                    value = 0
+            elif row.setting_type == 'json':
+                try:
+                    value = json.loads(value) if value else {}
+                except json.JSONDecodeError:
+                    value = {}
+
+            settings[row.key] = value
+        return settings
+
+    @staticmethod
+    def get_public_settings():
+        """公開設定を型変換済みの辞書で取得"""
+        return dict(SiteSetting.get_snapshot()['public'])
+
     @staticmethod
     def get_setting(key, default=None):
         """設定値を取得"""
-        setting = db.session.execute(select(SiteSetting).where(SiteSetting.key == key)).scalar_one_or_none()
+        setting = SiteSetting.get_snapshot()['settings'].get(key)
         return setting.value if setting else default
+
+    @staticmethod
+    def bump_version():
+        """設定変更を記録してキャッシュを無効化（コミットは呼び出し元で行う）"""
+        CacheVersion.bump(SiteSetting.CACHE_VERSION_NAME)
     
     @staticmethod
     def set_setting(key, value, description=None, setting_type='text', is_public=False):
@@ -580,9 +684,46 @@ class SiteSetting(db.Model):
                 is_public=is_public
             )
             db.session.add(setting)
+        SiteSetting.bump_version()
         db.session.commit()
         return setting
 
+# プロセス内で共有する設定スナップショット（SiteSetting.get_snapshotで更新）
+_settings_snapshot = None
+
+
+class CacheVersion(db.Model):
+    """キャッシュ無効化用のバージョンカウンタ（ワーカー間でデータ更新を検知）"""
+    __tablename__ = 'cache_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name}: {self.version}>'
+
+    @staticmethod
+    def get_version(name):
+        """現在のバージョンを取得（1リクエスト内ではDB参照は最初の1回のみ）"""
+        versions = g.setdefault('_cache_versions', {})
+        if name not in versions:
+            row = db.session.get(CacheVersion, name)
+            versions[name] = row.version if row else 0
+        return versions[name]
+
+    @staticmethod
+    def bump(name):
+        """バージョンを1つ進める（コミットは呼び出し元で行う）"""
+        result = db.session.execute(
+            update(CacheVersion)
+            .where(CacheVersion.name == name)
+            .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+        )
+        if result.rowcount == 0:
+            db.session.add(CacheVersion(name=name, version=1))
+        # 同一リクエスト内の以降の参照でも新しいバージョンを読み直す
+        g.get('_cache_versions', {}).pop(name, None)
+
 # --- 画像管理用モデル ---
 
 class UploadedImage(db.Model):
@@ -674,17 +815,8 @@ class LoginHistory(db.Model):
         if not self.user_agent:
             return "不明"
         
-        ua = self.user_agent.lower()
-        if 'chrome' in ua:
-            return 'Chrome'
-        elif 'firefox' in ua:
-            return 'Firefox'
-        elif 'safari' in ua and 'chrome' not in ua:
-            return 'Safari'
-        elif 'edge' in ua:
-            return 'Edge'
-        else:
-            return 'その他'
+        browser = classify_user_agent(self.user_agent).browser
+        return 'その他' if browser in ('Other', 'Unknown') else browser
     
     @property
     def os_info(self):
@@ -692,19 +824,8 @@ class LoginHistory(db.Model):
         if not self.user_agent:
             return "不明"
         
-        ua = self.user_agent.lower()
-        if 'windows' in ua:
-            return 'Windows'
-        elif 'mac' in ua:
-            return 'macOS'
-        elif 'linux' in ua:
-            return 'Linux'
-        elif 'android' in ua:
-            return 'Android'
-        elif 'iphone' in ua or 'ipad' in ua:
-            return 'iOS'
-        else:
-            return 'その他'
+        os_family = classify_user_agent(self.user_agent).os_family
+        return 'その他' if os_family in ('Other', 'Unknown') else os_family
 
 # --- SEO分析用モデル ---
 
@@ -726,6 +847,88 @@ class SEOAnalysis(db.Model):
     def __repr__(self):
         return f'<SEOAnalysis {self.analysis_type}: {self.score}>'
 
+# --- 全文検索インデックス ---
+
+class SearchIndexEntry(db.Model):
+    """全文検索の転置インデックス（語 → 記事・プロジェクト）"""
+    __tablename__ = 'search_index'
+    __table_args__ = (
+        db.Index('ix_search_index_doc_type_term', 'doc_type', 'term'),
+    )
+    
+    doc_type = db.Column(db.String(20), primary_key=True)  # article, project
+    doc_id = db.Column(db.Integer, primary_key=True)
+    # 日本語は2文字単位、英数字は単語単位（MySQLでは濁点・大小文字を区別するためバイナリ照合順序）
+    term = db.Column(db.String(64).with_variant(mysql.VARCHAR(64, collation='utf8mb4_bin'), 'mysql'), primary_key=True)
+    weight = db.Column(db.Integer, nullable=False, default=1)  # 出現回数×フィールド重み
+    
+    def __repr__(self):
+        return f'<SearchIndexEntry {self.doc_type}:{self.doc_id} {self.term}>'
+
+# --- 関連記事 ---
+
+class ArticleRelation(db.Model):
+    """記事ごとの関連記事（上位K件を事前計算して保存）"""
+    __tablename__ = 'article_relations'
+    
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 0が最も関連度が高い
+    related_article_id = db.Column(db.Integer, db.ForeignKey('articles.id', ondelete='CASCADE'), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ArticleRelation {self.article_id} -> {self.related_article_id} #{self.rank}>'
+
+# --- 外部リンクカード（OGP）キャッシュ ---
+
+class OGPCacheEntry(db.Model):
+    """外部URLのOGP取得結果（取得失敗も短い有効期限で保存）"""
+    __tablename__ = 'ogp_cache'
+    
+    url_hash = db.Column(db.String(64), primary_key=True)  # URLのSHA-256
+    url = db.Column(db.Text, nullable=False)
+    data = db.Column(db.Text, nullable=False)  # JSON形式のOGPデータ
+    is_failure = db.Column(db.Boolean, default=False, nullable=False)  # 取得失敗のキャッシュ
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<OGPCacheEntry {self.url[:50]}>'
+
+# --- アクセスログ集計 ---
+
+class AccessLogCheckpoint(db.Model):
+    """アクセスログの集計済み位置（ファイルごとのinode・バイトオフセット）"""
+    __tablename__ = 'access_log_checkpoints'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    log_path = db.Column(db.String(500), nullable=False, unique=True)
+    inode = db.Column(db.BigInteger, nullable=True)  # ローテーション検知用
+    offset = db.Column(db.BigInteger, nullable=False, default=0)  # 集計済みバイト位置
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<AccessLogCheckpoint {self.log_path}: {self.offset}>'
+
+
+class AccessLogRollup(db.Model):
+    """アクセスログの時間別・日別集計結果"""
+    __tablename__ = 'access_log_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('source', 'period', 'period_start', name='uq_access_log_rollups_period_start'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(500), nullable=False)  # 集計元ログファイルのパス
+    period = db.Column(db.String(10), nullable=False)  # 'hour', 'day'
+    period_start = db.Column(db.DateTime, nullable=False)  # 集計期間の開始日時
+    data = db.Column(db.Text(16777215), nullable=False)  # JSON形式の集計カウンタ
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<AccessLogRollup {self.period}: {self.period_start}>'
+
 # --- メールアドレス変更要求管理 ---
 
 class EmailChangeRequest(db.Model):
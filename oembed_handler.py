@@ -4,14 +4,25 @@ python-oembedライブラリを使用した確実なSNS埋込実装
 """
 import re
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from urllib.parse import urlparse
-from oembed import OEmbedError, OEmbedNoEndpoint, OEmbedInvalidRequest
-import oembed
 from flask import current_app
-from seo import fetch_ogp_data, generate_ogp_card
+from seo import fetch_ogp_data, generate_ogp_card, ogp_cache, link_preview_worker
+from http_client import http_client
 
 logger = logging.getLogger(__name__)
 
+# <p>タグ内の単独URL（埋込・OGPカードに変換する対象）
+EMBED_URL_PATTERN = re.compile(r'<p>\s*(https?://[^\s<]+)\s*</p>')
+
+# 保存時の先読み設定
+PREFETCH_MAX_WORKERS = 8
+PREFETCH_TIMEOUT = 15  # 保存処理で待機する最大秒数（超過分はバックグラウンドで継続）
+
+_prefetch_executor = None
+_prefetch_lock = threading.Lock()
+
 # oEmbedプロバイダーのカスタム設定
 OEMBED_PROVIDERS = {
     'youtube.com': {
@@ -27,6 +38,7 @@ OEMBED_PROVIDERS = {
         'schemes': ['https://www.instagram.com/p/*', 'https://www.instagram.com/reel/*']
     }
 }
+YOUTUBE_OEMBED_ENDPOINT = OEMBED_PROVIDERS['youtube.com']['endpoint']
 
 def process_urls_in_text(text):
     """
@@ -82,29 +94,49 @@ def get_oembed_html(url):
     if 'instagram.com' in url:
         return generate_instagram_embed(url)
     
-    # YouTubeのみoEmbedを使用（安定している）
+    # YouTubeのみoEmbedを使用（取得はバックグラウンドで行い、未取得の間はnocookieの埋込を表示）
     if 'youtube.com' in url or 'youtu.be' in url:
-        try:
-            consumer = oembed.OEmbedConsumer()
-            youtube_endpoint = oembed.OEmbedEndpoint('https://www.youtube.com/oembed',
-                                                     ['https://www.youtube.com/watch?v=*', 
-                                                      'https://youtu.be/*'])
-            consumer.addEndpoint(youtube_endpoint)
-            
-            response = consumer.embed(url)
-            if response and hasattr(response, 'getData'):
-                data = response.getData()
-                if data and 'html' in data:
-                    html = data['html']
-                    # YouTubeをレスポンシブに
-                    html = html.replace('width="', 'width="100%" style="max-width:')
-                    html = html.replace('height="', 'height="315" data-height="')
-                    return html
-        except Exception as e:
-            logger.debug(f"YouTube oEmbed failed for {url}: {e}")
+        oembed_data = ogp_cache.get(f'oembed:{url}')
+        if oembed_data is None:
+            link_preview_worker.submit(('oembed', url), fetch_youtube_oembed, url)
+        elif oembed_data.get('html'):
+            return oembed_data['html']
+        return generate_youtube_nocookie_iframe(url)
     
     return None
 
+def fetch_youtube_oembed(url):
+    """
+    YouTubeのoEmbed APIから埋込HTMLを取得してキャッシュに保存（バックグラウンド実行用）
+    """
+    html = None
+    try:
+        # 共有セッションでoEmbed APIを直接呼び出す（接続を再利用）
+        response = http_client.get(YOUTUBE_OEMBED_ENDPOINT, params={'url': url, 'format': 'json'},
+                                   headers={'Accept': 'application/json'})
+        response.raise_for_status()
+        data = response.json()
+        if data and 'html' in data:
+            html = data['html']
+            # YouTubeをレスポンシブに
+            html = html.replace('width="', 'width="100%" style="max-width:')
+            html = html.replace('height="', 'height="315" data-height="')
+    except Exception as e:
+        logger.debug(f"YouTube oEmbed failed for {url}: {e}")
+    
+    # 失敗時は空のデータを保存（短時間のみキャッシュされる）
+    ogp_cache.set(f'oembed:{url}', {'html': html} if html else {})
+    return html
+
+def generate_youtube_nocookie_iframe(url):
+    """
+    YouTube URLから動画IDを抽出してyoutube-nocookieの埋込iframeを生成
+    """
+    video_match = re.search(r'(?:youtube\.com/watch\?v=|youtu\.be/)([a-zA-Z0-9_-]+)', url)
+    if not video_match:
+        return None
+    return f'<iframe width="100%" height="315" src="https://www.youtube-nocookie.com/embed/{video_match.group(1)}" title="YouTube video player" frameborder="0" allowfullscreen></iframe>'
+
 def generate_twitter_blockquote(url):
     """
     Twitter/X URLから標準的なブロッククォート埋込HTMLを生成
@@ -172,7 +204,7 @@ def process_markdown_content(markdown_html):
         return markdown_html
     
     # <p>タグ内の単独URLのみを検出
-    p_url_pattern = r'<p>\s*(https?://[^\s<]+)\s*</p>'
+    p_url_pattern = EMBED_URL_PATTERN
     
     def replace_p_url(match):
         url = match.group(1).strip()
@@ -201,4 +233,58 @@ def process_markdown_content(markdown_html):
     
     # URLを埋込に置換
     result = re.sub(p_url_pattern, replace_p_url, markdown_html)
-    return result
\ No newline at end of file
+    return result
+
+def extract_prefetch_targets(markdown_html):
+    """
+    マークダウン処理後のHTMLから外部取得が必要な埋込URLを抽出（(種別, URL) のリスト、重複除去済み）
+    """
+    targets = []
+    for url in dict.fromkeys(match.strip() for match in EMBED_URL_PATTERN.findall(markdown_html or '')):
+        if any(domain in url for domain in ['twitter.com', 'x.com']) and generate_twitter_blockquote(url):
+            continue
+        if 'instagram.com' in url and generate_instagram_embed(url):
+            continue
+        if any(domain in url for domain in ['youtube.com', 'youtu.be']):
+            targets.append(('oembed', url))
+        else:
+            targets.append(('ogp', url))
+    return targets
+
+def prefetch_embeds(markdown_html, timeout=PREFETCH_TIMEOUT):
+    """
+    埋込URLのOGP・oEmbedデータを並列に取得してキャッシュに保存（ホストごとの同時接続数は共有のhttp_clientで制限）
+    
+    Returns:
+        新たに取得を開始したURL数
+    """
+    global _prefetch_executor
+    targets = [(kind, url) for kind, url in extract_prefetch_targets(markdown_html)
+               if ogp_cache.get(f'oembed:{url}' if kind == 'oembed' else url) is None]
+    if not targets:
+        return 0
+    
+    with _prefetch_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS,
+                                                    thread_name_prefix='embed-prefetch')
+    
+    app = current_app._get_current_object()
+    futures = [_prefetch_executor.submit(_prefetch_one, app, kind, url) for kind, url in targets]
+    done, not_done = wait(futures, timeout=timeout)
+    if not_done:
+        current_app.logger.info(f"Embed prefetch: {len(not_done)} URL(s) still fetching in background")
+    return len(targets)
+
+def _prefetch_one(app, kind, url):
+    """
+    1件の埋込データを取得（取得処理はhttp_client経由のため、表示時の取得と同じホスト別の上限に従う）
+    """
+    with app.app_context():
+        try:
+            if kind == 'oembed':
+                fetch_youtube_oembed(url)
+            else:
+                fetch_ogp_data(url, force_refresh=True)
+        except Exception as e:
+            app.logger.warning(f"Embed prefetch error for {url}: {e}")
\ No newline at end of file
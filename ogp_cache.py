@@ -0,0 +1,218 @@
+"""
+OGPキャッシュモジュール
+プロセス内LRU（1段目）とデータベース（2段目）の2層構成で、取得成功・失敗で別々の有効期限を持つ
+"""
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app, g
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+
+OGP_CACHE_DURATION = 24 * 60 * 60  # 取得成功: 1日
+OGP_FAILURE_CACHE_DURATION = 5 * 60  # 取得失敗: 5分（一時的な障害から早く復帰するため短くする）
+OGP_MEMORY_CACHE_SIZE = 512
+# プロセス内キャッシュの無効化に使うキャッシュバージョン名
+OGP_CACHE_VERSION_NAME = 'ogp'
+# キャッシュバージョンを確認する間隔（秒）
+VERSION_CHECK_INTERVAL = 5
+
+
+class MemoryCacheTier:
+    """プロセス内のLRUキャッシュ（件数上限付き）
+    version_nameを指定すると、一定間隔ごとにキャッシュバージョンを確認し、他ワーカーでclear()されていれば破棄する"""
+
+    def __init__(self, maxsize=OGP_MEMORY_CACHE_SIZE, version_name=None, version_check_interval=VERSION_CHECK_INTERVAL):
+        self.maxsize = maxsize
+        self.version_name = version_name
+        self.version_check_interval = version_check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+
+    def get(self, key):
+        """(データ, 有効期限) を取得（未登録ならNone）"""
+        self._ensure_fresh()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, url, data, expires_at, is_failure):
+        """保存（上限を超えたら最も古く使われたものから削除）"""
+        with self._lock:
+            self._entries[key] = (data, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """全件削除（キャッシュバージョンを進めて他ワーカーのプロセス内キャッシュも無効化）"""
+        with self._lock:
+            self._entries.clear()
+        if self.version_name:
+            self._version = self._bump_version()
+            self._checked_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        """一定間隔ごとにキャッシュバージョンを確認し、変わっていれば全件破棄"""
+        if not self.version_name or time.monotonic() - self._checked_at < self.version_check_interval:
+            return
+        from models import CacheVersion
+        try:
+            version = CacheVersion.get_version(self.version_name)
+        except Exception as e:
+            # 確認できない場合は保持中のデータのまま応答を続ける
+            current_app.logger.warning(f"OGP cache version check error: {e}")
+            return
+        with self._lock:
+            if self._version is not None and version != self._version:
+                self._entries.clear()
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def _bump_version(self):
+        """キャッシュバージョンを1つ進めて新しい値を返す（呼び出し元のセッションに影響しないよう別接続で更新）"""
+        from models import db, CacheVersion
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                update(CacheVersion)
+                .where(CacheVersion.name == self.version_name)
+                .values(version=CacheVersion.version + 1, updated_at=datetime.utcnow())
+            )
+            if result.rowcount == 0:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(CacheVersion.__table__.insert().values(name=self.version_name, version=1))
+                except IntegrityError:
+                    pass
+            version = conn.execute(
+                select(CacheVersion.version).where(CacheVersion.name == self.version_name)
+            ).scalar_one()
+        # 同一リクエスト内の以降の参照でも新しいバージョンを読み直す
+        g.get('_cache_versions', {}).pop(self.version_name, None)
+        return version
+
+
+class DatabaseCacheTier:
+    """ogp_cacheテーブルによる永続キャッシュ（再起動後・ワーカー間で共有）"""
+
+    def get(self, key):
+        """(データ, 有効期限) を取得（未登録ならNone）"""
+        from models import db, OGPCacheEntry
+        # 呼び出し元のセッション（記事保存中など）に影響しないよう別接続で読み書きする
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(OGPCacheEntry.data, OGPCacheEntry.expires_at).where(OGPCacheEntry.url_hash == key)
+            ).first()
+        if row is None:
+            return None
+        return json.loads(row.data), row.expires_at
+
+    def set(self, key, url, data, expires_at, is_failure):
+        """保存（既存があれば上書き）"""
+        from models import db, OGPCacheEntry
+        values = dict(
+            url=url,
+            data=json.dumps(data, ensure_ascii=False),
+            is_failure=is_failure,
+            fetched_at=datetime.utcnow(),
+            expires_at=expires_at,
+        )
+        with db.engine.begin() as conn:
+            result = conn.execute(update(OGPCacheEntry).where(OGPCacheEntry.url_hash == key).values(**values))
+            if result.rowcount == 0:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(OGPCacheEntry.__table__.insert().values(url_hash=key, **values))
+                except IntegrityError:
+                    # 他ワーカーが同時に保存した場合はそちらを優先
+                    pass
+
+    def clear(self):
+        """全件削除"""
+        from models import db, OGPCacheEntry
+        with db.engine.begin() as conn:
+            conn.execute(delete(OGPCacheEntry))
+
+    def purge_expired(self):
+        """有効期限切れのエントリを削除"""
+        from models import db, OGPCacheEntry
+        with db.engine.begin() as conn:
+            conn.execute(delete(OGPCacheEntry).where(OGPCacheEntry.expires_at < datetime.utcnow()))
+
+
+class OGPCache:
+    """多層OGPキャッシュ（前の層から順に参照し、下位層で見つかったら上位層に昇格）"""
+
+    def __init__(self, tiers, ttl=OGP_CACHE_DURATION, failure_ttl=OGP_FAILURE_CACHE_DURATION):
+        self.tiers = tiers
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.stats = {'hits': {type(tier).__name__: 0 for tier in tiers}, 'misses': 0, 'stale': 0}
+
+    @staticmethod
+    def make_key(url):
+        """URLからキャッシュキーを生成"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def get(self, url, allow_expired=False):
+        """有効なキャッシュがあればOGPデータを返す（取得失敗のキャッシュは空の辞書、未キャッシュはNone）
+        allow_expired=Trueの場合は期限切れのデータも返す（条件付きリクエストでの再検証用）"""
+        key = self.make_key(url)
+        now = datetime.utcnow()
+        stale = None
+        for index, tier in enumerate(self.tiers):
+            try:
+                entry = tier.get(key)
+            except Exception as e:
+                current_app.logger.warning(f"OGP cache read error ({type(tier).__name__}): {e}")
+                continue
+            if entry is None:
+                continue
+            data, expires_at = entry
+            if expires_at <= now:
+                if stale is None:
+                    stale = data
+                continue
+            # 上位層に昇格
+            for upper in self.tiers[:index]:
+                upper.set(key, url, data, expires_at, not data)
+            if not allow_expired:
+                self.stats['hits'][type(tier).__name__] += 1
+            return data
+        if allow_expired:
+            return stale
+        if stale is not None:
+            self.stats['stale'] += 1
+        else:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, url, data):
+        """OGPデータを全層に保存（空のデータは取得失敗として短い有効期限で保存）"""
+        key = self.make_key(url)
+        is_failure = not data
+        expires_at = datetime.utcnow() + timedelta(seconds=self.failure_ttl if is_failure else self.ttl)
+        for tier in self.tiers:
+            try:
+                tier.set(key, url, data, expires_at, is_failure)
+            except Exception as e:
+                current_app.logger.warning(f"OGP cache write error ({type(tier).__name__}): {e}")
+
+    def get_stats(self):
+        """層別ヒット数・未キャッシュ数・期限切れ数を取得"""
+        return {'hits': dict(self.stats['hits']), 'misses': self.stats['misses'], 'stale': self.stats['stale']}
+
+    def clear(self):
+        """全層のキャッシュを削除（他ワーカーが古いデータを再昇格しないよう下位層から削除）"""
+        for tier in reversed(self.tiers):
+            try:
+                tier.clear()
+            except Exception as e:
+                current_app.logger.warning(f"OGP cache clear error ({type(tier).__name__}): {e}")
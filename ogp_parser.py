@@ -0,0 +1,129 @@
+"""
+OGP抽出用ストリーミングHTMLパーサー
+レスポンスを先頭から少しずつ解析し、</head>に達するか必要な項目が揃った時点で読み込みを打ち切る
+"""
+import re
+import codecs
+from html.parser import HTMLParser
+
+# 1ページあたりの読み込み上限（<head>が異常に長いページ対策）
+MAX_HEAD_BYTES = 64 * 1024
+
+OG_FIELDS = {
+    'og:title': 'title',
+    'og:description': 'description',
+    'og:image': 'image',
+    'og:site_name': 'site_name',
+    'og:url': 'url',
+}
+TWITTER_FIELDS = {
+    'twitter:title': 'title',
+    'twitter:description': 'description',
+    'twitter:image': 'image',
+}
+
+_META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([a-zA-Z0-9_-]+)', re.IGNORECASE)
+
+
+class OGPHeadParser(HTMLParser):
+    """<head>内のOGP・Twitterカード・title・descriptionを抽出するパーサー"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.og = {}
+        self.twitter = {}
+        self.title = None
+        self.description = None
+        self.done = False
+        self._in_title = False
+        self._title_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta':
+            self._handle_meta(dict(attrs))
+        elif tag == 'title' and self.title is None:
+            self._in_title = True
+        elif tag == 'body':
+            self.done = True
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self._in_title:
+            self._in_title = False
+            self.title = ''.join(self._title_parts).strip()
+        elif tag == 'head':
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+    def _handle_meta(self, attrs):
+        content = (attrs.get('content') or '').strip()
+        if not content:
+            return
+        prop = (attrs.get('property') or '').lower()
+        name = (attrs.get('name') or '').lower()
+        if prop in OG_FIELDS:
+            self.og.setdefault(OG_FIELDS[prop], content)
+        # twitter:系はproperty属性で書かれていることもある
+        for key in (name, prop):
+            if key in TWITTER_FIELDS:
+                self.twitter.setdefault(TWITTER_FIELDS[key], content)
+        if name == 'description' and self.description is None:
+            self.description = content
+        # OGPの主要項目が揃えば残りは読まなくてよい
+        if len(self.og) == len(OG_FIELDS):
+            self.done = True
+
+    def get_data(self):
+        """OGP → Twitterカード → title/descriptionの優先順で結果を組み立てる"""
+        data = dict(self.og)
+        for key, value in self.twitter.items():
+            data.setdefault(key, value)
+        if not data.get('title'):
+            title = self.title if self.title is not None else ''.join(self._title_parts).strip()
+            if title:
+                data['title'] = title
+        if not data.get('description') and self.description:
+            data['description'] = self.description
+        return data
+
+
+def detect_encoding(first_chunk, declared_encoding=None):
+    """Content-Typeのcharset、なければ先頭のmetaタグからエンコーディングを判定（既定はUTF-8）"""
+    candidates = [declared_encoding]
+    match = _META_CHARSET_PATTERN.search(first_chunk)
+    if match:
+        candidates.append(match.group(1).decode('ascii'))
+    for encoding in candidates:
+        if not encoding:
+            continue
+        try:
+            return codecs.lookup(encoding).name
+        except LookupError:
+            continue
+    return 'utf-8'
+
+
+def parse_ogp_stream(chunks, declared_encoding=None, max_bytes=MAX_HEAD_BYTES):
+    """
+    バイト列のチャンクを順に解析してOGPデータを返す
+    :return: (OGPデータ, 読み込んだバイト数)
+    """
+    parser = OGPHeadParser()
+    decoder = None
+    read_bytes = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(detect_encoding(chunk, declared_encoding))(errors='replace')
+        read_bytes += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or read_bytes >= max_bytes:
+            break
+    parser.close()
+    return parser.get_data(), read_bytes
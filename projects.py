@@ -3,8 +3,10 @@ Projects Blueprint - プロジェクト機能
 """
 from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
 from flask_login import current_user, login_required
+from sqlalchemy.orm import selectinload
 from models import db, Project, Challenge, Article
 from utils import generate_ogp_data
+from search_index_service import SearchIndexService
 from datetime import datetime
 import json
 
@@ -43,7 +45,7 @@ def projects_list(page=1, challenge_id=None):
     challenges = Challenge.query.order_by(Challenge.display_order.asc()).all()
     
     # 注目プロジェクト（is_featured=True）
-    featured_projects = Project.query.filter(
+    featured_projects = Project.query.options(selectinload(Project.linked_articles)).filter(
         Project.status == 'active',
         Project.is_featured == True
     ).order_by(Project.display_order.asc()).limit(6).all()
@@ -87,7 +89,7 @@ def project_detail(slug):
     ogp_data = generate_ogp_data(
         title=project.title,
         description=project.description,
-        image=project.featured_image,
+        image_url=project.featured_image,
         url=request.url
     )
     
@@ -147,6 +149,8 @@ class ProjectService:
         )
         
         db.session.add(project)
+        db.session.flush()
+        SearchIndexService.index_project(project)
         db.session.commit()
         return project
     
@@ -160,6 +164,7 @@ class ProjectService:
                 setattr(project, key, value)
         
         project.updated_at = datetime.utcnow()
+        SearchIndexService.index_project(project)
         db.session.commit()
         return project
     
@@ -246,7 +251,20 @@ class ProjectService:
         """プロジェクト検索"""
         search_query = Project.query.filter(Project.status == 'active')
         
+        if challenge_id:
+            search_query = search_query.filter(Project.challenge_id == challenge_id)
+        
         if query:
+            # 全文検索インデックスから関連度順に取得
+            ranked_ids = SearchIndexService.search('project', query)
+            if ranked_ids is not None:
+                if not ranked_ids:
+                    return []
+                return search_query.filter(Project.id.in_(ranked_ids)).order_by(
+                    SearchIndexService.order_by_rank(Project.id, ranked_ids)
+                ).limit(limit).all()
+            
+            # 語に分割できない検索語（記号のみ等）やインデックス未作成の間は部分一致で検索
             search_pattern = f"%{query}%"
             search_query = search_query.filter(
                 db.or_(
@@ -256,9 +274,6 @@ class ProjectService:
                 )
             )
         
-        if challenge_id:
-            search_query = search_query.filter(Project.challenge_id == challenge_id)
-        
         return search_query.order_by(
             Project.display_order.asc(),
             Project.created_at.desc()
@@ -269,6 +284,7 @@ class ProjectService:
         """プロジェクトアーカイブ"""
         project = Project.query.get_or_404(project_id)
         project.status = 'archived'
+        SearchIndexService.index_project(project)
         db.session.commit()
         return project
     
@@ -277,5 +293,6 @@ class ProjectService:
         """プロジェクト復元"""
         project = Project.query.get_or_404(project_id)
         project.status = 'active'
+        SearchIndexService.index_project(project)
         db.session.commit()
         return project
\ No newline at end of file
@@ -0,0 +1,265 @@
+"""
+関連記事サービス
+公開記事どうしの関連度（本文のTF-IDF類似度・共通カテゴリ・同じチャレンジ・チャレンジ日の近さ）を
+NumPyでまとめて計算し、記事ごとの上位K件をarticle_relationsテーブルに保存する
+"""
+import os
+import time
+import threading
+from collections import defaultdict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, delete, insert
+from models import db, Article, ArticleRelation, SearchIndexEntry, article_categories
+
+RELATED_TOP_K = 10
+# 関連度の重み（合計1）
+RELATED_WEIGHTS = {'text': 0.5, 'category': 0.25, 'challenge': 0.1, 'day': 0.15}
+# 類似度計算に使う語数の上限（出現文書数が少ない語＝特徴的な語を優先）
+MAX_TEXT_FEATURES = 4096
+# 計算順序による誤差で順位が揺れないよう関連度を丸める桁数
+SCORE_DECIMALS = 9
+# 保存済みの一覧と比較する際の桁数（MySQLのFLOAT型は単精度のため）
+COMPARE_DECIMALS = 6
+# 関連度行列を一度に計算する記事数
+REBUILD_CHUNK_SIZE = 256
+# 記事保存後に再計算を始めるまでの待ち時間（秒、連続した保存を1回の再計算にまとめる）
+REBUILD_DELAY = 2.0
+
+
+class RelatedArticleService:
+    """関連記事サービスクラス"""
+
+    @staticmethod
+    def schedule_rebuild():
+        """記事の保存・削除後に関連記事の再計算をバックグラウンドで予約（計算済みの一覧は再計算まで古いまま表示）"""
+        related_article_rebuilder.request()
+
+    @staticmethod
+    def rebuild(top_k=RELATED_TOP_K):
+        """
+        全公開記事の関連記事を計算し、内容が変わった一覧だけを書き換える（保存した記事数を返す）
+        本文の類似度は全記事の語の出現文書数（IDF）に依存し、1記事の公開・編集・削除でも
+        他の記事どうしの関連度が変わるため常に全体を計算する
+        （記事数の2乗に比例するため、リクエスト内では呼ばず schedule_rebuild かCLIの一括処理で実行する）
+        """
+        try:
+            features = RelatedArticleService._load_features()
+            ids = features['ids']
+
+            current = defaultdict(list)
+            for row in db.session.execute(
+                select(ArticleRelation.article_id, ArticleRelation.related_article_id, ArticleRelation.score)
+                .order_by(ArticleRelation.article_id, ArticleRelation.rank)
+            ):
+                current[row.article_id].append((row.related_article_id, round(row.score, COMPARE_DECIMALS)))
+
+            # 行列が大きくならないよう一定行数ずつ計算する
+            computed = {}
+            if len(ids) > 1:
+                for start in range(0, len(ids), REBUILD_CHUNK_SIZE):
+                    chunk = range(start, min(start + REBUILD_CHUNK_SIZE, len(ids)))
+                    scores = RelatedArticleService._compute_scores(features, chunk)
+                    for k, i in enumerate(chunk):
+                        computed[ids[i]] = [(ids[j], score)
+                                            for j, score in RelatedArticleService._top_k(scores[k], top_k)]
+
+            changed = [
+                article_id for article_id in set(current) | set(computed)
+                if current.get(article_id, []) != [(related_id, round(score, COMPARE_DECIMALS))
+                                                   for related_id, score in computed.get(article_id, [])]
+            ]
+            if changed:
+                db.session.execute(delete(ArticleRelation).where(ArticleRelation.article_id.in_(changed)))
+                now = datetime.utcnow()
+                rows = [
+                    {'article_id': article_id, 'rank': rank, 'related_article_id': related_id,
+                     'score': score, 'computed_at': now}
+                    for article_id in changed
+                    for rank, (related_id, score) in enumerate(computed.get(article_id, []))
+                ]
+                if rows:
+                    db.session.execute(insert(ArticleRelation), rows)
+            db.session.commit()
+            return len(ids), None
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"関連記事再計算エラー: {str(e)}")
+            return None, str(e)
+
+    @staticmethod
+    def _load_features():
+        """公開記事の特徴量（TF-IDF行列・カテゴリ行列・チャレンジ・チャレンジ日）を読み込む"""
+        import numpy as np
+
+        articles = db.session.execute(
+            select(Article.id, Article.challenge_id, Article.challenge_day)
+            .where(Article.is_published == True)
+            .order_by(Article.published_at, Article.id)
+        ).all()
+        ids = [row.id for row in articles]
+        index = {article_id: i for i, article_id in enumerate(ids)}
+        n = len(ids)
+
+        # 本文のTF-IDF（全文検索インデックスの語と重みを利用）
+        postings = db.session.connection().execute(
+            select(SearchIndexEntry.doc_id, SearchIndexEntry.term, SearchIndexEntry.weight)
+            .where(SearchIndexEntry.doc_type == 'article')
+        ).all()
+        text = np.zeros((n, 0))
+        if n and postings:
+            doc_ids, terms, weights = zip(*postings)
+            lookup = np.full(max(max(doc_ids), max(ids)) + 1, -1, dtype=np.int64)
+            lookup[ids] = np.arange(n)
+            doc_rows = lookup[np.asarray(doc_ids, dtype=np.int64)]
+            published = doc_rows >= 0
+            doc_rows = doc_rows[published]
+            term_list, term_codes = np.unique(np.asarray(terms, dtype=object)[published], return_inverse=True)
+            df = np.bincount(term_codes, minlength=len(term_list))
+            values = (1 + np.log(np.asarray(weights, dtype=np.float64)[published])) * np.log(n / df[term_codes])
+            norms = np.sqrt(np.bincount(doc_rows, weights=values * values, minlength=n))
+            norms[norms == 0] = 1.0
+
+            # 1記事にしか出現しない語は類似度に寄与しないため行列に含めない（ノルムには含める）
+            shared = np.flatnonzero(df >= 2)
+            shared = shared[np.argsort(df[shared], kind='stable')][:MAX_TEXT_FEATURES]
+            columns = np.full(len(term_list), -1, dtype=np.int64)
+            columns[shared] = np.arange(len(shared))
+            text = np.zeros((n, len(shared)))
+            in_matrix = columns[term_codes] >= 0
+            text[doc_rows[in_matrix], columns[term_codes][in_matrix]] = (values / norms[doc_rows])[in_matrix]
+
+        # カテゴリ（記事×カテゴリの0/1行列）
+        category_pairs = [
+            (index[row.article_id], row.category_id)
+            for row in db.session.execute(select(article_categories.c.article_id, article_categories.c.category_id))
+            if row.article_id in index
+        ]
+        category_columns = {category_id: j for j, category_id in enumerate(sorted({c for _, c in category_pairs}))}
+        categories = np.zeros((n, len(category_columns)), dtype=np.float32)
+        for i, category_id in category_pairs:
+            categories[i, category_columns[category_id]] = 1.0
+
+        return {
+            'ids': ids,
+            'index': index,
+            'text': text,
+            'categories': categories,
+            'challenge': np.array([row.challenge_id or 0 for row in articles], dtype=np.int64),
+            'day': np.array([row.challenge_day if row.challenge_day is not None else np.nan for row in articles],
+                            dtype=np.float64),
+        }
+
+    @staticmethod
+    def _compute_scores(features, rows):
+        """指定した行の記事と全公開記事との関連度行列を計算（自分自身は-inf）"""
+        import numpy as np
+
+        rows = np.asarray(list(rows), dtype=np.int64)
+
+        # コサイン類似度（行は正規化済み）
+        text = features['text'][rows] @ features['text'].T
+
+        # 共通カテゴリのJaccard係数
+        categories = features['categories']
+        shared = categories[rows] @ categories.T
+        counts = categories.sum(axis=1)
+        union = counts[rows][:, None] + counts[None, :] - shared
+        category = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+        # 同じチャレンジ、およびチャレンジ日の近さ
+        challenge = features['challenge']
+        same_challenge = (challenge[rows][:, None] == challenge[None, :]) & (challenge[rows][:, None] > 0)
+        day = features['day']
+        distance = np.abs(day[rows][:, None] - day[None, :])
+        with np.errstate(invalid='ignore'):
+            proximity = np.where(same_challenge & ~np.isnan(distance), 1.0 / (1.0 + distance), 0.0)
+
+        scores = (
+            RELATED_WEIGHTS['text'] * text
+            + RELATED_WEIGHTS['category'] * category
+            + RELATED_WEIGHTS['challenge'] * same_challenge
+            + RELATED_WEIGHTS['day'] * proximity
+        ).round(SCORE_DECIMALS)
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return scores
+
+    @staticmethod
+    def _top_k(scores, k):
+        """関連度の高い順に (行番号, 関連度) を最大k件返す（同点は新しい記事＝行番号の大きい方を優先）"""
+        import numpy as np
+
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return []
+        top = np.lexsort((-np.arange(len(scores)), -scores))[:k]
+        return [(int(j), float(scores[j])) for j in top]
+
+
+class RelatedArticleRebuilder:
+    """関連記事の再計算を1本のバックグラウンドスレッドで実行（実行中に依頼された場合は終了後にもう一度実行）"""
+
+    def __init__(self, delay=REBUILD_DELAY):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._requested = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._app = None
+
+        self.requested_count = 0
+        self.completed_count = 0
+        self.error_count = 0
+
+    def request(self):
+        """再計算を予約（待機中・実行中の予約とまとめる）"""
+        self._app = current_app._get_current_object()
+        self._ensure_started()
+        self.requested_count += 1
+        self._requested.set()
+
+    def get_stats(self):
+        """実行状況の統計を取得"""
+        return {
+            'pending': self._requested.is_set(),
+            'requested': self.requested_count,
+            'completed': self.completed_count,
+            'errors': self.error_count,
+        }
+
+    def _ensure_started(self):
+        """再計算スレッドを起動（fork後の子プロセスでは起動し直す）"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # fork元のスレッドは引き継がれないため状態を作り直す
+                self._requested = threading.Event()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='related-article-rebuilder', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """予約があれば少し待ってから再計算（待機中・実行中に届いた予約は次の1回にまとめる）"""
+        while True:
+            self._requested.wait()
+            time.sleep(self.delay)
+            self._requested.clear()
+            app = self._app
+            with app.app_context():
+                try:
+                    _, error = RelatedArticleService.rebuild()
+                    if error:
+                        self.error_count += 1
+                    else:
+                        self.completed_count += 1
+                except Exception as e:
+                    self.error_count += 1
+                    app.logger.warning(f"関連記事のバックグラウンド再計算エラー: {e}")
+
+
+# プロセス内で共有する再計算スレッド
+related_article_rebuilder = RelatedArticleRebuilder()
@@ -3,11 +3,15 @@ from sqlalchemy import func, or_, and_
 from models import Article, Category, Project, db
 from utils import process_markdown
 from article_service import ArticleService
+from search_index_service import SearchIndexService
 import logging
 
 search_bp = Blueprint('search', __name__)
 logger = logging.getLogger(__name__)
 
+# 全体検索で種別ごとに表示する件数
+ALL_MODE_LIMIT = 5
+
 @search_bp.route('/search')
 def search():
     """サイト内検索ページ"""
@@ -45,59 +49,30 @@ def perform_search(query, search_type='all', page=1, per_page=10):
         'total_count': 0
     }
     
+    # 'all'の場合は各種別の上位のみ、種別指定時はそのページ分だけを読み込む
+    if search_type == 'all':
+        page, per_page = 1, ALL_MODE_LIMIT
+    
     # 記事検索（ArticleServiceを使用）
     if search_type in ['all', 'articles']:
         challenge_id = request.args.get('challenge_id', type=int)
-        search_results = ArticleService.search_articles(query, challenge_id)
-        
-        if search_type == 'all':
-            # 全体検索の場合は5件まで
-            results['articles'] = search_results[:5]
-            results['total_count'] += len(search_results)
-        else:
-            # 記事のみ検索の場合はページング処理
-            total_articles = len(search_results)
-            start = (page - 1) * per_page
-            end = start + per_page
-            results['articles'] = search_results[start:end]
-            
-            # 簡易ページング情報
-            results['article_pagination'] = {
-                'page': page,
-                'per_page': per_page,
-                'total': total_articles,
-                'has_prev': page > 1,
-                'has_next': end < total_articles,
-                'prev_num': page - 1 if page > 1 else None,
-                'next_num': page + 1 if end < total_articles else None,
-                'pages': list(range(1, (total_articles // per_page) + 2))
-            }
-            results['total_count'] += total_articles
+        pagination = ArticleService.search_articles(query, challenge_id, page=page, per_page=per_page)
+        results['articles'] = pagination.items
+        if search_type == 'articles':
+            results['article_pagination'] = pagination
+        results['total_count'] += pagination.total
     
     # プロジェクト検索
     if search_type in ['all', 'projects']:
-        project_query = Project.query.filter(
-            Project.status == 'active',
-            or_(
-                Project.title.contains(query),
-                Project.description.contains(query),
-                Project.long_description.contains(query)
-            )
-        ).order_by(Project.created_at.desc())
-        
-        if search_type == 'all':
-            # 全体検索の場合は5件まで
-            results['projects'] = project_query.limit(5).all()
-        else:
-            # プロジェクトのみ検索の場合はページング
-            pagination = project_query.paginate(
-                page=page,
-                per_page=per_page,
-                error_out=False
-            )
-            results['projects'] = pagination.items
+        pagination = SearchIndexService.paginate(
+            'project', query, Project.query.filter(Project.status == 'active'), Project,
+            fallback_columns=(Project.title, Project.description, Project.long_description),
+            fallback_order=Project.created_at.desc(),
+            page=page, per_page=per_page
+        )
+        results['projects'] = pagination.items
+        if search_type == 'projects':
             results['project_pagination'] = pagination
-        
-        results['total_count'] += project_query.count()
+        results['total_count'] += pagination.total
     
     return results
\ No newline at end of file
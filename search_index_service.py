@@ -0,0 +1,306 @@
+"""
+全文検索インデックスサービス
+記事・プロジェクトの保存時に転置インデックスを更新し、検索は索引から語の重みとIDFで順位付けする
+（日本語は2文字単位のN-gram、英数字は単語単位。SQLite・MySQLの両方で動作する通常のテーブルで実装）
+"""
+import re
+import math
+import threading
+import unicodedata
+from collections import Counter, OrderedDict, defaultdict
+from flask import current_app
+from flask_sqlalchemy.pagination import Pagination
+from sqlalchemy import select, delete, insert, func, or_, case
+from models import db, Article, Project, SearchIndexEntry, CacheVersion
+
+# 記事・プロジェクト・カテゴリの更新を他ワーカーへ通知するためのバージョン名
+CONTENT_VERSION_NAME = 'content'
+
+MAX_TERM_LENGTH = 64
+# 1回の検索で使う語の上限（長文を貼り付けられた場合の負荷対策）
+MAX_QUERY_TERMS = 32
+# 検索結果IDをキャッシュする検索条件の件数
+RESULT_CACHE_SIZE = 256
+
+# フィールドごとの重み（タイトルに含まれる語ほど上位にする）
+ARTICLE_FIELD_WEIGHTS = (('title', 20), ('summary', 5), ('body', 1))
+PROJECT_FIELD_WEIGHTS = (('title', 20), ('description', 5), ('technologies', 5), ('long_description', 1))
+
+# ひらがな・カタカナ（長音符を含む）・漢字の連続
+_CJK_CLASS = '぀-ゟ゠-ヿ㐀-䶿一-鿿豈-﫿'
+_TOKEN_PATTERN = re.compile(f'([{_CJK_CLASS}]+)|([a-z0-9]+)')
+
+
+def normalize_text(text):
+    """全角・半角や大文字・小文字の違いを吸収"""
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def tokenize(text):
+    """インデックス用の語に分割（日本語は2文字単位＋各連続部分の末尾1文字、英数字は単語）"""
+    for cjk, word in _TOKEN_PATTERN.findall(normalize_text(text)):
+        if word:
+            yield word[:MAX_TERM_LENGTH]
+            continue
+        for i in range(len(cjk) - 1):
+            yield cjk[i:i + 2]
+        # 末尾の1文字も登録し、1文字検索を前方一致で拾えるようにする
+        yield cjk[-1]
+
+
+def tokenize_query(query):
+    """検索語を (語, 前方一致か) のリストに分割（すべての語を含む文書が対象）"""
+    terms = []
+    for cjk, word in _TOKEN_PATTERN.findall(normalize_text(query)):
+        if word:
+            terms.append((word[:MAX_TERM_LENGTH], True))
+        elif len(cjk) == 1:
+            terms.append((cjk, True))
+        else:
+            terms.extend((cjk[i:i + 2], False) for i in range(len(cjk) - 1))
+    return list(dict.fromkeys(terms))[:MAX_QUERY_TERMS]
+
+
+def bump_content_version():
+    """記事・プロジェクト・カテゴリの更新を記録（コミットは呼び出し元で行う）"""
+    CacheVersion.bump(CONTENT_VERSION_NAME)
+
+
+class SearchResultCache:
+    """検索結果IDのLRUキャッシュ（コンテンツバージョンが変わったら全件破棄）"""
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(doc_type, query, filter_key=None):
+        """正規化した検索語・種別・絞り込み条件からキーを生成"""
+        return (doc_type, ' '.join(normalize_text(query).split()), filter_key)
+
+    def get(self, key, version):
+        """キャッシュ済みのID列を取得（未登録ならNone）"""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            ids = self._entries.get(key)
+            if ids is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ids
+
+    def set(self, key, version, ids):
+        """ID列を保存（上限を超えたら最も古く使われたものから削除）"""
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[key] = tuple(ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_stats(self):
+        """件数・ヒット数・ミス数を取得"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# プロセス内で共有する検索結果キャッシュ
+search_result_cache = SearchResultCache()
+
+
+class SearchIndexService:
+    """全文検索インデックスサービスクラス"""
+
+    @staticmethod
+    def index_document(doc_type, doc_id, fields):
+        """文書のインデックスを作り直す（fieldsは (テキスト, 重み) のリスト、コミットは呼び出し元で行う）"""
+        weights = Counter()
+        for text, weight in fields:
+            for term in tokenize(text):
+                weights[term] += weight
+
+        SearchIndexService._delete_postings(doc_type, doc_id)
+        if weights:
+            db.session.execute(insert(SearchIndexEntry), [
+                {'doc_type': doc_type, 'doc_id': doc_id, 'term': term, 'weight': weight}
+                for term, weight in weights.items()
+            ])
+        return len(weights)
+
+    @staticmethod
+    def remove_document(doc_type, doc_id):
+        """文書のインデックスとサジェスト候補を削除（コミットは呼び出し元で行う）"""
+        from search_suggest import suggest_index
+        SearchIndexService._delete_postings(doc_type, doc_id)
+        suggest_index.remove(doc_type, doc_id)
+        bump_content_version()
+
+    @staticmethod
+    def _delete_postings(doc_type, doc_id):
+        """文書の索引語を削除"""
+        db.session.execute(
+            delete(SearchIndexEntry).where(SearchIndexEntry.doc_type == doc_type, SearchIndexEntry.doc_id == doc_id)
+        )
+
+    @staticmethod
+    def index_article(article, notify=True):
+        """記事のインデックスを更新（notify=Trueならサジェスト候補も更新し、他ワーカーへ通知）"""
+        fields = [(getattr(article, name), weight) for name, weight in ARTICLE_FIELD_WEIGHTS]
+        count = SearchIndexService.index_document('article', article.id, fields)
+        if notify:
+            from search_suggest import suggest_index
+            suggest_index.put_article(article)
+            bump_content_version()
+        return count
+
+    @staticmethod
+    def index_project(project, notify=True):
+        """プロジェクトのインデックスを更新（notify=Trueならサジェスト候補も更新し、他ワーカーへ通知）"""
+        fields = [(getattr(project, name), weight) for name, weight in PROJECT_FIELD_WEIGHTS]
+        count = SearchIndexService.index_document('project', project.id, fields)
+        if notify:
+            from search_suggest import suggest_index
+            suggest_index.put_project(project)
+            bump_content_version()
+        return count
+
+    @staticmethod
+    def rebuild():
+        """全記事・全プロジェクトのインデックスを作り直す（件数を返す）"""
+        from search_suggest import suggest_index
+        try:
+            db.session.execute(delete(SearchIndexEntry))
+            counts = {'article': 0, 'project': 0}
+            for article in db.session.execute(select(Article)).scalars():
+                SearchIndexService.index_article(article, notify=False)
+                counts['article'] += 1
+            for project in db.session.execute(select(Project)).scalars():
+                SearchIndexService.index_project(project, notify=False)
+                counts['project'] += 1
+            bump_content_version()
+            db.session.commit()
+            suggest_index.rebuild()
+            return counts, None
+
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"検索インデックス再構築エラー: {str(e)}")
+            return None, str(e)
+
+    @staticmethod
+    def search(doc_type, query, model=None, where=None):
+        """検索語をすべて含む文書IDをスコア順に返す（検索語が語に分割できない場合、その種別のインデックスが空の場合はNone）
+        model・whereを指定すると、その条件（公開状態など）を満たす文書に絞り込む"""
+        terms = tokenize_query(query)
+        if not terms:
+            return None
+
+        conditions = [
+            SearchIndexEntry.term.like(f'{term}%') if prefix else SearchIndexEntry.term == term
+            for term, prefix in terms
+        ]
+        statement = (
+            select(SearchIndexEntry.doc_id, SearchIndexEntry.term, SearchIndexEntry.weight)
+            .where(SearchIndexEntry.doc_type == doc_type, or_(*conditions))
+        )
+        if model is not None:
+            statement = statement.join(model, model.id == SearchIndexEntry.doc_id)
+            if where is not None:
+                statement = statement.where(where)
+        rows = db.session.execute(statement).all()
+
+        # 検索語ごとに文書別の重みを集計
+        term_weights = [defaultdict(int) for _ in terms]
+        for doc_id, term, weight in rows:
+            for i, (query_term, prefix) in enumerate(terms):
+                if term.startswith(query_term) if prefix else term == query_term:
+                    term_weights[i][doc_id] += weight
+
+        matched = set(term_weights[0])
+        for weights in term_weights[1:]:
+            matched &= weights.keys()
+        if not matched:
+            # マイグレーション直後などインデックスが未作成の間は、呼び出し元の部分一致検索に任せる
+            if not rows and not SearchIndexService.has_documents(doc_type):
+                current_app.logger.warning(
+                    f"検索インデックスが空のため部分一致で検索します（flask rebuild-search-index で作成）: {doc_type}"
+                )
+                return None
+            return []
+
+        total_docs = db.session.execute(
+            select(func.count(func.distinct(SearchIndexEntry.doc_id))).where(SearchIndexEntry.doc_type == doc_type)
+        ).scalar() or 1
+
+        # TF-IDF（出現回数は対数で抑える）
+        scores = {}
+        for doc_id in matched:
+            scores[doc_id] = sum(
+                (1 + math.log(weights[doc_id])) * math.log(1 + total_docs / len(weights))
+                for weights in term_weights
+            )
+        return sorted(matched, key=lambda doc_id: (-scores[doc_id], -doc_id))
+
+    @staticmethod
+    def has_documents(doc_type):
+        """指定した種別の文書が1件でもインデックスされているか"""
+        return db.session.execute(
+            select(SearchIndexEntry.doc_id).where(SearchIndexEntry.doc_type == doc_type).limit(1)
+        ).first() is not None
+
+    @staticmethod
+    def order_by_rank(column, ranked_ids):
+        """検索結果の順位で並べるためのORDER BY式を生成"""
+        if not ranked_ids:
+            return column
+        return case({doc_id: rank for rank, doc_id in enumerate(ranked_ids)}, value=column, else_=len(ranked_ids))
+
+    @staticmethod
+    def paginate(doc_type, query_string, base_query, model, fallback_columns, fallback_order,
+                 page=1, per_page=10, filter_key=None):
+        """
+        検索結果を1ページ分だけ読み込む
+        結果のID列は検索条件ごとにキャッシュし、ページ送りではキャッシュしたID列を切り出す
+        :param filter_key: base_queryの絞り込み条件（チャレンジIDなど）を表すキャッシュキーの一部
+        """
+        key = SearchResultCache.make_key(doc_type, query_string, filter_key)
+        version = CacheVersion.get_version(CONTENT_VERSION_NAME)
+        ranked_ids = search_result_cache.get(key, version)
+        if ranked_ids is None:
+            ranked_ids = SearchIndexService.search(doc_type, query_string, model, base_query.whereclause)
+            if ranked_ids is None:
+                # 語に分割できない検索語（記号のみ等）やインデックス未作成の間は部分一致で検索
+                pattern = f'%{query_string}%'
+                rows = base_query.filter(or_(*(column.like(pattern) for column in fallback_columns))).order_by(
+                    fallback_order
+                ).with_entities(model.id)
+                ranked_ids = [row.id for row in rows]
+            search_result_cache.set(key, version, ranked_ids)
+
+        return RankedPagination(page=page, per_page=per_page, error_out=False,
+                                ranked_ids=ranked_ids, query=base_query, model=model)
+
+
+class RankedPagination(Pagination):
+    """検索インデックスの順位リストをページングし、表示するページの行だけを読み込む"""
+
+    def _query_items(self):
+        ranked_ids = self._query_args['ranked_ids']
+        page_ids = ranked_ids[self._query_offset:self._query_offset + self.per_page]
+        if not page_ids:
+            return []
+        model = self._query_args['model']
+        rank = {doc_id: i for i, doc_id in enumerate(page_ids)}
+        items = self._query_args['query'].filter(model.id.in_(page_ids)).all()
+        return sorted(items, key=lambda item: rank[item.id])
+
+    def _query_count(self):
+        return len(self._query_args['ranked_ids'])
@@ -0,0 +1,172 @@
+"""
+検索サジェストモジュール
+公開記事・カテゴリ・公開プロジェクトの名前をプロセス内のソート済み配列に保持し、二分探索で前方一致候補を返す
+（データベースは参照しない。他ワーカーでの更新はコンテンツバージョンで検知して作り直す）
+"""
+import re
+import time
+import bisect
+import threading
+from flask import current_app
+from sqlalchemy import select
+from models import db, Article, Category, Project, CacheVersion
+from search_index_service import normalize_text, CONTENT_VERSION_NAME
+
+# コンテンツバージョンを確認する間隔（秒、入力中の連続リクエストでDBを参照しないため）
+VERSION_CHECK_INTERVAL = 5
+SUGGEST_LIMIT = 8
+# 1回の検索で調べる候補数の上限
+MAX_CANDIDATES = 200
+
+# 語の区切り（この直後からも前方一致させる）
+_WORD_BOUNDARY = re.compile(r'[\s\-_/・:：、。,.!?！？()（）「」『』【】\[\]]+')
+
+SUGGEST_ENDPOINTS = {
+    'article': 'articles.article_detail',
+    'category': 'categories.category_page',
+    'project': 'projects.project_detail',
+}
+
+
+def make_keys(text):
+    """前方一致用のキー（名前全体と、区切り文字の後ろから始まる部分）を生成"""
+    normalized = normalize_text(text).strip()
+    if not normalized:
+        return []
+    keys = [normalized]
+    for match in _WORD_BOUNDARY.finditer(normalized):
+        rest = normalized[match.end():]
+        if rest:
+            keys.append(rest)
+    return list(dict.fromkeys(keys))
+
+
+class SuggestIndex:
+    """前方一致サジェスト用のソート済み配列"""
+
+    def __init__(self, version_check_interval=VERSION_CHECK_INTERVAL):
+        self.version_check_interval = version_check_interval
+        self._lock = threading.Lock()
+        self._keys = []  # (キー, 種別, ID) のソート済みリスト
+        self._items = {}  # (種別, ID) -> {'type', 'id', 'title', 'slug'}
+        self._item_keys = {}  # (種別, ID) -> キーのリスト
+        self._version = None
+        self._checked_at = 0.0
+        self.rebuild_count = 0
+
+    def suggest(self, query, limit=SUGGEST_LIMIT):
+        """前方一致する候補を返す（名前全体の先頭に一致するもの、短いものを優先）"""
+        prefix = normalize_text(query).strip()
+        if not prefix:
+            return []
+        self._ensure_fresh()
+
+        with self._lock:
+            start = bisect.bisect_left(self._keys, (prefix,))
+            candidates = {}
+            for key, doc_type, doc_id in self._keys[start:start + MAX_CANDIDATES]:
+                if not key.startswith(prefix):
+                    break
+                item = self._items[(doc_type, doc_id)]
+                is_head = key == self._item_keys[(doc_type, doc_id)][0]
+                rank = candidates.get((doc_type, doc_id))
+                if rank is None or is_head:
+                    candidates[(doc_type, doc_id)] = (not is_head, len(item['title']), item['title'])
+            ordered = sorted(candidates, key=candidates.get)[:limit]
+            return [dict(self._items[doc_key]) for doc_key in ordered]
+
+    def put(self, doc_type, doc_id, title, slug):
+        """候補を追加・更新"""
+        doc_key = (doc_type, doc_id)
+        with self._lock:
+            self._remove_locked(doc_key)
+            keys = make_keys(title)
+            if not keys or not slug:
+                return
+            self._items[doc_key] = {'type': doc_type, 'id': doc_id, 'title': title, 'slug': slug}
+            self._item_keys[doc_key] = keys
+            for key in keys:
+                bisect.insort(self._keys, (key, doc_type, doc_id))
+
+    def remove(self, doc_type, doc_id):
+        """候補を削除"""
+        with self._lock:
+            self._remove_locked((doc_type, doc_id))
+
+    def put_article(self, article):
+        """記事を登録（非公開なら削除）"""
+        if article.is_published:
+            self.put('article', article.id, article.title, article.slug)
+        else:
+            self.remove('article', article.id)
+
+    def put_project(self, project):
+        """プロジェクトを登録（公開中以外なら削除）"""
+        if project.status == 'active':
+            self.put('project', project.id, project.title, project.slug)
+        else:
+            self.remove('project', project.id)
+
+    def rebuild(self):
+        """データベースから全件を読み込んで作り直す"""
+        version = CacheVersion.get_version(CONTENT_VERSION_NAME)
+        rows = []
+        rows += [('article',) + tuple(row) for row in db.session.execute(
+            select(Article.id, Article.title, Article.slug).where(Article.is_published == True)
+        )]
+        rows += [('category',) + tuple(row) for row in db.session.execute(
+            select(Category.id, Category.name, Category.slug)
+        )]
+        rows += [('project',) + tuple(row) for row in db.session.execute(
+            select(Project.id, Project.title, Project.slug).where(Project.status == 'active')
+        )]
+
+        keys, items, item_keys = [], {}, {}
+        for doc_type, doc_id, title, slug in rows:
+            doc_keys = make_keys(title)
+            if not doc_keys or not slug:
+                continue
+            items[(doc_type, doc_id)] = {'type': doc_type, 'id': doc_id, 'title': title, 'slug': slug}
+            item_keys[(doc_type, doc_id)] = doc_keys
+            keys.extend((key, doc_type, doc_id) for key in doc_keys)
+        keys.sort()
+
+        with self._lock:
+            self._keys, self._items, self._item_keys = keys, items, item_keys
+            self._version = version
+            self._checked_at = time.monotonic()
+            self.rebuild_count += 1
+        return len(items)
+
+    def get_stats(self):
+        """登録件数・キー数・再構築回数を取得"""
+        with self._lock:
+            return {'items': len(self._items), 'keys': len(self._keys), 'version': self._version,
+                    'rebuilds': self.rebuild_count}
+
+    def _ensure_fresh(self):
+        """未構築、または一定間隔ごとの確認でコンテンツバージョンが変わっていれば作り直す"""
+        if self._version is not None and time.monotonic() - self._checked_at < self.version_check_interval:
+            return
+        try:
+            version = CacheVersion.get_version(CONTENT_VERSION_NAME)
+            if version != self._version:
+                self.rebuild()
+            else:
+                self._checked_at = time.monotonic()
+        except Exception as e:
+            # 構築済みなら古いデータのまま応答を続ける
+            current_app.logger.warning(f"検索サジェスト索引の更新エラー: {e}")
+
+    def _remove_locked(self, doc_key):
+        """候補を削除（ロック取得済みで呼ぶ）"""
+        doc_type, doc_id = doc_key
+        for key in self._item_keys.pop(doc_key, []):
+            index = bisect.bisect_left(self._keys, (key, doc_type, doc_id))
+            if index < len(self._keys) and self._keys[index] == (key, doc_type, doc_id):
+                del self._keys[index]
+        self._items.pop(doc_key, None)
+
+
+# プロセス内で共有するサジェスト索引
+suggest_index = SuggestIndex()
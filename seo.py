@@ -3,17 +3,25 @@ SEO/OGP Functions - SEO最適化とOpen Graph Protocol関連機能
 """
 import re
 import time
-import hashlib
 import json
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 from urllib.parse import urlparse, parse_qs
 from bs4 import BeautifulSoup
 from flask import current_app, url_for
+from ogp_cache import OGPCache, MemoryCacheTier, DatabaseCacheTier, OGP_CACHE_DURATION, OGP_FAILURE_CACHE_DURATION, OGP_CACHE_VERSION_NAME
+from link_preview_worker import LinkPreviewWorker
+from http_client import http_client, HTTPClient
+from browser_worker import BrowserWorker
+from ogp_parser import parse_ogp_stream
 
-# OGPデータキャッシュ（メモリ）
-ogp_cache = {}
-OGP_CACHE_DURATION = 3600  # 1時間
+# OGPデータキャッシュ（メモリLRU → データベースの2層）
+ogp_cache = OGPCache([MemoryCacheTier(version_name=OGP_CACHE_VERSION_NAME), DatabaseCacheTier()],
+                     ttl=OGP_CACHE_DURATION, failure_ttl=OGP_FAILURE_CACHE_DURATION)
+# 外部サイトへの取得はページ表示から切り離してバックグラウンドで行う
+link_preview_worker = LinkPreviewWorker()
+# JavaScript描画が必要なページ（Threads）用の常駐ヘッドレスブラウザ
+browser_worker = BrowserWorker()
 
 def process_sns_auto_embed(text):
     """テキスト中のSNS URLを自動的に埋込HTMLに変換"""
@@ -172,14 +180,10 @@ def generate_threads_embed(url):
 
 def fetch_ogp_data(url, force_refresh=False):
     """URLからOGP（Open Graph Protocol）データを取得（キャッシュ対応、Selenium対応）"""
-    # キャッシュチェック
-    cache_key = hashlib.md5(url.encode()).hexdigest()
-    current_time = datetime.now()
-    
     # force_refreshがTrueの場合はキャッシュをスキップ
-    if not force_refresh and cache_key in ogp_cache:
-        cached_data, cached_time = ogp_cache[cache_key]
-        if current_time - cached_time < timedelta(seconds=OGP_CACHE_DURATION):
+    if not force_refresh:
+        cached_data = ogp_cache.get(url)
+        if cached_data is not None:
             current_app.logger.debug(f"OGP cache hit for: {url[:50]}...")
             return cached_data
     
@@ -191,11 +195,11 @@ def fetch_ogp_data(url, force_refresh=False):
             # ThreadsにはSeleniumを使用
             ogp_data = _fetch_threads_ogp_with_selenium(url)
         else:
-            # 通常のURLには従来の方法を使用
-            ogp_data = _fetch_ogp_with_requests(url)
+            # 通常のURLには従来の方法を使用（期限切れのキャッシュがあれば条件付きリクエストで再検証）
+            ogp_data = _fetch_ogp_with_requests(url, previous_data=ogp_cache.get(url, allow_expired=True))
         
-        # キャッシュに保存
-        ogp_cache[cache_key] = (ogp_data, current_time)
+        # キャッシュに保存（空のデータは取得失敗として短時間のみ）
+        ogp_cache.set(url, ogp_data)
         current_app.logger.debug(f"OGP data cached for: {url[:50]}...")
         
         return ogp_data
@@ -204,80 +208,41 @@ def fetch_ogp_data(url, force_refresh=False):
         current_app.logger.error(f"OGP fetch error: {e}")
         # エラー時も空のデータをキャッシュ（短時間）
         empty_data = {}
-        ogp_cache[cache_key] = (empty_data, current_time)
+        ogp_cache.set(url, empty_data)
         return empty_data
 
-def _fetch_ogp_with_requests(url):
-    """通常のHTTPリクエストでOGPデータを取得（高速化版）"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate'
-    }
+def get_ogp_data_nowait(url):
+    """キャッシュ済みのOGPデータを返す（未取得ならバックグラウンド取得を登録してNoneを返す）"""
+    cached_data = ogp_cache.get(url)
+    if cached_data is None:
+        link_preview_worker.submit(('ogp', url), fetch_ogp_data, url)
+    return cached_data
+
+def _fetch_ogp_with_requests(url, previous_data=None):
+    """通常のHTTPリクエストでOGPデータを取得（高速化版、共有セッションで接続を再利用）"""
+    validators = (previous_data or {}).get('_validators', {})
     
     try:
         current_app.logger.debug(f"🌐 Fetching OGP for: {url[:50]}...")
         start_time = time.time()
         
-        response = requests.get(url, headers=headers, timeout=8, stream=True)
-        response.raise_for_status()
-        
-        # 最初の64KBのみを読み取る（OGPはHTMLヘッダにあるため）
-        content_size_limit = 65536  # 64KB
-        content = b''
-        for chunk in response.iter_content(chunk_size=8192):
-            content += chunk
-            if len(content) >= content_size_limit:
-                break
-        response.close()
-        
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        ogp_data = {}
-        
-        # より効率的なOGPメタタグ検索
-        ogp_tags = soup.find_all('meta', attrs={'property': lambda x: x and x.startswith('og:')})
-        twitter_tags = soup.find_all('meta', attrs={'name': lambda x: x and x.startswith('twitter:')})
-        
-        # OGPタグの処理
-        for tag in ogp_tags:
-            prop = tag.get('property', '').lower()
-            content = tag.get('content', '').strip()
-            if content:
-                if prop == 'og:title':
-                    ogp_data['title'] = content
-                elif prop == 'og:description':
-                    ogp_data['description'] = content
-                elif prop == 'og:image':
-                    ogp_data['image'] = content
-                elif prop == 'og:site_name':
-                    ogp_data['site_name'] = content
-                elif prop == 'og:url':
-                    ogp_data['url'] = content
-        
-        # Twitterカードタグをフォールバックとして使用
-        for tag in twitter_tags:
-            name = tag.get('name', '').lower()
-            content = tag.get('content', '').strip()
-            if content:
-                if name == 'twitter:title' and not ogp_data.get('title'):
-                    ogp_data['title'] = content
-                elif name == 'twitter:description' and not ogp_data.get('description'):
-                    ogp_data['description'] = content
-                elif name == 'twitter:image' and not ogp_data.get('image'):
-                    ogp_data['image'] = content
-        
-        # フォールバック: 通常のmetaタグからも取得
-        if not ogp_data.get('title'):
-            title_tag = soup.find('title')
-            if title_tag:
-                ogp_data['title'] = title_tag.get_text().strip()
-        
-        if not ogp_data.get('description'):
-            desc_tag = soup.find('meta', attrs={'name': 'description'})
-            if desc_tag and desc_tag.get('content'):
-                ogp_data['description'] = desc_tag.get('content', '').strip()
+        response = http_client.get(url, etag=validators.get('etag'),
+                                   last_modified=validators.get('last_modified'), stream=True)
+        # 本文を読み切らずに閉じるまでホストの同時リクエスト枠を使うため、どの経路でも必ず閉じる
+        try:
+            if response.status_code == 304:
+                # 未変更の場合は前回のデータをそのまま使う
+                current_app.logger.debug(f"✅ OGP not modified for: {url[:50]}...")
+                return previous_data
+            response.raise_for_status()
+            
+            # <head>部分だけを逐次解析し、</head>に達するか主要項目が揃った時点で読み込みを打ち切る
+            content_type = response.headers.get('Content-Type', '').lower()
+            declared_encoding = response.encoding if 'charset=' in content_type else None
+            ogp_data, read_bytes = parse_ogp_stream(response.iter_content(chunk_size=8192), declared_encoding)
+        finally:
+            response.close()
+        response_validators = HTTPClient.get_validators(response)
         
         # サイト名がない場合はドメインから推測
         if not ogp_data.get('site_name'):
@@ -285,8 +250,12 @@ def _fetch_ogp_with_requests(url):
             domain = parsed_url.netloc.replace('www.', '')
             ogp_data['site_name'] = domain
         
+        # 次回更新時の条件付きリクエスト用
+        if response_validators:
+            ogp_data['_validators'] = response_validators
+        
         fetch_time = time.time() - start_time
-        current_app.logger.debug(f"✅ OGP fetched in {fetch_time:.2f}s for: {url[:50]}...")
+        current_app.logger.debug(f"✅ OGP fetched in {fetch_time:.2f}s ({read_bytes} bytes) for: {url[:50]}...")
         
         return ogp_data
         
@@ -301,89 +270,11 @@ def _fetch_ogp_with_requests(url):
         return {}
 
 def _fetch_threads_ogp_with_selenium(url):
-    """SeleniumでThreadsのOGPデータを取得"""
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
-    from webdriver_manager.chrome import ChromeDriverManager
-    import time
-    
-    chrome_options = Options()
-    chrome_options.add_argument('--headless')  # ヘッドレスモード
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--window-size=1920,1080')
-    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    
-    driver = None
+    """SeleniumでThreadsのOGPデータを取得（常駐ブラウザワーカーに依頼し、期限付きで待つ）"""
     try:
-        current_app.logger.debug("🌐 Starting Selenium for Threads URL...")
-        
-        # webdriver-managerでChromeDriverをインストール
-        import os
-        import stat
-        
-        # ChromeDriverManagerの代わりに直接パスを指定
-        base_wdm_path = os.path.expanduser("~/.wdm/drivers/chromedriver")
-        
-        # webdriver-managerを使用してパスを取得
-        try:
-            driver_path = ChromeDriverManager().install()
-            current_app.logger.debug(f"ChromeDriver manager path: {driver_path}")
-            
-            # webdriver-managerが間違ったファイルを返している場合の修正
-            driver_dir = os.path.dirname(driver_path)
-            chromedriver_path = os.path.join(driver_dir, "chromedriver")
-            
-            # 正しいchromedriver実行ファイルを見つける
-            if os.path.exists(chromedriver_path) and os.path.isfile(chromedriver_path):
-                actual_driver_path = chromedriver_path
-            else:
-                # 再帰的にchromedriver実行ファイルを探す
-                import glob
-                pattern = os.path.join(base_wdm_path, "**/chromedriver")
-                found_drivers = glob.glob(pattern, recursive=True)
-                for found_driver in found_drivers:
-                    if os.path.isfile(found_driver):
-                        actual_driver_path = found_driver
-                        break
-            
-            if not actual_driver_path:
-                raise Exception("Could not find valid ChromeDriver executable")
-                
-        except Exception as e:
-            current_app.logger.error(f"ChromeDriverManager failed: {e}")
-            raise Exception("Could not find valid ChromeDriver executable")
-        
-        current_app.logger.debug(f"Actual ChromeDriver path: {actual_driver_path}")
-        
-        # 実行権限を確認・設定
-        if not os.access(actual_driver_path, os.X_OK):
-            os.chmod(actual_driver_path, stat.S_IRUSR | stat.S_IWUSR | stat.S_IXUSR | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
-            current_app.logger.debug("Set executable permission for ChromeDriver")
+        current_app.logger.debug("🌐 Requesting Threads page from browser worker...")
         
-        service = Service(actual_driver_path)
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.get(url)
-        
-        # ページの読み込み完了を待機
-        current_app.logger.debug("⏳ Waiting for page load...")
-        time.sleep(5)
-        
-        # OGPメタタグが読み込まれるまで待機
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, "//meta[contains(@property, 'og:') or contains(@name, 'twitter:')]"))
-            )
-            current_app.logger.debug("✅ OGP meta tags detected")
-        except:
-            current_app.logger.debug("⚠️ OGP meta tags not found, continuing anyway")
-        
-        html = driver.page_source
+        html = browser_worker.fetch(url)
         soup = BeautifulSoup(html, 'html.parser')
         
         ogp_data = {}
@@ -454,17 +345,14 @@ def _fetch_threads_ogp_with_selenium(url):
                 'site_name': 'Threads'
             }
         return {}
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
 
 def generate_ogp_card(url):
-    """URLのOGPカードHTMLを生成"""
+    """URLのOGPカードHTMLを生成（未取得の場合は仮カードを表示し、取得はバックグラウンドで行う）"""
     try:
-        ogp_data = fetch_ogp_data(url)
+        ogp_data = get_ogp_data_nowait(url)
+        
+        if ogp_data is None:
+            return generate_pending_ogp_card(url)
         
         if not ogp_data:
             # OGPデータが取得できない場合はシンプルなリンクを返す
@@ -513,6 +401,18 @@ def generate_ogp_card(url):
         current_app.logger.error(f"Error generating OGP card: {e}")
         return f'<a href="{url}" target="_blank" class="simple-link">{url}</a>'
 
+def generate_pending_ogp_card(url):
+    """OGPデータ取得前に表示する軽量な仮カードHTMLを生成"""
+    host = urlparse(url).netloc or url
+    return f'''<div class="ogp-card ogp-card-pending" style="border: 1px solid #e1e8ed; border-radius: 12px; overflow: hidden; margin: 16px 0; max-width: 500px;">
+    <a href="{url}" target="_blank" style="text-decoration: none; color: inherit; display: block;">
+        <div class="ogp-content" style="padding: 16px;">
+            <div class="ogp-title" style="font-weight: bold; font-size: 16px; line-height: 1.3; margin-bottom: 8px; color: #14171a; word-break: break-all;">{url}</div>
+            <div class="ogp-site" style="font-size: 12px; color: #657786; text-transform: uppercase;">{host}</div>
+        </div>
+    </a>
+</div>'''
+
 def generate_article_structured_data(article):
     """記事用のJSON-LD構造化データを生成"""
     try:
@@ -0,0 +1,44 @@
+"""
+テスト共通設定
+アプリ読み込み前に一時ファイルのSQLiteデータベースを指定し、テーブルを作成する
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix='portfolio-test-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ['ACCESS_LOG_PATH'] = os.path.join(_db_dir, 'access.log')
+os.environ.pop('ACCESS_LOG_JSON_PATH', None)
+os.environ.setdefault('WTF_CSRF_ENABLED', 'false')
+os.environ.setdefault('FLASK_DEBUG', 'false')
+
+from app import app as flask_app  # noqa: E402
+from models import db  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    flask_app.config.update(TESTING=True)
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+
+
+@pytest.fixture
+def app_context(app):
+    """テストごとにテーブルを作り直したアプリケーションコンテキスト"""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app_context):
+    return app_context.test_client()
@@ -0,0 +1,50 @@
+"""AccessLogService のテスト（チェックポイントの初期位置と二重集計の防止）"""
+from sqlalchemy import update
+
+from models import db, AccessLogCheckpoint
+from access_log_service import AccessLogService
+
+LINE = '127.0.0.1 - - [17/Oct/2026:10:00:00 +0000] "GET /blog HTTP/1.1" 200 512 "-" "Mozilla/5.0"\n'
+
+
+def write_lines(path, count):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(LINE * count)
+
+
+def test_first_update_starts_at_end_of_file(app_context, tmp_path):
+    log_file = tmp_path / 'access.log'
+    write_lines(log_file, 3)
+    assert AccessLogService.update_rollups(str(log_file)) == 0
+
+    write_lines(log_file, 2)
+    assert AccessLogService.update_rollups(str(log_file)) == 2
+    assert AccessLogService.update_rollups(str(log_file)) == 0
+
+
+def test_rebuild_reads_from_start(app_context, tmp_path):
+    log_file = tmp_path / 'access.log'
+    write_lines(log_file, 3)
+    AccessLogService.update_rollups(str(log_file))
+    assert AccessLogService.rebuild_rollups(str(log_file)) == 3
+
+    report = AccessLogService.get_report(str(log_file), days=3650)
+    assert report['summary']['total_requests'] == 3
+
+
+def test_update_is_discarded_when_checkpoint_moved(app_context, tmp_path, monkeypatch):
+    log_file = tmp_path / 'access.log'
+    write_lines(log_file, 1)
+    AccessLogService.update_rollups(str(log_file))
+    write_lines(log_file, 2)
+
+    # 読み込み中に別のワーカーが同じ範囲を集計して位置を進めた状況を再現
+    read_new_lines = AccessLogService._read_new_lines
+
+    def concurrent_read(*args):
+        result = read_new_lines(*args)
+        db.session.execute(update(AccessLogCheckpoint).values(offset=result[1]))
+        return result
+
+    monkeypatch.setattr(AccessLogService, '_read_new_lines', staticmethod(concurrent_read))
+    assert AccessLogService.update_rollups(str(log_file)) == 0
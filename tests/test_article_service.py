@@ -0,0 +1,42 @@
+"""ArticleService.get_rendered_body のテスト（キャッシュの遅延バックフィル）"""
+from datetime import datetime
+
+import pytest
+
+from models import db, User, Article, ArticleRenderCache
+from article_service import ArticleService
+
+
+@pytest.fixture
+def article(app_context):
+    user = User(email='author@example.com', name='author', password_hash='x', role='admin')
+    db.session.add(user)
+    db.session.flush()
+    article = Article(title='Cached', slug='cached', body='# Title\n\nBody text', author_id=user.id,
+                      is_published=True, published_at=datetime(2025, 1, 1))
+    db.session.add(article)
+    db.session.commit()
+    return article
+
+
+def test_miss_is_saved_and_next_call_hits(article):
+    rendered = ArticleService.get_rendered_body(article)
+    assert rendered['cache_hit'] is False
+    assert rendered['excerpt'] == 'Title Body text'
+    assert db.session.get(ArticleRenderCache, article.id) is not None
+
+    db.session.expire_all()
+    assert ArticleService.get_rendered_body(article)['cache_hit'] is True
+
+
+def test_save_failure_keeps_rendering_and_session(article, monkeypatch):
+    def fail():
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(db.engine, 'begin', fail)
+    rendered = ArticleService.get_rendered_body(article)
+    assert rendered['cache_hit'] is False
+    assert 'Body text' in rendered['html']
+    # 呼び出し元のセッションはロールバックされず、そのまま使い続けられる
+    assert article in db.session
+    assert article.title == 'Cached'
@@ -0,0 +1,71 @@
+"""HTTPClient のテスト（ストリーミング応答は読み切るか閉じるまでホストの同時リクエスト枠を保持すること）"""
+import gc
+import io
+
+import pytest
+from requests import Response
+from requests.adapters import BaseAdapter
+from urllib3 import HTTPResponse
+
+from http_client import HTTPClient
+
+
+class StaticAdapter(BaseAdapter):
+    """ネットワークに接続せず固定の本文を返すアダプター"""
+
+    def send(self, request, stream=False, **kwargs):
+        response = Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response.raw = HTTPResponse(body=io.BytesIO(b'x' * 20000), status=200, preload_content=False)
+        if not stream:
+            response.content
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client():
+    client = HTTPClient(per_host_limit=1)
+    client.session.mount('http://', StaticAdapter())
+    return client
+
+
+def slot_is_free(client, host='example.com'):
+    semaphore = client._get_host_semaphore(host)
+    if not semaphore.acquire(blocking=False):
+        return False
+    semaphore.release()
+    return True
+
+
+def test_non_streaming_request_releases_slot(client):
+    client.get('http://example.com/')
+    assert slot_is_free(client)
+
+
+def test_streaming_request_holds_slot_until_closed(client):
+    response = client.get('http://example.com/', stream=True)
+    next(response.iter_content(chunk_size=8192))
+    assert not slot_is_free(client)
+    response.close()
+    assert slot_is_free(client)
+    response.close()  # 2回目の解放でセマフォの上限を超えないこと
+    assert slot_is_free(client)
+
+
+def test_streaming_request_releases_slot_when_consumed(client):
+    response = client.get('http://example.com/', stream=True)
+    assert len(response.content) == 20000
+    assert slot_is_free(client)
+
+
+def test_unclosed_streaming_response_releases_slot_when_discarded(client):
+    response = client.get('http://example.com/', stream=True)
+    assert not slot_is_free(client)
+    del response
+    gc.collect()
+    assert slot_is_free(client)
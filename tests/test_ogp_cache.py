@@ -0,0 +1,27 @@
+"""OGPCache のテスト（clear()が他ワーカーのプロセス内キャッシュも無効化すること）"""
+from ogp_cache import OGPCache, MemoryCacheTier, DatabaseCacheTier, OGP_CACHE_VERSION_NAME
+
+
+def make_cache():
+    return OGPCache([MemoryCacheTier(version_name=OGP_CACHE_VERSION_NAME, version_check_interval=0),
+                     DatabaseCacheTier()])
+
+
+def test_clear_invalidates_other_workers_memory_tier(app_context):
+    worker_a, worker_b = make_cache(), make_cache()
+    url = 'https://example.com/'
+    worker_a.set(url, {'title': 'Example'})
+    assert worker_b.get(url) == {'title': 'Example'}
+    assert worker_b.get_stats()['hits']['MemoryCacheTier'] == 0
+
+    worker_a.clear()
+    assert worker_b.get(url) is None
+    assert worker_a.get(url) is None
+
+
+def test_memory_tier_is_kept_without_clear(app_context):
+    cache = make_cache()
+    cache.set('https://example.com/', {'title': 'Example'})
+    assert cache.get('https://example.com/') == {'title': 'Example'}
+    assert cache.get('https://example.com/') == {'title': 'Example'}
+    assert cache.get_stats()['hits']['MemoryCacheTier'] == 2
@@ -0,0 +1,14 @@
+"""ogp_parser.parse_ogp_stream のテスト（変更前のBeautifulSoup方式との抽出結果の一致）"""
+import pytest
+
+from ogp_parser import parse_ogp_stream
+from benchmarks.ogp_stream import make_pages, iter_chunks, parse_ogp_legacy, CHUNK_SIZE
+
+
+@pytest.mark.parametrize('name, html', make_pages(), ids=[name for name, _ in make_pages()])
+@pytest.mark.parametrize('chunk_size', [CHUNK_SIZE, 7])
+def test_matches_legacy_beautifulsoup_extraction(name, html, chunk_size):
+    data, read_bytes = parse_ogp_stream(iter_chunks(html, chunk_size))
+    assert data == parse_ogp_legacy(iter_chunks(html))
+    assert data.get('title')
+    assert read_bytes < len(html)
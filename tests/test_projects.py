@@ -0,0 +1,26 @@
+"""ProjectService のテスト（アーカイブ・復元で検索キャッシュとサジェストが更新されること）"""
+from models import db, CacheVersion, Project
+from projects import ProjectService
+from search_index_service import CONTENT_VERSION_NAME
+from search_suggest import suggest_index
+
+
+def suggested_ids(query):
+    return [item['id'] for item in suggest_index.suggest(query) if item['type'] == 'project']
+
+
+def test_archive_and_restore_update_search_state(app_context):
+    project = Project(title='Kanban Board', slug='kanban-board', description='Flask app', status='active')
+    db.session.add(project)
+    db.session.commit()
+    suggest_index.rebuild()
+    assert project.id in suggested_ids('kanban')
+
+    version = CacheVersion.get_version(CONTENT_VERSION_NAME)
+    ProjectService.archive_project(project.id)
+    assert CacheVersion.get_version(CONTENT_VERSION_NAME) == version + 1
+    assert project.id not in suggested_ids('kanban')
+
+    ProjectService.restore_project(project.id)
+    assert CacheVersion.get_version(CONTENT_VERSION_NAME) == version + 2
+    assert project.id in suggested_ids('kanban')
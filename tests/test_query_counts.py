@@ -0,0 +1,119 @@
+"""
+公開ページのSQL発行数の回帰テスト（記事数・コメント数に比例してクエリが増えないこと）
+/project/<slug>/ はテンプレート（project_detail.html）が未作成で表示できないため対象外
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta, date
+
+import pytest
+from sqlalchemy import event
+
+from models import db, User, Article, Category, Challenge, Comment, Project
+from search_index_service import SearchIndexService
+
+# ページごとのSQL発行数の上限（2回目以降の表示、リクエストごとに新しいセッション）
+MAX_QUERIES = {
+    '/': 5,
+    '/blog': 8,
+    '/blog/challenge/1': 9,
+    '/article/featured/': 10,
+    '/category/python/': 8,
+    '/search?q=article': 6,
+    '/search?q=article&type=articles': 5,
+    '/projects': 8,
+    '/projects/challenge/1': 9,
+    '/portfolio': 10,
+    '/about/': 6,
+    '/services': 3,
+    '/story': 4,
+}
+
+
+@contextmanager
+def count_queries(app):
+    """ブロック内で実行されたSQL文の数を数える"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def add_articles(app, site, start, count):
+    """記事（検索インデックス込み）と、詳細ページで表示する記事への承認済みコメントを追加"""
+    with app.app_context():
+        categories = [db.session.get(Category, category_id) for category_id in site['category_ids']]
+        project = db.session.get(Project, site['project_id'])
+        for i in range(start, start + count):
+            article = Article(
+                title=f'Article {i}', slug=f'article-{i}', summary='summary', body=f'# Heading\n\nBody {i}',
+                author_id=site['author_id'], is_published=True,
+                published_at=datetime(2025, 1, 1) + timedelta(days=i),
+                challenge_id=site['challenge_id'], challenge_day=i + 1,
+            )
+            article.categories.extend(categories)
+            article.linked_projects.append(project)
+            db.session.add(article)
+            db.session.flush()
+            SearchIndexService.index_article(article)
+            db.session.add(Comment(article_id=site['featured_id'], author_name=f'reader {i}',
+                                   author_email='reader@example.com', content=f'comment {i}', is_approved=True))
+        db.session.commit()
+
+
+@pytest.fixture
+def site(app):
+    """公開ページ用のデータ（リクエストごとに新しいアプリケーションコンテキスト・セッションで処理させるためIDを返す）"""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        author = User(email='admin@example.com', name='admin', password_hash='x', role='admin')
+        challenge = Challenge(name='100 days', slug='100-days', start_date=date(2025, 1, 1), is_active=True)
+        categories = [Category(name='Python', slug='python'), Category(name='Flask', slug='flask')]
+        db.session.add_all([author, challenge, *categories])
+        db.session.flush()
+        project = Project(title='Portfolio', slug='portfolio', description='Flask article app', status='active',
+                          is_featured=True, challenge_id=challenge.id)
+        featured = Article(title='Featured article', slug='featured', summary='summary', body='# Heading\n\nBody',
+                           author_id=author.id, is_published=True, published_at=datetime(2024, 12, 31),
+                           challenge_id=challenge.id, challenge_day=1)
+        featured.categories.extend(categories)
+        featured.linked_projects.append(project)
+        db.session.add_all([project, featured])
+        db.session.flush()
+        SearchIndexService.index_article(featured)
+        db.session.commit()
+        assert challenge.id == 1
+        site = {
+            'author_id': author.id,
+            'challenge_id': challenge.id,
+            'category_ids': [category.id for category in categories],
+            'project_id': project.id,
+            'featured_id': featured.id,
+        }
+        db.session.remove()
+    return site
+
+
+@pytest.mark.parametrize('url', list(MAX_QUERIES))
+def test_query_count_does_not_grow_with_articles(app, site, url):
+    client = app.test_client()
+    add_articles(app, site, start=0, count=2)
+    client.get(url)  # 初回のみ発生するキャッシュ作成等を除外
+    with count_queries(app) as few:
+        assert client.get(url).status_code == 200
+
+    add_articles(app, site, start=2, count=8)
+    client.get(url)
+    with count_queries(app) as many:
+        assert client.get(url).status_code == 200
+
+    assert len(many) == len(few), '\n'.join(many)
+    assert len(many) <= MAX_QUERIES[url], '\n'.join(many)
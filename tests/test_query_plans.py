@@ -0,0 +1,127 @@
+"""
+一覧ページ・コメント・カテゴリのクエリがインデックスを使うことの確認
+実際のルート・サービスが発行したSQLを記録し、create_allで作成したSQLiteでEXPLAIN QUERY PLANを実行する
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta, date
+
+import pytest
+from sqlalchemy import event
+
+from models import db, User, Article, Category, Challenge, Comment, Project
+from comment_service import CommentService
+
+# 全件走査してはならないテーブル
+GUARDED_TABLES = {'articles', 'projects', 'comments', 'categories', 'article_categories'}
+
+# 記録したSQLのいずれかで使われるべきインデックス
+EXPECTED_INDEXES = {
+    'ix_articles_is_published_published_at',
+    'ix_articles_challenge_id_is_published_published_at',
+    'ix_projects_status_display_order',
+    'ix_projects_status_is_featured_display_order',
+    'ix_projects_challenge_id_status_display_order',
+    'ix_comments_article_id_is_approved_created_at',
+    'ix_comments_is_approved_created_at',
+    'ix_categories_parent_id',
+}
+
+ROUTES = ['/blog', '/blog/challenge/1', '/projects', '/projects/challenge/1', '/portfolio',
+          '/category/python/', '/article/article-0/']
+
+SERVICE_CALLS = {
+    'CommentService.get_approved_comments': lambda site: CommentService.get_approved_comments(site['article_id']),
+    'CommentService.get_pending_comments': lambda site: CommentService.get_pending_comments(limit=10),
+}
+
+_SCAN_RE = re.compile(r'^SCAN (\w+)')
+
+
+@contextmanager
+def capture_statements():
+    """ブロック内で実行されたSELECT文とパラメータを記録"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def query_plan(statement, parameters):
+    connection = db.session.connection()
+    return [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+
+
+def scanned_tables(plan):
+    return {match.group(1) for match in map(_SCAN_RE.match, plan) if match} & GUARDED_TABLES
+
+
+@pytest.fixture
+def site(app_context):
+    author = User(email='admin@example.com', name='admin', password_hash='x', role='admin')
+    challenge = Challenge(name='100 days', slug='100-days', start_date=date(2025, 1, 1), is_active=True)
+    parent = Category(name='Python', slug='python')
+    db.session.add_all([author, challenge, parent])
+    db.session.flush()
+    child = Category(name='Flask', slug='flask', parent_id=parent.id)
+    project = Project(title='Portfolio', slug='portfolio', description='Flask app', status='active',
+                      is_featured=True, challenge_id=challenge.id)
+    db.session.add_all([child, project])
+    articles = []
+    for i in range(3):
+        article = Article(title=f'Article {i}', slug=f'article-{i}', summary='summary', body=f'Body {i}',
+                          author_id=author.id, is_published=True,
+                          published_at=datetime(2025, 1, 1) + timedelta(days=i),
+                          challenge_id=challenge.id, challenge_day=i + 1)
+        article.categories.extend([parent, child])
+        article.linked_projects.append(project)
+        articles.append(article)
+    db.session.add_all(articles)
+    db.session.flush()
+    db.session.add_all([
+        Comment(article_id=articles[0].id, author_name='reader', author_email='r@example.com',
+                content='approved', is_approved=True),
+        Comment(article_id=articles[0].id, author_name='reader', author_email='r@example.com',
+                content='pending', is_approved=False),
+    ])
+    db.session.commit()
+    assert challenge.id == 1
+    return {'article_id': articles[0].id}
+
+
+def collect_plans(client, site):
+    """各ルート・サービス呼び出しが発行したSELECT文の実行計画を集める"""
+    plans = {}
+    for url in ROUTES:
+        with capture_statements() as statements:
+            assert client.get(url).status_code == 200
+        plans[url] = [(statement, query_plan(statement, parameters)) for statement, parameters in statements]
+    for name, call in SERVICE_CALLS.items():
+        db.session.expire_all()
+        with capture_statements() as statements:
+            call(site)
+        plans[name] = [(statement, query_plan(statement, parameters)) for statement, parameters in statements]
+    return plans
+
+
+def test_routes_do_not_scan_guarded_tables(client, site):
+    for name, entries in collect_plans(client, site).items():
+        assert entries, name
+        for statement, plan in entries:
+            assert not scanned_tables(plan), f'{name}: {plan}\n{statement}'
+
+
+def test_expected_indexes_are_used(client, site):
+    used = set()
+    for entries in collect_plans(client, site).values():
+        for _, plan in entries:
+            used.update(re.findall(r'USING (?:COVERING )?INDEX (\w+)', ' '.join(plan)))
+    assert EXPECTED_INDEXES <= used, EXPECTED_INDEXES - used
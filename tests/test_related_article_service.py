@@ -0,0 +1,144 @@
+"""RelatedArticleService のテスト（変わった一覧だけ書き換えた結果が、空の状態からの計算と一致すること）"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, delete
+
+from models import db, User, Article, ArticleRelation, Category, Challenge
+from related_article_service import RelatedArticleService
+from search_index_service import SearchIndexService
+
+TOP_K = 3
+WORDS = ['flask', 'python', 'numpy', 'docker', 'mysql', 'nginx', 'redis', 'celery']
+
+
+def relation_snapshot():
+    """(記事ID, 順位, 関連記事ID) の一覧"""
+    return db.session.execute(
+        select(ArticleRelation.article_id, ArticleRelation.rank, ArticleRelation.related_article_id)
+        .order_by(ArticleRelation.article_id, ArticleRelation.rank)
+    ).all()
+
+
+def refresh():
+    _, error = RelatedArticleService.rebuild(top_k=TOP_K)
+    assert error is None
+
+
+def assert_matches_full_rebuild():
+    incremental = relation_snapshot()
+    db.session.execute(delete(ArticleRelation))
+    db.session.commit()
+    refresh()
+    assert incremental == relation_snapshot()
+
+
+def save(article):
+    SearchIndexService.index_article(article, notify=False)
+    db.session.commit()
+    refresh()
+
+
+@pytest.fixture
+def articles(app_context):
+    user = User(email='author@example.com', name='author', password_hash='x', role='admin')
+    challenge = Challenge(name='100 days', slug='100-days', start_date=datetime(2025, 1, 1).date(), is_active=True)
+    categories = [Category(name=f'Category {i}', slug=f'category-{i}') for i in range(3)]
+    db.session.add_all([user, challenge, *categories])
+    db.session.flush()
+
+    base = datetime(2025, 1, 1)
+    result = []
+    for i in range(9):
+        article = Article(
+            title=f'Day {i} {WORDS[i % len(WORDS)]}',
+            slug=f'day-{i}',
+            body=' '.join(WORDS[(i + k) % len(WORDS)] for k in range(3)) + f' note{i % 4}',
+            author_id=user.id,
+            is_published=True,
+            published_at=base + timedelta(days=i),
+            challenge_id=challenge.id if i % 2 == 0 else None,
+            challenge_day=i + 1 if i % 2 == 0 else None,
+        )
+        article.categories.append(categories[i % 3])
+        db.session.add(article)
+        result.append(article)
+    db.session.flush()
+    for article in result:
+        SearchIndexService.index_article(article, notify=False)
+    db.session.commit()
+    refresh()
+    return result
+
+
+def test_publish_matches_rebuild(articles):
+    article = Article(title='Day 9 flask', slug='day-9', body='flask python numpy note1',
+                      author_id=articles[0].author_id, is_published=True,
+                      published_at=datetime(2025, 2, 1), challenge_id=articles[0].challenge_id, challenge_day=3)
+    article.categories.append(articles[0].categories[0])
+    db.session.add(article)
+    db.session.flush()
+    save(article)
+    assert_matches_full_rebuild()
+
+
+def test_unpublish_matches_rebuild(articles):
+    articles[4].is_published = False
+    save(articles[4])
+    assert_matches_full_rebuild()
+
+
+def test_edit_matches_rebuild(articles):
+    # 関連度が下がる編集（他の一覧から外れて次点の記事が繰り上がる）
+    article = articles[2]
+    article.body = 'unrelated words only'
+    article.categories = []
+    article.challenge_id = None
+    article.challenge_day = None
+    save(article)
+    assert_matches_full_rebuild()
+
+    # 関連度が上がる編集
+    article.body = articles[5].body
+    article.categories = list(articles[5].categories)
+    save(article)
+    assert_matches_full_rebuild()
+
+
+def test_delete_matches_rebuild(articles):
+    article_id = articles[6].id
+    SearchIndexService.remove_document('article', article_id)
+    db.session.delete(articles[6])
+    db.session.commit()
+    refresh()
+    assert_matches_full_rebuild()
+    assert all(article_id not in (row.article_id, row.related_article_id) for row in relation_snapshot())
+
+
+def test_unchanged_lists_are_not_rewritten(articles):
+    computed_at = dict(db.session.execute(
+        select(ArticleRelation.article_id, ArticleRelation.computed_at).where(ArticleRelation.rank == 0)
+    ).all())
+    refresh()
+    assert computed_at == dict(db.session.execute(
+        select(ArticleRelation.article_id, ArticleRelation.computed_at).where(ArticleRelation.rank == 0)
+    ).all())
+
+
+def test_background_rebuild_coalesces_requests(articles):
+    import time
+    from related_article_service import RelatedArticleRebuilder
+
+    db.session.execute(delete(ArticleRelation))
+    db.session.commit()
+    rebuilder = RelatedArticleRebuilder(delay=0.2)
+    rebuilder.request()
+    rebuilder.request()
+    deadline = time.monotonic() + 10
+    while rebuilder.completed_count < 1 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.3)
+
+    assert rebuilder.get_stats() == {'pending': False, 'requested': 2, 'completed': 1, 'errors': 0}
+    db.session.expire_all()
+    assert relation_snapshot()
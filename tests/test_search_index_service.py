@@ -0,0 +1,25 @@
+"""SearchIndexService のテスト（インデックス未作成の間は部分一致検索に切り替わること）"""
+from datetime import datetime
+
+from models import db, User, Article
+from article_service import ArticleService
+from search_index_service import SearchIndexService
+
+
+def test_empty_index_falls_back_to_like_search(app_context):
+    author = User(email='admin@example.com', name='admin', password_hash='x', role='admin')
+    db.session.add(author)
+    db.session.flush()
+    # マイグレーション直後と同じく、インデックスを作らずに記事を登録
+    article = Article(title='Flask tips', slug='flask-tips', summary='summary', body='Body',
+                      author_id=author.id, is_published=True, published_at=datetime(2025, 1, 1))
+    db.session.add(article)
+    db.session.commit()
+
+    assert SearchIndexService.search('article', 'flask') is None
+    assert [item.id for item in ArticleService.search_articles('flask').items] == [article.id]
+
+    SearchIndexService.rebuild()
+    assert SearchIndexService.search('article', 'flask') == [article.id]
+    assert SearchIndexService.search('article', 'django') == []
+    assert [item.id for item in ArticleService.search_articles('flask').items] == [article.id]
@@ -0,0 +1,24 @@
+"""utils.render_markdown のテスト"""
+from utils import render_markdown, make_markdown_converter, get_markdown_converter
+
+
+def test_excerpt_keeps_document_order_with_nested_inline_markup(app_context):
+    rendered = render_markdown('A [link **bold** more](http://x) E & F < G')
+    assert rendered.excerpt == 'A link bold more E & F < G'
+
+
+def test_excerpt_decodes_entities_and_skips_code_blocks(app_context):
+    rendered = render_markdown('x &amp; y &copy; `a<b`\n\n```\nhidden\n```\n\nend')
+    assert rendered.excerpt == 'x & y © a<b end'
+
+
+def test_headings_get_anchors_and_toc(app_context):
+    rendered = render_markdown('# 見出し\n\n## Sub *em*\n')
+    assert [item['title'] for item in rendered.toc] == ['見出し', 'Sub em']
+    assert f'id="{rendered.toc[0]["anchor"]}"' in rendered.html
+
+
+def test_pooled_converter_matches_new_converter_across_renders(app_context):
+    texts = ['# A\n\n[^1] text\n\n[^1]: note', '## B\n\n*[HTML]: abbr\n\nHTML', 'plain']
+    for text in texts + texts:
+        assert get_markdown_converter().convert(text) == make_markdown_converter().convert(text)
@@ -0,0 +1,119 @@
+"""
+ユーザーエージェント分類モジュール
+ブラウザ・OS・ボット判定を1回の呼び出しで行い、結果をUA文字列ごとにキャッシュする
+（アクセスログ分析・ログイン履歴で共通利用）
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+UserAgentInfo = namedtuple('UserAgentInfo', ['browser', 'os', 'os_family', 'is_bot'])
+
+UNKNOWN_USER_AGENT = UserAgentInfo('Unknown', 'Unknown', 'Unknown', False)
+
+BOT_KEYWORDS = [
+    'bot', 'crawler', 'spider', 'scraper', 'wget', 'curl',
+    'googlebot', 'bingbot', 'slurp', 'facebookexternalhit',
+    'twitterbot', 'linkedinbot', 'whatsapp', 'telegram',
+    'python-requests', 'java/', 'okhttp', 'apache-httpclient'
+]
+
+# ブラウザ判定（1回の走査で該当するものをすべて拾い、優先度の高いものを採用）
+BROWSER_PRIORITY = ['Edge', 'Opera', 'Firefox', 'Chrome', 'Safari', 'Internet Explorer']
+_BROWSER_PATTERN = re.compile(
+    r'(?P<Edge>edg/|edge/)|(?P<Opera>opr/|opera)|(?P<Firefox>firefox)|'
+    r'(?P<Chrome>chrome)|(?P<Safari>safari)|(?P<IE>msie|trident)'
+)
+
+# OS判定（iOS・AndroidのUAは"Mac OS X"・"Linux"を含むため先に判定する）
+OS_PRIORITY = ['Windows', 'iOS', 'Android', 'macOS', 'Linux']
+_OS_PATTERN = re.compile(
+    r'(?P<Windows>windows)|(?P<iOS>iphone|ipad|ipod|\bios\b)|(?P<Android>android)|'
+    r'(?P<macOS>macintosh|mac os)|(?P<Linux>linux)'
+)
+_BOT_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in BOT_KEYWORDS))
+
+_WINDOWS_VERSIONS = {
+    '10.0': 'Windows 10/11',
+    '6.3': 'Windows 8.1',
+    '6.2': 'Windows 8',
+    '6.1': 'Windows 7',
+    '6.0': 'Windows Vista',
+}
+_WINDOWS_VERSION_PATTERN = re.compile(r'windows nt (\d+\.\d+)')
+_MAC_VERSION_PATTERN = re.compile(r'mac os x (\d+)_(\d+)(?:_(\d+))?')
+_MAC_CODENAMES = {
+    14: 'Mojave',
+    13: 'High Sierra',
+    12: 'Sierra',
+    11: 'El Capitan',
+}
+_ANDROID_VERSION_PATTERN = re.compile(r'android (\d+(?:\.\d+)?)')
+_IOS_VERSION_PATTERN = re.compile(r'os (\d+)_(\d+)(?:_(\d+))?')
+_LINUX_DISTRIBUTIONS = [('ubuntu', 'Ubuntu Linux'), ('fedora', 'Fedora Linux'),
+                        ('centos', 'CentOS Linux'), ('debian', 'Debian Linux')]
+
+
+@lru_cache(maxsize=2048)
+def classify_user_agent(user_agent):
+    """ユーザーエージェントを分類（ブラウザ・OS詳細・OS系統・ボット判定）"""
+    if not user_agent or user_agent in ('unknown', '-'):
+        return UNKNOWN_USER_AGENT
+
+    ua_lower = user_agent.lower()
+    browser = _first_by_priority(_BROWSER_PATTERN, ua_lower, BROWSER_PRIORITY, {'IE': 'Internet Explorer'})
+    os_family = _first_by_priority(_OS_PATTERN, ua_lower, OS_PRIORITY)
+    return UserAgentInfo(
+        browser=browser,
+        os=_describe_os(os_family, ua_lower),
+        os_family=os_family,
+        is_bot=_BOT_PATTERN.search(ua_lower) is not None,
+    )
+
+
+def _first_by_priority(pattern, text, priority, aliases=None):
+    """パターンに一致した名前のうち優先度が最も高いものを返す"""
+    found = {aliases.get(m.lastgroup, m.lastgroup) if aliases else m.lastgroup for m in pattern.finditer(text)}
+    for name in priority:
+        if name in found:
+            return name
+    return 'Other'
+
+
+def _describe_os(os_family, ua_lower):
+    """OS系統ごとにバージョンを含む表示名を生成"""
+    if os_family == 'Windows':
+        match = _WINDOWS_VERSION_PATTERN.search(ua_lower)
+        return _WINDOWS_VERSIONS.get(match.group(1), 'Windows (Other)') if match else 'Windows (Other)'
+
+    if os_family == 'iOS':
+        device = 'iPad' if 'ipad' in ua_lower else 'iPhone'
+        match = _IOS_VERSION_PATTERN.search(ua_lower)
+        if match:
+            return f'iOS {match.group(1)}.{match.group(2)}.{match.group(3) or "0"} ({device})'
+        return f'iOS ({device})'
+
+    if os_family == 'Android':
+        match = _ANDROID_VERSION_PATTERN.search(ua_lower)
+        return f'Android {match.group(1)}' if match else 'Android'
+
+    if os_family == 'macOS':
+        match = _MAC_VERSION_PATTERN.search(ua_lower)
+        if not match:
+            return 'macOS (Version Unknown)'
+        major, minor, patch = int(match.group(1)), int(match.group(2)), match.group(3) or '0'
+        if major == 10:
+            if minor >= 15:
+                return f'macOS Catalina (10.{minor}.{patch})'
+            if minor in _MAC_CODENAMES:
+                return f'macOS {_MAC_CODENAMES[minor]} (10.{minor}.{patch})'
+            return f'macOS (10.{minor}.{patch})'
+        return f'macOS {major}.{minor}.{patch}'
+
+    if os_family == 'Linux':
+        for keyword, name in _LINUX_DISTRIBUTIONS:
+            if keyword in ua_lower:
+                return name
+        return 'Linux'
+
+    return 'Other'
@@ -4,9 +4,18 @@ Utility Functions - 一般的なユーティリティ関数
 import bleach
 import markdown
 import re
+import threading
+import html as html_lib
+from collections import namedtuple
+from markdown.extensions import Extension
+from markdown.extensions.toc import render_inner_html, strip_tags
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import AMP_SUBSTITUTE, HTML_PLACEHOLDER_RE
 from markupsafe import Markup
 from flask import current_app
 
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
 def sanitize_html(content):
     """HTMLコンテンツをサニタイズ"""
     allowed_tags = ['p', 'br', 'strong', 'em', 'u', 'ol', 'ul', 'li', 'a', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
@@ -14,8 +23,8 @@ def sanitize_html(content):
     return bleach.clean(content, tags=allowed_tags, attributes=allowed_attributes, strip=True)
 
 def clear_ogp_cache():
-    """OGPキャッシュをクリアする関数"""
-    from app import ogp_cache
+    """OGPキャッシュをクリアする関数（メモリ・データベースの全層）"""
+    from seo import ogp_cache
     ogp_cache.clear()
     current_app.logger.info("🗑️ OGP cache cleared")
 
@@ -70,60 +79,152 @@ def perform_search(query, search_filter='all'):
     
     return results
 
-def process_markdown(text):
-    """MarkdownテキストをHTMLに変換する関数（SNS埋込自動検出付き）"""
-    if not text:
-        return ''
-    
-    # Markdownの拡張機能を設定
-    md = markdown.Markdown(
-        extensions=['extra', 'codehilite', 'toc', 'nl2br'],
-        extension_configs={
-            'codehilite': {
-                'css_class': 'highlight',
-                'use_pygments': False
-            }
-        },
+# 記事本文用のMarkdown設定（filters.markdown_filter / process_markdown 共通）
+MARKDOWN_EXTENSIONS = ['extra', 'codehilite', 'toc', 'nl2br']
+MARKDOWN_EXTENSION_CONFIGS = {
+    'codehilite': {
+        'css_class': 'highlight',
+        'use_pygments': False
+    }
+}
+
+# セキュリティのためHTMLをサニタイズ（SNS埋込用タグを追加）
+MARKDOWN_ALLOWED_TAGS = [
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'p', 'br', 'strong', 'em', 'u', 'del',
+    'ul', 'ol', 'li', 'blockquote', 'pre', 'code',
+    'a', 'img', 'table', 'thead', 'tbody', 'tr', 'th', 'td',
+    # SNS埋込用タグ
+    'div', 'iframe', 'script', 'blockquote', 'noscript'
+]
+MARKDOWN_ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title', 'target', 'rel'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'code': ['class'],
+    'pre': ['class'],
+    'h1': ['id'], 'h2': ['id'], 'h3': ['id'], 'h4': ['id'], 'h5': ['id'], 'h6': ['id'],
+    # SNS埋込用属性
+    'div': ['class', 'id', 'style', 'data-href', 'data-width', 'data-instgrm-permalink'],
+    'iframe': ['src', 'width', 'height', 'frameborder', 'allow', 'allowfullscreen', 'title', 'style'],
+    'script': ['src', 'async', 'defer', 'charset', 'crossorigin'],
+    'blockquote': ['class', 'style', 'data-instgrm-permalink'],
+    'noscript': []
+}
+
+SNS_EMBED_CLASSES = ['sns-embed', 'youtube-embed', 'twitter-embed', 'instagram-embed', 'facebook-embed', 'threads-embed']
+
+# 抜粋（meta description用プレーンテキスト）の最大文字数
+EXCERPT_MAX_LENGTH = 300
+# 退避済みHTMLのうち文字参照のみのもの
+ENTITY_RE = re.compile(r'&(?:#\d+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);')
+
+RenderedMarkdown = namedtuple('RenderedMarkdown', ['html', 'toc', 'excerpt'])
+
+def make_heading_anchor(title, heading_counter):
+    """見出しテキストからアンカーIDを生成（日本語対応）"""
+    anchor_id = re.sub(r'[^\w\-_\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF]', '-', title.lower())
+    anchor_id = re.sub(r'-+', '-', anchor_id).strip('-')
+    return f"heading-{heading_counter}-{anchor_id}" if anchor_id else f"heading-{heading_counter}"
+
+class ContentTreeprocessor(Treeprocessor):
+    """見出しアンカー付与・目次収集・プレーンテキスト抽出を1回の走査で行う"""
+
+    def run(self, root):
+        toc = []
+        texts = []
+        heading_counter = 0
+
+        for element in root.iter():
+            if element.tag in HEADING_TAGS:
+                heading_counter += 1
+                title = html_lib.unescape(strip_tags(render_inner_html(element, self.md)))
+                anchor_id = make_heading_anchor(title, heading_counter)
+                element.set('id', anchor_id)
+                toc.append({
+                    'level': int(element.tag[1]),
+                    'title': title,
+                    'anchor': anchor_id
+                })
+
+        self.collect_text(root, texts)
+        plain_text = HTML_PLACEHOLDER_RE.sub(self.restore_placeholder, ' '.join(texts)).replace(AMP_SUBSTITUTE, '&')
+        self.md.content_toc = toc
+        self.md.content_excerpt = ' '.join(html_lib.unescape(plain_text).split())[:EXCERPT_MAX_LENGTH]
+
+    def collect_text(self, element, texts):
+        """要素のテキストを文書の出現順（子要素の中身→その後ろのテキスト）で集める"""
+        if element.text:
+            texts.append(element.text)
+        for child in element:
+            self.collect_text(child, texts)
+            if child.tail:
+                texts.append(child.tail)
+
+    def restore_placeholder(self, match):
+        """退避済みHTMLのうち文字参照（&amp;等）は元に戻し、コードブロック等は抜粋から除外する"""
+        index = int(match.group(1))
+        stash = self.md.htmlStash.rawHtmlBlocks
+        raw = stash[index] if index < len(stash) else ''
+        if isinstance(raw, str) and ENTITY_RE.fullmatch(raw.strip()):
+            return raw.strip()
+        return ' '
+
+class ContentExtension(Extension):
+    """記事本文用の拡張（toc拡張がIDを付与した後に実行する）"""
+
+    def extendMarkdown(self, md):
+        md.registerExtension(self)
+        self.md = md
+        self.reset()
+        md.treeprocessors.register(ContentTreeprocessor(md), 'content', 4)
+
+    def reset(self):
+        self.md.content_toc = []
+        self.md.content_excerpt = ''
+
+# スレッドごとに保持する設定済みMarkdown変換器（拡張機能の読み込みは初回のみ）
+_markdown_local = threading.local()
+
+def make_markdown_converter():
+    """記事本文用の設定でMarkdown変換器を新規作成"""
+    return markdown.Markdown(
+        extensions=MARKDOWN_EXTENSIONS + [ContentExtension()],
+        extension_configs=MARKDOWN_EXTENSION_CONFIGS,
         tab_length=2  # タブ長を短く設定
     )
-    
+
+def get_markdown_converter():
+    """現在のスレッド用の設定済みMarkdown変換器を取得（状態はリセット済み）"""
+    md = getattr(_markdown_local, 'converter', None)
+    if md is None:
+        md = make_markdown_converter()
+        _markdown_local.converter = md
+    # 前回変換時の見出しID・目次・抜粋などをクリア
+    md.reset()
+    return md
+
+def render_markdown(text):
+    """Markdownを1回の変換でHTML（見出しアンカー付き）・目次・抜粋に変換"""
+    if not text:
+        return RenderedMarkdown(Markup(''), None, '')
+
+    md = get_markdown_converter()
+
     # MarkdownをHTMLに変換
     html = md.convert(text)
-    
-    # セキュリティのためHTMLをサニタイズ（SNS埋込用タグを追加）
-    allowed_tags = [
-        'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-        'p', 'br', 'strong', 'em', 'u', 'del',
-        'ul', 'ol', 'li', 'blockquote', 'pre', 'code',
-        'a', 'img', 'table', 'thead', 'tbody', 'tr', 'th', 'td',
-        # SNS埋込用タグ
-        'div', 'iframe', 'script', 'blockquote', 'noscript'
-    ]
-    allowed_attributes = {
-        'a': ['href', 'title', 'target', 'rel'],
-        'img': ['src', 'alt', 'title', 'width', 'height'],
-        'code': ['class'],
-        'pre': ['class'],
-        'h1': ['id'], 'h2': ['id'], 'h3': ['id'], 'h4': ['id'], 'h5': ['id'], 'h6': ['id'],
-        # SNS埋込用属性
-        'div': ['class', 'id', 'style', 'data-href', 'data-width', 'data-instgrm-permalink'],
-        'iframe': ['src', 'width', 'height', 'frameborder', 'allow', 'allowfullscreen', 'title', 'style'],
-        'script': ['src', 'async', 'defer', 'charset', 'crossorigin'],
-        'blockquote': ['class', 'style', 'data-instgrm-permalink'],
-        'noscript': []
-    }
-    
+
     # SNS埋込HTMLがある場合はbleachを適用しない（安全なHTMLのため）
-    if any(cls in html for cls in ['sns-embed', 'youtube-embed', 'twitter-embed', 'instagram-embed', 'facebook-embed', 'threads-embed']):
+    if any(cls in html for cls in SNS_EMBED_CLASSES):
         clean_html = html
     else:
         # 通常のMarkdownコンテンツのみサニタイズ
-        clean_html = bleach.clean(html, tags=allowed_tags, attributes=allowed_attributes)
-    
-    # 見出しにアンカーIDを追加
-    clean_html = add_heading_anchors(clean_html)
-    
-    return Markup(clean_html)
+        clean_html = bleach.clean(html, tags=MARKDOWN_ALLOWED_TAGS, attributes=MARKDOWN_ALLOWED_ATTRIBUTES)
+
+    return RenderedMarkdown(Markup(clean_html), md.content_toc or None, md.content_excerpt)
+
+def process_markdown(text):
+    """MarkdownテキストをHTMLに変換する関数（SNS埋込自動検出付き）"""
+    return render_markdown(text).html
 
 def generate_ogp_data(title, description=None, image_url=None, url=None):
     """OGPデータを生成する関数"""
@@ -134,69 +235,3 @@ def generate_ogp_data(title, description=None, image_url=None, url=None):
         'url': url
     }
     return ogp_data
-
-def generate_table_of_contents(markdown_content):
-    """Markdownから目次を生成"""
-    import re
-    
-    if not markdown_content:
-        return None
-    
-    # 見出しを抽出するパターン（# ## ### #### ##### ######）
-    heading_pattern = r'^(#{1,6})\s+(.+)'
-    headings = []
-    heading_counter = 0
-    
-    for line_num, line in enumerate(markdown_content.split('\n'), 1):
-        line = line.strip()
-        match = re.match(heading_pattern, line)
-        if match:
-            heading_counter += 1  # 見出しの順番をカウント
-            level = len(match.group(1))  # # の数
-            title = match.group(2).strip()
-            
-            # アンカー用のIDを生成（日本語対応）
-            anchor_id = re.sub(r'[^\w\-_\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF]', '-', title.lower())
-            anchor_id = re.sub(r'-+', '-', anchor_id).strip('-')
-            anchor_id = f"heading-{heading_counter}-{anchor_id}" if anchor_id else f"heading-{heading_counter}"
-            
-            headings.append({
-                'level': level,
-                'title': title,
-                'anchor': anchor_id,
-                'line': line_num
-            })
-    
-    return headings if headings else None
-
-def add_heading_anchors(html_content):
-    """HTML見出しにアンカーIDを追加（目次と一致させる）"""
-    if not html_content:
-        return html_content
-    
-    import re
-    from bs4 import BeautifulSoup
-    
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        heading_counter = 0
-        
-        # h1〜h6タグを順番に検索してIDを追加
-        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            heading_counter += 1
-            title = heading.get_text().strip()
-            
-            # 目次生成と同じロジックでアンカーIDを生成
-            anchor_id = re.sub(r'[^\w\-_\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF]', '-', title.lower())
-            anchor_id = re.sub(r'-+', '-', anchor_id).strip('-')
-            anchor_id = f"heading-{heading_counter}-{anchor_id}" if anchor_id else f"heading-{heading_counter}"
-            
-            heading['id'] = anchor_id
-            current_app.logger.debug(f"Added anchor: {anchor_id} for heading: {title}")
-        
-        return str(soup)
-        
-    except Exception as e:
-        current_app.logger.error(f"Error adding heading anchors: {e}")
-        return html_content
-